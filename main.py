@@ -5,6 +5,8 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from api.v1.router import api_router
 from config.settings import get_settings
+# 与节点使用同一个模块路径（src.services.*），关闭的才是节点写入的那个队列单例
+from src.services.write_behind import close_write_behind
 
 settings = get_settings()
 logging.basicConfig(level=logging.DEBUG if settings.debug else logging.INFO)
@@ -25,6 +27,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 关闭前刷完写后队列（未落库的消息/作答/日志）
+@app.on_event("shutdown")
+def flush_persistence():
+    close_write_behind()
+
 # 健康检查
 @app.get("/healthz")
 def healthz():
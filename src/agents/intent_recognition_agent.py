@@ -1,8 +1,9 @@
 from __future__ import annotations
-import asyncio
 from typing import Any, Dict, Callable
-from utils.prompt_utils import render_prompt, call_json_with_stream_legacy
+from utils.prompt_utils import render_prompt
+from llms.adapter import acall_json_with_stream
 from services.event_types import StreamEvent, StreamEventType
+from services.token_emitter import TokenEmitter
 
 INTENT_THRESHOLD = 0.6
 
@@ -13,10 +14,8 @@ async def run_intent_recognition(state: Dict[str, Any], emit: Callable[[StreamEv
     })
     await emit(StreamEvent(type=StreamEventType.node_start, payload={"stage": "IntentRecognition"}))
 
-    def _on_tok(tok: str):
-        asyncio.create_task(emit(StreamEvent(type=StreamEventType.token, payload={"text": tok}, node="IntentRecognition")))
-
-    data = call_json_with_stream_legacy(llm_client, prompt, on_token=_on_tok)
+    async with TokenEmitter(emit, node="IntentRecognition") as tokens:
+        data = await acall_json_with_stream(llm_client, prompt, on_token=tokens.push, cache=True)
     state["intents"] = data.get("intents", [])
     state["primary_intent"] = data.get("primary_intent")
     state["intent_confidence"] = float(data.get("confidence_score", 0.0))
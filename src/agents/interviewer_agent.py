@@ -1,10 +1,33 @@
 from __future__ import annotations
-import asyncio
 from typing import Any, Dict, Callable
-from src.utils.prompt_utils import render_prompt, call_json_with_stream_legacy
+from src.utils.prompt_utils import render_prompt
+from src.llms.adapter import acall_json_with_stream
 from src.services.event_types import StreamEvent, StreamEventType
+from src.services.token_emitter import TokenEmitter
+from src.services.question_phrasing import get_phrasing
 
-async def run_interviewer(state: Dict[str, Any], emit: Callable[[StreamEvent], Any], llm_client) -> Dict[str, Any]:
+def _needs_adaptive_phrasing(state: Dict[str, Any]) -> bool:
+    """只有存在需要“接住”的上下文时才值得调 LLM 改写问法：澄清回合 / 上一题低置信度"""
+    if state.get("clarify"):
+        return True
+    last = state.get("last_score") or {}
+    if last.get("needs_clarify"):
+        return True
+    conf = last.get("confidence")
+    return conf is not None and float(conf) < float(state.get("confidence_threshold", 0.6))
+
+async def run_interviewer(
+    state: Dict[str, Any],
+    emit: Callable[[StreamEvent], Any],
+    llm_client,
+    mode: str = "lazy",
+) -> Dict[str, Any]:
+    """
+    mode:
+      - "lazy"（默认）：直接用离线话术缓存/题干出题，仅在澄清或上一题低置信度时调用 LLM
+      - "llm"：每题都调用 LLM 生成问法（旧行为）
+    结果写入 state["interviewer_utterance"]，由 interviewer_node 展示给用户。
+    """
     idx = int(state.get("q_index", 0))
     plan = state.get("plan", [])
     if idx >= len(plan):
@@ -12,6 +35,17 @@ async def run_interviewer(state: Dict[str, Any], emit: Callable[[StreamEvent], A
         return state
 
     item = plan[idx]
+    if mode != "llm" and not _needs_adaptive_phrasing(state):
+        utterance = get_phrasing(item, state.get("bank_path"))
+        source = "phrasing_cache" if utterance else "bank"
+        state["interviewer_utterance"] = utterance or item.get("question_text")
+        await emit(StreamEvent(type=StreamEventType.node_start, payload={"stage": "Interviewer", "q_index": idx}))
+        await emit(StreamEvent(type=StreamEventType.summary, payload={"interviewer": {
+            "assistant_utterance": state["interviewer_utterance"], "source": source,
+        }}))
+        await emit(StreamEvent(type=StreamEventType.node_end, payload={"stage": "Interviewer"}))
+        return state
+
     prompt = render_prompt("interviewer", {
         "dimension_name": item.get("dimension"),
         "question_id": item.get("question_id"),
@@ -25,10 +59,10 @@ async def run_interviewer(state: Dict[str, Any], emit: Callable[[StreamEvent], A
     })
     await emit(StreamEvent(type=StreamEventType.node_start, payload={"stage": "Interviewer", "q_index": idx}))
 
-    def _on_tok(tok: str):
-        asyncio.create_task(emit(StreamEvent(type=StreamEventType.token, payload={"text": tok}, node="Interviewer")))
-
-    data = call_json_with_stream_legacy(llm_client, prompt, on_token=_on_tok)
+    async with TokenEmitter(emit, node="Interviewer") as tokens:
+        data = await acall_json_with_stream(llm_client, prompt, on_token=tokens.push)
+    utterance = data.get("assistant_utterance") or data.get("clarify_prompt")
+    state["interviewer_utterance"] = utterance if isinstance(utterance, str) and utterance.strip() else item.get("question_text")
     await emit(StreamEvent(type=StreamEventType.summary, payload={"interviewer": data}))
     await emit(StreamEvent(type=StreamEventType.node_end, payload={"stage": "Interviewer"}))
     return state
\ No newline at end of file
@@ -1,8 +1,9 @@
 from __future__ import annotations
-import asyncio
 from typing import Any, Dict, Callable
-from utils.prompt_utils import render_prompt, call_json_with_stream_legacy
+from utils.prompt_utils import render_prompt
+from llms.adapter import acall_json_with_stream
 from services.event_types import StreamEvent, StreamEventType
+from services.token_emitter import TokenEmitter
 
 async def run_problem_exploration(
     state: Dict[str, Any],
@@ -31,11 +32,9 @@ async def run_problem_exploration(
         "exploration_notes": state.get("exploration_notes", []),
     })
 
-    async def _emit_token(tok: str):
-        await emit(StreamEvent(type=StreamEventType.token, payload={"text": tok}, node="ProblemExploration"))
-
-    # 逐 token 回调（供打字机体验），结束后解析为 JSON
-    data = call_json_with_stream_legacy(llm_client, prompt, on_token=lambda t: asyncio.create_task(_emit_token(t)))
+    # token 按块合并后回调（供打字机体验），结束后解析为 JSON
+    async with TokenEmitter(emit, node="ProblemExploration") as tokens:
+        data = await acall_json_with_stream(llm_client, prompt, on_token=tokens.push)
 
     # 结构化结果容错
     new_notes = data.get("new_notes") or []
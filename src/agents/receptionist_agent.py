@@ -1,10 +1,11 @@
 from __future__ import annotations
-import asyncio
 from typing import Any, Dict, Callable, List
 from copy import deepcopy
 
-from utils.prompt_utils import render_prompt, call_json_with_stream_legacy
+from utils.prompt_utils import render_prompt
+from llms.adapter import acall_json_with_stream
 from services.event_types import StreamEvent, StreamEventType
+from services.token_emitter import TokenEmitter
 from graph.common import add_ai_message
 
 REQUIRED_FIELDS = [
@@ -188,10 +189,8 @@ async def run_receptionist(
         }
     })
 
-    async def _emit_token(tok: str):
-        await emit(StreamEvent(type=StreamEventType.token, payload={"text": tok}, node="Receptionist"))
-
-    data = call_json_with_stream_legacy(llm_client, prompt, on_token=lambda t: asyncio.create_task(_emit_token(t)))
+    async with TokenEmitter(emit, node="Receptionist") as tokens:
+        data = await acall_json_with_stream(llm_client, prompt, on_token=tokens.push)
 
     # 1) 合并结构化字段
     updated_fields = data.get("updated_fields") or {}
@@ -1,32 +1,68 @@
 from __future__ import annotations
 import asyncio
-from typing import Any, Dict, Callable
-from utils.prompt_utils import render_prompt, call_json_with_stream_legacy
+import logging
+from typing import Any, Dict, Callable, Optional
+from utils.prompt_utils import render_prompt
+from llms.adapter import acall_json_with_stream
 from services.event_types import StreamEvent, StreamEventType
+from services.token_emitter import TokenEmitter
+from services.report_skeleton import build_report_skeleton, section_payloads, fallback_section
 
-async def run_report_writer(state: Dict[str, Any], emit: Callable[[StreamEvent], Any], llm_client) -> Dict[str, Any]:
-    payload = {
-        "meta": {"user_display_name": state.get("profile", {}).get("nickname") or state.get("profile", {}).get("name") or "朋友",
-                 "session_id": state.get("session_id", "S-unknown"),
-                 "report_date": state.get("report_date", "")},
-        "profile": state.get("profile", {}),
-        "dim_scores": state.get("dim_scores", {}),
-        "severity": state.get("severity", {}),
-        "overall_score": state.get("overall_score"),
-        "overall_severity": state.get("overall_severity"),
-        "interventions": state.get("interventions", []),
-        "guidance": {"tone": "温和、可操作"},
-        "thresholds": {"severe": 2.5, "moderate": 3.5},
-    }
-    prompt = render_prompt("report_writer", payload)
+logger = logging.getLogger(__name__)
+
+DEFAULT_REPORT_CONCURRENCY = 4
+
+
+async def run_report_writer(
+    state: Dict[str, Any],
+    emit: Callable[[StreamEvent], Any],
+    llm_client,
+    concurrency: int = DEFAULT_REPORT_CONCURRENCY,
+    cached_report: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """cached_report：输入指纹命中的已存报告，直接按小节回放，不调用 LLM"""
     await emit(StreamEvent(type=StreamEventType.node_start, payload={"stage": "ReportWriter"}))
 
-    def _on_tok(tok: str):
-        asyncio.create_task(emit(StreamEvent(type=StreamEventType.token, payload={"text": tok}, node="ReportWriter")))
+    # 1) 确定性骨架：header / 分数表 / 干预步骤本地渲染，立即推送
+    report = build_report_skeleton(state)
+    if cached_report:
+        header = {**cached_report.get("header", {}),
+                  "session_id": report["header"]["session_id"], "report_date": report["header"]["report_date"]}
+        report = {**cached_report, "header": header}
+    await emit(StreamEvent(type=StreamEventType.summary, payload={
+        "report_header": report["header"],
+        "score_table": report["score_table"],
+        "plans": report["plans"],
+        "section_order": report["section_order"],
+    }))
+
+    # 2) 叙述小节（每维度一节 + 总结）并发生成，谁先完成先推送；总耗时≈最慢的一节
+    sem = asyncio.Semaphore(max(1, int(concurrency)))
+
+    async def _section(spec: Dict[str, Any]) -> None:
+        sid = spec["section_id"]
+        async with sem:
+            try:
+                prompt = render_prompt(spec["prompt"], spec["payload"])
+                async with TokenEmitter(emit, node=f"ReportWriter:{sid}") as tokens:
+                    data = await acall_json_with_stream(llm_client, prompt, on_token=tokens.push)
+                if not data.get("content"):
+                    raise ValueError("empty section content")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Report section {sid} failed, using fallback: {e}")
+                data = fallback_section(spec)
+        report["sections"][sid] = data
+        await emit(StreamEvent(type=StreamEventType.state, payload={"report_section": {"id": sid, **data}}))
 
-    data = call_json_with_stream_legacy(llm_client, prompt, on_token=_on_tok)
-    state["report"] = data
+    if cached_report:
+        for sid in report["section_order"]:
+            data = report["sections"].get(sid) or {}
+            await emit(StreamEvent(type=StreamEventType.state, payload={"report_section": {"id": sid, **data}}))
+    else:
+        await asyncio.gather(*(_section(spec) for spec in section_payloads(state, report)))
+    state["report"] = report
 
-    await emit(StreamEvent(type=StreamEventType.summary, payload={"report_header": data.get("header", {})}))
     await emit(StreamEvent(type=StreamEventType.node_end, payload={"stage": "ReportWriter"}))
-    return state
\ No newline at end of file
+    return state
@@ -1,8 +1,13 @@
 from __future__ import annotations
 import asyncio
 from typing import Any, Dict, Callable
-from utils.prompt_utils import render_prompt, call_json_with_stream_legacy
+from utils.prompt_utils import render_prompt
+from llms.adapter import acall_json_with_stream
 from services.event_types import StreamEvent, StreamEventType
+from services.token_emitter import TokenEmitter
+from services.likert_rules import prescore_reply, PRESCORE_THRESHOLD
+from services.scorer_memo import get_scorer_memo
+from services.aggregator import new_running_aggregate, update_running_aggregate, snapshot
 
 async def run_scorer(state: Dict[str, Any], emit: Callable[[StreamEvent], Any], llm_client) -> Dict[str, Any]:
     idx = int(state.get("q_index", 0))
@@ -11,20 +16,35 @@ async def run_scorer(state: Dict[str, Any], emit: Callable[[StreamEvent], Any],
         return state
     item = plan[idx]
 
-    prompt = render_prompt("scorer", {
-        "question_id": item.get("question_id"),
-        "question_text": item.get("question_text"),
-        "reverse_scored": item.get("reverse_scored", False),
-        "user_reply": state.get("last_user_reply", ""),
-        "clarify": state.get("clarify"),
-        "confidence_threshold": state.get("confidence_threshold", 0.6),
-    })
     await emit(StreamEvent(type=StreamEventType.node_start, payload={"stage": "Scorer", "q_index": idx}))
 
-    def _on_tok(tok: str):
-        asyncio.create_task(emit(StreamEvent(type=StreamEventType.token, payload={"text": tok}, node="Scorer")))
+    # 1) 本地规则预打分：数字作答 / 澄清选择 / 高置信词表，达到阈值则不调用 LLM
+    user_reply = state.get("last_user_reply", "")
+    data = prescore_reply(user_reply, state.get("clarify"))
+    if not data or data["confidence"] < float(state.get("prescore_threshold", PRESCORE_THRESHOLD)):
+        data = None
+
+    # 2) 跨会话备忘录：同题同（归一化）回复直接复用历史 LLM 结果；澄清回合依赖上下文，不查
+    # SQLite 读写在线程池里做，不阻塞事件循环（见 scorer_memo.py）
+    memo = await asyncio.to_thread(get_scorer_memo) if not state.get("clarify") else None
+    if data is None and memo is not None:
+        data = await memo.aget(item.get("question_id"), bool(item.get("reverse_scored", False)), user_reply)
 
-    data = call_json_with_stream_legacy(llm_client, prompt, on_token=_on_tok)
+    if data is None:
+        # 3) 回落 LLM
+        prompt = render_prompt("scorer", {
+            "question_id": item.get("question_id"),
+            "question_text": item.get("question_text"),
+            "reverse_scored": item.get("reverse_scored", False),
+            "user_reply": user_reply,
+            "clarify": state.get("clarify"),
+            "confidence_threshold": state.get("confidence_threshold", 0.6),
+        })
+
+        async with TokenEmitter(emit, node="Scorer") as tokens:
+            data = await acall_json_with_stream(llm_client, prompt, on_token=tokens.push, cache=True)
+        if memo is not None and data:
+            await memo.aput(item.get("question_id"), bool(item.get("reverse_scored", False)), user_reply, data)
 
     raw_score = float(data.get("score", 3))
     score = 6 - raw_score if item.get("reverse_scored", False) else raw_score
@@ -36,6 +56,7 @@ async def run_scorer(state: Dict[str, Any], emit: Callable[[StreamEvent], Any],
         "confidence": float(data.get("confidence", 0.0)),
         "needs_clarify": bool(data.get("needs_clarify", False)),
         "method": data.get("method", "nl_infer"),
+        "evidence": data.get("evidence") or [],
     }
     state["last_score"] = record
     state.setdefault("answers", []).append({
@@ -52,6 +73,11 @@ async def run_scorer(state: Dict[str, Any], emit: Callable[[StreamEvent], Any],
         "weight": item.get("weight", 1.0),
     })
 
+    # 增量聚合：O(1) 更新维度累加器（重打同一题会替换旧分），并推送实时进度
+    agg = state.setdefault("agg", new_running_aggregate())
+    update_running_aggregate(agg, item.get("question_id"), item.get("dimension"), score, item.get("weight", 1.0))
+
     await emit(StreamEvent(type=StreamEventType.score, payload=record))
+    await emit(StreamEvent(type=StreamEventType.state, payload={"progress": snapshot(agg)}))
     await emit(StreamEvent(type=StreamEventType.node_end, payload={"stage": "Scorer"}))
     return state
\ No newline at end of file
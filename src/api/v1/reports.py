@@ -0,0 +1,21 @@
+"""
+报告查询接口
+GET /api/v1/sessions/{session_id}/report  -> 该会话最新版本报告（一次索引查询，不触发生成）
+"""
+
+from __future__ import annotations
+
+from fastapi import APIRouter, HTTPException
+
+from services.report_store import get_latest_report
+
+router = APIRouter(tags=["reports"])
+
+
+@router.get("/sessions/{session_id}/report")
+def latest_report(session_id: str):
+    # 同步 def：FastAPI 放到线程池执行，不阻塞事件循环
+    report = get_latest_report(session_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="report not found")
+    return report
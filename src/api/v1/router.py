@@ -0,0 +1,9 @@
+from __future__ import annotations
+from fastapi import APIRouter
+
+from api.v1.reports import router as reports_router
+from api.v1.stream import router as stream_router
+
+api_router = APIRouter()
+api_router.include_router(reports_router)
+api_router.include_router(stream_router)
@@ -0,0 +1,210 @@
+"""
+SSE 流式接口：运行评估图的一个回合，并把节点事件实时推给客户端
+POST /api/v1/sessions/{session_id}/turn/stream   body: {"message": "..."}
+    启动本回合（同一会话同时只允许一个进行中的回合），流式返回事件直到回合结束
+GET  /api/v1/sessions/{session_id}/events/stream (Last-Event-ID: <seq>)
+    断线重连：从会话事件环形缓冲回放 seq 之后的事件；回合仍在进行则继续实时推送
+POST /api/v1/sessions/{session_id}/turn/cancel
+    主动取消进行中的回合（效果同 POST 连接断开）
+
+帧格式：
+    id: <seq>            会话内递增，重连时作为 Last-Event-ID
+    event: <type>        token / node_start / node_end / score / summary / state / end / error / cancelled
+    data: {"seq", "ts", "node", "type", "payload"}
+- 每个连接一个有界队列（sse_queue_size）；慢客户端不阻塞节点，溢出后按 seq 从缓冲补齐
+- 无事件 sse_heartbeat_interval 秒发一次注释心跳（": ping"），同时检查客户端是否已断开
+- POST 连接断开即取消本回合：CancelledError 传到正在进行的 LLM 流式调用，停止生成
+"""
+
+from __future__ import annotations
+
+import json
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+from fastapi import APIRouter, Body, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from config.settings import get_settings
+# 与节点使用同一个模块路径，保证拿到同一个事件缓冲单例
+from src.services.event_sink import get_event_sink
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["stream"])
+
+DEFAULT_TYPES = ("token", "node_start", "node_end", "score", "summary", "state")
+_TERMINAL_TYPES = ("end", "error", "cancelled")
+
+_runs: Dict[str, asyncio.Task] = {}
+_app: Any = None
+
+
+def _get_app():
+    """编译后的评估图（带 checkpointer，回合之间按 thread_id=session_id 恢复状态）"""
+    global _app
+    if _app is None:
+        from src.graph.builder import build_assessment_graph
+        from src.db.checkpointer import build_checkpointer
+
+        _app = build_assessment_graph(checkpointer=build_checkpointer())
+    return _app
+
+
+def _turn_summary(result: Dict[str, Any]) -> Dict[str, Any]:
+    reply = None
+    for msg in reversed(result.get("messages") or []):
+        if getattr(msg, "type", None) == "ai" or (isinstance(msg, dict) and msg.get("role") == "assistant"):
+            reply = getattr(msg, "content", None) if not isinstance(msg, dict) else msg.get("content")
+            break
+    return {
+        "reply": reply,
+        "awaiting_user_reply": bool(result.get("awaiting_user_reply")),
+        "q_index": result.get("q_index"),
+        "plan_finished": bool(result.get("plan_finished")),
+        "has_report": bool(result.get("report")),
+    }
+
+
+async def _run_turn(session_id: str, message: str) -> None:
+    sink = get_event_sink()
+    config = {"configurable": {"thread_id": session_id}}
+    try:
+        result = await _get_app().ainvoke({
+            "session_id": session_id,
+            "last_user_reply": message,
+            "messages": [{"role": "user", "content": message}],
+        }, config)
+        sink.record(session_id, "graph", {"type": "end", "payload": _turn_summary(result or {})})
+    except asyncio.CancelledError:
+        sink.record(session_id, "graph", {"type": "cancelled", "payload": {}})
+        raise
+    except Exception as e:
+        logger.exception(f"Turn failed for session {session_id}")
+        sink.record(session_id, "graph", {"type": "error", "payload": {"message": str(e)}})
+    finally:
+        _runs.pop(session_id, None)
+
+
+def _frame(rec: Dict[str, Any]) -> str:
+    data = json.dumps(rec, ensure_ascii=False, default=str)
+    return f"id: {rec['seq']}\nevent: {rec['type']}\ndata: {data}\n\n"
+
+
+async def _event_stream(
+    request: Request,
+    session_id: str,
+    since_seq: int,
+    types: Set[str],
+    message: Optional[str] = None,
+) -> AsyncIterator[str]:
+    """
+    message 不为 None 时由本连接发起并拥有回合（POST，since_seq 取订阅时缓冲的最后 seq），否则只跟随事件（重连）。
+    订阅与启动回合都放在响应体开始之后：客户端在此之前断开时，没有泄漏的订阅，也没有无人取消的回合
+    """
+    settings = get_settings()
+    sink = get_event_sink()
+    run: Optional[asyncio.Task] = None
+    if message is not None and session_id in _runs:
+        # 两个 POST 都通过了路由里的检查，后开始的这个让位
+        payload = {"type": "error", "payload": {"message": "a turn is already running for this session"}}
+        yield f"event: error\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+        return
+    # 先订阅再启动回合，回合的第一个事件也不会错过；到下面 try 之间没有 await
+    sub = sink.subscribe(session_id, settings.sse_queue_size)
+    if message is not None:
+        since_seq = sink.last_seq(session_id)
+        run = asyncio.create_task(_run_turn(session_id, message))
+        _runs[session_id] = run
+        # 回合还没开始执行就被取消时 _run_turn 的 finally 不会运行，这里兜底释放会话
+        run.add_done_callback(lambda t: _runs.pop(session_id, None) if _runs.get(session_id) is t else None)
+    last = since_seq
+    finished = False
+    replay = True
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            # 回放（Last-Event-ID）/ 溢出补齐：从环形缓冲读取 last 之后的事件
+            if replay or sub.overflowed:
+                replay = False
+                sub.drain()
+                for rec in sink.query(session_id, since_seq=last):
+                    last = rec["seq"]
+                    if rec["type"] in types or rec["type"] in _TERMINAL_TYPES:
+                        yield _frame(rec)
+                    finished = rec["type"] in _TERMINAL_TYPES
+                # 缓冲里最后一个事件已是回合结束、且没有进行中的回合：没有可跟随的实时事件
+                if (finished or run is None) and session_id not in _runs:
+                    return
+                finished = False
+            try:
+                rec = await asyncio.wait_for(sub.get(), timeout=settings.sse_heartbeat_interval)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    return
+                yield ": ping\n\n"
+                continue
+            if rec["seq"] <= last:
+                continue
+            last = rec["seq"]
+            if rec["type"] in types or rec["type"] in _TERMINAL_TYPES:
+                yield _frame(rec)
+            if rec["type"] in _TERMINAL_TYPES:
+                finished = True
+                return
+    finally:
+        sink.unsubscribe(sub)
+        # 客户端断开（生成器被取消/提前关闭）且回合仍在进行：取消回合，停止 LLM 生成
+        if run is not None and not finished and not run.done():
+            logger.info(f"SSE client disconnected, cancelling turn for session {session_id}")
+            run.cancel()
+
+
+def _parse_types(types: Optional[str]) -> Set[str]:
+    return {t.strip() for t in types.split(",") if t.strip()} if types else set(DEFAULT_TYPES)
+
+
+def _sse_response(gen: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(gen, media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "Connection": "keep-alive",
+        "X-Accel-Buffering": "no",   # 关闭反向代理缓冲，token 立即下发
+    })
+
+
+@router.post("/sessions/{session_id}/turn/stream")
+async def stream_turn(
+    request: Request,
+    session_id: str,
+    message: str = Body(..., embed=True),
+    types: Optional[str] = Query(None, description="逗号分隔的事件类型，默认 token/node_start/node_end/score/summary/state"),
+):
+    if session_id in _runs:
+        raise HTTPException(status_code=409, detail="a turn is already running for this session")
+    return _sse_response(_event_stream(request, session_id, 0, _parse_types(types), message))
+
+
+@router.get("/sessions/{session_id}/events/stream")
+async def stream_events(
+    request: Request,
+    session_id: str,
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    types: Optional[str] = Query(None),
+):
+    try:
+        since = int(last_event_id) if last_event_id else 0
+    except ValueError:
+        since = 0
+    # 重连不拥有回合：断开时不取消（回合由发起它的 POST 连接负责）
+    return _sse_response(_event_stream(request, session_id, since, _parse_types(types)))
+
+
+@router.post("/sessions/{session_id}/turn/cancel")
+async def cancel_turn(session_id: str):
+    run = _runs.get(session_id)
+    if run is None or run.done():
+        raise HTTPException(status_code=404, detail="no running turn for this session")
+    # 取消沿 ainvoke -> 节点 -> adapter 流式调用传播：关闭提供方流，节点记录 cancelled 日志
+    run.cancel()
+    return {"cancelled": True}
@@ -0,0 +1,96 @@
+from __future__ import annotations
+from typing import Dict, Any, List, Optional
+from sqlalchemy import select, func, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.models import User, Session, Answer, ItemScore, ReportVersion
+from db.repository import BULK_MODELS, message_row, execution_log_row, answer_row, item_score_row
+
+class AsyncRepo:
+    """Repo 的异步版本：方法一一对应，语义相同（只 add/查询，由调用方 commit）"""
+
+    def __init__(self, sa: AsyncSession):
+        self.sa = sa
+
+    # --- 用户/会话 ---
+    async def ensure_user(self, user_id: str) -> User:
+        u = await self.sa.get(User, user_id)
+        if not u:
+            u = User(user_id=user_id)
+            self.sa.add(u)
+        return u
+
+    async def ensure_session(self, session_id: str, user_id: str) -> Session:
+        s = await self.sa.get(Session, session_id)
+        if not s:
+            s = Session(session_id=session_id, user_id=user_id)
+            self.sa.add(s)
+        return s
+
+    async def update_session_status(self, session_id: str, status: str):
+        s = await self.sa.get(Session, session_id)
+        if s:
+            s.status = status
+
+    # --- 消息 & 执行日志 ---
+    async def append_messages(self, session_id: str, messages: List[Dict[str, Any]]):
+        await self.bulk_insert("messages", [message_row(session_id, m) for m in messages])
+
+    async def append_execution_logs(self, session_id: str, logs: List[Dict[str, Any]]):
+        await self.bulk_insert("execution_logs", [execution_log_row(session_id, rec) for rec in logs])
+
+    async def bulk_insert(self, kind: str, rows: List[Dict[str, Any]]) -> int:
+        if rows:
+            await self.sa.execute(insert(BULK_MODELS[kind]), rows)
+        return len(rows)
+
+    # --- 答案/打分 ---
+    async def append_answer(self, session_id: str, ans: Dict[str, Any]):
+        self.sa.add(Answer(**answer_row(session_id, ans)))
+
+    async def append_item_score(self, session_id: str, item: Dict[str, Any]):
+        self.sa.add(ItemScore(**item_score_row(session_id, item)))
+
+    # --- 报告版本 ---
+    async def next_report_version_no(self, session_id: str) -> int:
+        q = (await self.sa.execute(
+            select(func.coalesce(func.max(ReportVersion.version_no), 0)).where(ReportVersion.session_id == session_id)
+        )).scalar_one()
+        return int(q) + 1
+
+    async def latest_report_version(self, session_id: str) -> Optional[ReportVersion]:
+        return (await self.sa.execute(
+            select(ReportVersion)
+            .where(ReportVersion.session_id == session_id)
+            .order_by(ReportVersion.version_no.desc())
+            .limit(1)
+        )).scalar_one_or_none()
+
+    async def find_report_version(self, session_id: str, fingerprint: str) -> Optional[ReportVersion]:
+        return (await self.sa.execute(
+            select(ReportVersion)
+            .where(ReportVersion.session_id == session_id, ReportVersion.input_fingerprint == fingerprint)
+            .order_by(ReportVersion.version_no.desc())
+            .limit(1)
+        )).scalar_one_or_none()
+
+    async def create_report_version(self, session_id: str, payload: Dict[str, Any]) -> ReportVersion:
+        fingerprint = payload.get("input_fingerprint")
+        if fingerprint:
+            existing = await self.find_report_version(session_id, fingerprint)
+            if existing is not None:
+                return existing
+        ver = await self.next_report_version_no(session_id)
+        rv = ReportVersion(
+            session_id=session_id,
+            version_no=ver,
+            profile=payload.get("profile"),
+            dim_scores=payload.get("dim_scores"),
+            overall_score=payload.get("overall_score"),
+            overall_severity=payload.get("overall_severity"),
+            interventions=payload.get("interventions"),
+            report_json=payload.get("report"),
+            input_fingerprint=fingerprint,
+            prompt_version=payload.get("prompt_version"),
+        )
+        self.sa.add(rv)
+        return rv
@@ -0,0 +1,70 @@
+"""
+异步引擎 / 会话工厂（FastAPI 路由与 async 图节点使用，避免同步 IO 阻塞事件循环）
+- URL：Settings.async_database_url；为空时由 database_url 推导
+    postgresql:// / postgresql+psycopg2://  -> postgresql+asyncpg://
+    postgresql+psycopg://                   -> 不变（psycopg 3 同一方言同时支持 async）
+    sqlite:///x.db                          -> sqlite+aiosqlite:///x.db（本地运行）
+- 连接池参数与同步引擎一致（db_pool_size / db_max_overflow / db_pool_recycle / db_pool_timeout）
+- 引擎懒创建：只用同步路径时不需要安装 asyncpg / aiosqlite
+
+用法：
+    async with get_async_sessionmaker()() as sa:
+        repo = AsyncRepo(sa)
+        await repo.append_item_score(session_id, item)
+        await sa.commit()
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Optional
+
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+
+from config.settings import get_settings
+from db.pool import engine_kwargs
+
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    if not sep:
+        return url
+    return f"{_ASYNC_DRIVERS.get(scheme, scheme)}://{rest}"
+
+
+_async_engine: Optional[AsyncEngine] = None
+_async_sessionmaker: Optional[Any] = None
+_lock = threading.Lock()
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine, _async_sessionmaker
+    if _async_engine is None:
+        with _lock:
+            if _async_engine is None:
+                settings = get_settings()
+                url = settings.async_database_url or to_async_url(settings.database_url)
+                _async_engine = create_async_engine(url, **engine_kwargs(url, settings, is_async=True))
+                _async_sessionmaker = async_sessionmaker(_async_engine, expire_on_commit=False, autoflush=False)
+    return _async_engine
+
+
+def get_async_sessionmaker() -> Any:
+    get_async_engine()
+    return _async_sessionmaker
+
+
+async def dispose_async_engine() -> None:
+    """应用关闭时释放连接池"""
+    global _async_engine, _async_sessionmaker
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_sessionmaker = None
@@ -0,0 +1,122 @@
+"""
+持久化基准：同步 Repo（asyncio.to_thread）vs 原生 AsyncRepo，并发会话写入
+每个会话：ensure_user/ensure_session 后逐条写 item_score + execution_log，每条提交一次
+（模拟图节点逐题落库）。
+
+    python -m db.benchmark --sessions 50 --writes 20 [--database-url sqlite:///bench.db]
+
+不传 --database-url 时使用临时 SQLite 文件（sync: sqlite，async: aiosqlite）。
+"""
+
+from __future__ import annotations
+
+import os
+import time
+import json
+import asyncio
+import argparse
+import tempfile
+from typing import Any, Dict
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from config.settings import get_settings
+from db.models import Base
+from db.repository import Repo
+from db.async_repository import AsyncRepo
+from db.pool import engine_kwargs
+from db.async_session import to_async_url
+
+
+def _write_sync(SessionLocal: Any, sid: str, writes: int) -> None:
+    with SessionLocal() as sa:
+        repo = Repo(sa)
+        repo.ensure_user(f"U-{sid}")
+        repo.ensure_session(sid, f"U-{sid}")
+        sa.commit()
+        for i in range(writes):
+            repo.append_item_score(sid, {"question_id": f"Q{i}", "dimension": "communication", "score": 3})
+            repo.append_execution_logs(sid, [{"node": "scorer", "i": i}])
+            sa.commit()
+
+
+async def _write_async(AsyncSessionLocal: Any, sid: str, writes: int) -> None:
+    async with AsyncSessionLocal() as sa:
+        repo = AsyncRepo(sa)
+        await repo.ensure_user(f"U-{sid}")
+        await repo.ensure_session(sid, f"U-{sid}")
+        await sa.commit()
+        for i in range(writes):
+            await repo.append_item_score(sid, {"question_id": f"Q{i}", "dimension": "communication", "score": 3})
+            await repo.append_execution_logs(sid, [{"node": "scorer", "i": i}])
+            await sa.commit()
+
+
+async def _loop_lag(stop: asyncio.Event) -> float:
+    """基准期间事件循环的最大调度延迟（同步 IO 阻塞循环时会明显变大）"""
+    worst = 0.0
+    while not stop.is_set():
+        t = time.perf_counter()
+        await asyncio.sleep(0.005)
+        worst = max(worst, time.perf_counter() - t - 0.005)
+    return worst
+
+
+async def run_benchmark(database_url: str, sessions: int, writes: int) -> Dict[str, Any]:
+    settings = get_settings()
+    sync_engine = create_engine(database_url, **engine_kwargs(database_url, settings))
+    Base.metadata.create_all(sync_engine)
+    SessionLocal = sessionmaker(bind=sync_engine, autoflush=False, future=True)
+
+    async_url = to_async_url(database_url)
+    async_engine = create_async_engine(async_url, **engine_kwargs(async_url, settings, is_async=True))
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
+    out: Dict[str, Any] = {"sessions": sessions, "writes_per_session": writes}
+    for mode in ("sync_threadpool", "async"):
+        stop = asyncio.Event()
+        lag_task = asyncio.create_task(_loop_lag(stop))
+        t0 = time.perf_counter()
+        if mode == "sync_threadpool":
+            await asyncio.gather(*(asyncio.to_thread(_write_sync, SessionLocal, f"S-sync-{n}", writes)
+                                   for n in range(sessions)))
+        else:
+            await asyncio.gather(*(_write_async(AsyncSessionLocal, f"S-async-{n}", writes)
+                                   for n in range(sessions)))
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        total = sessions * writes
+        out[mode] = {
+            "seconds": round(elapsed, 3),
+            "writes_per_s": round(total / elapsed, 1) if elapsed > 0 else None,
+            "max_loop_lag_ms": round(await lag_task * 1000, 2),
+        }
+
+    await async_engine.dispose()
+    sync_engine.dispose()
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="同步 Repo(线程池) vs AsyncRepo 并发写入基准")
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--writes", type=int, default=20)
+    parser.add_argument("--database-url", default=None, help="默认使用临时 SQLite 文件")
+    args = parser.parse_args()
+    url = args.database_url
+    tmp = None
+    if not url:
+        fd, tmp = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        url = f"sqlite:///{tmp}"
+    try:
+        print(json.dumps(asyncio.run(run_benchmark(url, args.sessions, args.writes)), ensure_ascii=False, indent=2))
+    finally:
+        if tmp:
+            os.remove(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+"""
+LangGraph checkpointer（SQLAlchemy：Postgres / 本地 SQLite）
+- 按 thread_id 恢复会话，调用方不再需要自己携带完整 TaskExecutionState
+- 写放大有界：每一步只存相对 parent 的增量
+    * append-only 列表（messages / execution_log / answers / item_scores）只存新增尾部
+    * 其余通道只存变化的值
+  每 compact_every 步写一次完整快照（base），恢复时最多回放 compact_every-1 个增量
+- prune() 可清理旧快照链；auto_prune=True 时每写一个新 base 就保留最近 keep_bases 条链
+
+用法：
+    from src.db.checkpointer import build_checkpointer
+    app = build_assessment_graph(checkpointer=build_checkpointer())          # 使用 Settings.database_url
+    app = build_assessment_graph(checkpointer=build_checkpointer("sqlite:///var/checkpoints.sqlite3"))
+"""
+
+from __future__ import annotations
+
+import copy
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import create_engine, select, delete
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import BaseCheckpointSaver, CheckpointTuple
+
+from .models import Base, GraphCheckpoint, GraphCheckpointWrite
+
+logger = logging.getLogger(__name__)
+
+APPEND_ONLY_CHANNELS = ("messages", "execution_log", "answers", "item_scores")
+
+_MISSING = object()
+
+
+def _diff_values(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """计算 new 相对 old 的增量：{"set": {...}, "append": {...}, "removed": [...]}"""
+    delta: Dict[str, Any] = {"set": {}, "append": {}, "removed": [k for k in old if k not in new]}
+    for key, value in new.items():
+        prev = old.get(key, _MISSING)
+        if prev is value:
+            continue
+        if (
+            key in APPEND_ONLY_CHANNELS
+            and isinstance(prev, list) and isinstance(value, list)
+            and len(value) >= len(prev)
+            and value[:len(prev)] == prev
+        ):
+            if len(value) > len(prev):
+                delta["append"][key] = value[len(prev):]
+            continue
+        if prev is _MISSING or prev != value:
+            delta["set"][key] = value
+    return delta
+
+
+def _apply_delta(values: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    for key in delta.get("removed", []):
+        values.pop(key, None)
+    for key, tail in delta.get("append", {}).items():
+        values[key] = list(values.get(key) or []) + list(tail)
+    values.update(delta.get("set", {}))
+    return values
+
+
+class SQLCheckpointSaver(BaseCheckpointSaver):
+    def __init__(
+        self,
+        engine: Engine,
+        compact_every: int = 20,
+        auto_prune: bool = False,
+        keep_bases: int = 2,
+        cache_threads: int = 1024,
+        serde: Any = None,
+    ) -> None:
+        super().__init__(serde=serde)
+        self.engine = engine
+        self.Session = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+        self.compact_every = max(1, int(compact_every))
+        self.auto_prune = auto_prune
+        self.keep_bases = max(1, int(keep_bases))
+        # 每个 (thread_id, ns) 最近一次写入的 channel_values，避免每步回放增量链
+        self._last: "OrderedDict[Tuple[str, str], Tuple[str, GraphCheckpoint, Dict[str, Any]]]" = OrderedDict()
+        self._cache_threads = cache_threads
+        self._lock = threading.Lock()
+
+    def setup(self) -> None:
+        Base.metadata.create_all(self.engine, tables=[GraphCheckpoint.__table__, GraphCheckpointWrite.__table__])
+
+    # === 内部工具 ===
+    @staticmethod
+    def _ids(config: RunnableConfig) -> Tuple[str, str, Optional[str]]:
+        conf = config.get("configurable", {})
+        return str(conf["thread_id"]), conf.get("checkpoint_ns", ""), conf.get("checkpoint_id")
+
+    def _remember(self, thread_id: str, ns: str, row: GraphCheckpoint, values: Dict[str, Any]) -> None:
+        # 深拷贝：节点会原地修改列表 / 字典（setdefault(...).append），缓存若与 live state 共享对象，
+        # 下一步 diff 时 parent 与新值相同，增量为空，重建出的 state 会丢写入
+        values = copy.deepcopy(values)
+        with self._lock:
+            self._last[(thread_id, ns)] = (row.checkpoint_id, row, values)
+            self._last.move_to_end((thread_id, ns))
+            while len(self._last) > self._cache_threads:
+                self._last.popitem(last=False)
+
+    def _load_row(self, sa, thread_id: str, ns: str, checkpoint_id: Optional[str]) -> Optional[GraphCheckpoint]:
+        q = select(GraphCheckpoint).where(GraphCheckpoint.thread_id == thread_id, GraphCheckpoint.checkpoint_ns == ns)
+        if checkpoint_id:
+            q = q.where(GraphCheckpoint.checkpoint_id == checkpoint_id)
+        else:
+            q = q.order_by(GraphCheckpoint.checkpoint_id.desc()).limit(1)
+        return sa.execute(q).scalars().first()
+
+    def _values_for(self, sa, row: GraphCheckpoint) -> Dict[str, Any]:
+        """从 base 快照开始回放增量链，得到 row 对应的完整 channel_values"""
+        cached = self._last.get((row.thread_id, row.checkpoint_ns))
+        if cached and cached[0] == row.checkpoint_id:
+            return copy.deepcopy(cached[2])   # 调用方（LangGraph）会原地修改，不能把缓存对象交出去
+
+        chain: List[GraphCheckpoint] = [row]
+        if row.depth > 0:
+            rows = sa.execute(select(GraphCheckpoint).where(
+                GraphCheckpoint.thread_id == row.thread_id,
+                GraphCheckpoint.checkpoint_ns == row.checkpoint_ns,
+                GraphCheckpoint.base_checkpoint_id == row.base_checkpoint_id,
+            )).scalars().all()
+            by_id = {r.checkpoint_id: r for r in rows}
+            cur = row
+            while cur.depth > 0:
+                cur = by_id[cur.parent_checkpoint_id]
+                chain.append(cur)
+
+        values: Dict[str, Any] = {}
+        for r in reversed(chain):
+            payload = self.serde.loads_typed((r.payload_type, r.payload))
+            if r.depth == 0:
+                values = dict(payload.get("values") or {})
+            else:
+                _apply_delta(values, payload)
+        return values
+
+    def _to_tuple(self, sa, row: GraphCheckpoint) -> CheckpointTuple:
+        payload = self.serde.loads_typed((row.payload_type, row.payload))
+        checkpoint = dict(payload["checkpoint"])
+        checkpoint["channel_values"] = self._values_for(sa, row)
+        writes = sa.execute(select(GraphCheckpointWrite).where(
+            GraphCheckpointWrite.thread_id == row.thread_id,
+            GraphCheckpointWrite.checkpoint_ns == row.checkpoint_ns,
+            GraphCheckpointWrite.checkpoint_id == row.checkpoint_id,
+        ).order_by(GraphCheckpointWrite.task_id, GraphCheckpointWrite.idx)).scalars().all()
+        config = {"configurable": {
+            "thread_id": row.thread_id, "checkpoint_ns": row.checkpoint_ns, "checkpoint_id": row.checkpoint_id,
+        }}
+        parent = None
+        if row.parent_checkpoint_id:
+            parent = {"configurable": {
+                "thread_id": row.thread_id, "checkpoint_ns": row.checkpoint_ns,
+                "checkpoint_id": row.parent_checkpoint_id,
+            }}
+        return CheckpointTuple(
+            config=config,
+            checkpoint=checkpoint,
+            metadata=self.serde.loads_typed((row.metadata_type, row.metadata_blob)),
+            parent_config=parent,
+            pending_writes=[
+                (w.task_id, w.channel, self.serde.loads_typed((w.value_type, w.value))) for w in writes
+            ],
+        )
+
+    # === BaseCheckpointSaver API ===
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id, ns, checkpoint_id = self._ids(config)
+        with self.Session() as sa:
+            row = self._load_row(sa, thread_id, ns, checkpoint_id)
+            return self._to_tuple(sa, row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        with self.Session() as sa:
+            q = select(GraphCheckpoint)
+            if config:
+                thread_id, ns, checkpoint_id = self._ids(config)
+                q = q.where(GraphCheckpoint.thread_id == thread_id, GraphCheckpoint.checkpoint_ns == ns)
+                if checkpoint_id:
+                    q = q.where(GraphCheckpoint.checkpoint_id == checkpoint_id)
+            if before:
+                q = q.where(GraphCheckpoint.checkpoint_id < before["configurable"]["checkpoint_id"])
+            q = q.order_by(GraphCheckpoint.checkpoint_id.desc())
+            count = 0
+            for row in sa.execute(q).scalars():
+                tup = self._to_tuple(sa, row)
+                if filter and any(tup.metadata.get(k) != v for k, v in filter.items()):
+                    continue
+                yield tup
+                count += 1
+                if limit is not None and count >= limit:
+                    break
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Dict[str, Any],
+        metadata: Dict[str, Any],
+        new_versions: Dict[str, Any],
+    ) -> RunnableConfig:
+        thread_id, ns, parent_id = self._ids(config)
+        values = dict(checkpoint.get("channel_values") or {})
+        header = {k: v for k, v in checkpoint.items() if k != "channel_values"}
+
+        with self.Session() as sa:
+            parent_row: Optional[GraphCheckpoint] = None
+            parent_values: Optional[Dict[str, Any]] = None
+            if parent_id:
+                cached = self._last.get((thread_id, ns))
+                if cached and cached[0] == parent_id:
+                    parent_row, parent_values = cached[1], cached[2]
+                else:
+                    parent_row = self._load_row(sa, thread_id, ns, parent_id)
+                    if parent_row is not None:
+                        parent_values = self._values_for(sa, parent_row)
+
+            if parent_row is None or parent_row.depth + 1 >= self.compact_every:
+                payload = {"checkpoint": header, "values": values}
+                base_id, depth = checkpoint["id"], 0
+            else:
+                payload = {"checkpoint": header, **_diff_values(parent_values or {}, values)}
+                base_id, depth = parent_row.base_checkpoint_id, parent_row.depth + 1
+
+            p_type, p_blob = self.serde.dumps_typed(payload)
+            m_type, m_blob = self.serde.dumps_typed(metadata)
+            row = GraphCheckpoint(
+                thread_id=thread_id,
+                checkpoint_ns=ns,
+                checkpoint_id=checkpoint["id"],
+                parent_checkpoint_id=parent_id,
+                base_checkpoint_id=base_id,
+                depth=depth,
+                payload_type=p_type,
+                payload=p_blob,
+                metadata_type=m_type,
+                metadata_blob=m_blob,
+            )
+            sa.merge(row)
+            sa.commit()
+
+        self._remember(thread_id, ns, row, values)
+        if depth == 0 and self.auto_prune:
+            self.prune(thread_id, ns)
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id, ns, checkpoint_id = self._ids(config)
+        with self.Session() as sa:
+            for idx, (channel, value) in enumerate(writes):
+                v_type, v_blob = self.serde.dumps_typed(value)
+                sa.merge(GraphCheckpointWrite(
+                    thread_id=thread_id, checkpoint_ns=ns, checkpoint_id=checkpoint_id,
+                    task_id=task_id, idx=idx, task_path=task_path,
+                    channel=channel, value_type=v_type, value=v_blob,
+                ))
+            sa.commit()
+
+    # 异步版本：目前走线程池（同步 engine），不阻塞事件循环
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Dict[str, Any],
+        metadata: Dict[str, Any],
+        new_versions: Dict[str, Any],
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    # === 维护 ===
+    def prune(self, thread_id: str, checkpoint_ns: str = "", keep_bases: Optional[int] = None) -> int:
+        """只保留最近 keep_bases 条快照链（base + 其增量），返回删除的 checkpoint 数"""
+        keep = keep_bases or self.keep_bases
+        with self.Session() as sa:
+            bases = sa.execute(
+                select(GraphCheckpoint.checkpoint_id).where(
+                    GraphCheckpoint.thread_id == thread_id,
+                    GraphCheckpoint.checkpoint_ns == checkpoint_ns,
+                    GraphCheckpoint.depth == 0,
+                ).order_by(GraphCheckpoint.checkpoint_id.desc())
+            ).scalars().all()
+            if len(bases) <= keep:
+                return 0
+            oldest_kept = bases[keep - 1]
+            stale = sa.execute(
+                select(GraphCheckpoint.checkpoint_id).where(
+                    GraphCheckpoint.thread_id == thread_id,
+                    GraphCheckpoint.checkpoint_ns == checkpoint_ns,
+                    GraphCheckpoint.base_checkpoint_id < oldest_kept,
+                )
+            ).scalars().all()
+            if stale:
+                sa.execute(delete(GraphCheckpointWrite).where(
+                    GraphCheckpointWrite.thread_id == thread_id,
+                    GraphCheckpointWrite.checkpoint_ns == checkpoint_ns,
+                    GraphCheckpointWrite.checkpoint_id.in_(stale),
+                ))
+                sa.execute(delete(GraphCheckpoint).where(
+                    GraphCheckpoint.thread_id == thread_id,
+                    GraphCheckpoint.checkpoint_ns == checkpoint_ns,
+                    GraphCheckpoint.checkpoint_id.in_(stale),
+                ))
+            sa.commit()
+            return len(stale)
+
+
+def build_checkpointer(database_url: Optional[str] = None, **kwargs: Any) -> SQLCheckpointSaver:
+    """
+    database_url 为空时复用 db/session.py 的 engine（Settings.database_url）；
+    传 sqlite:///... 时用于本地运行。会自动建表。
+    """
+    if database_url:
+        engine_kwargs: Dict[str, Any] = {"future": True}
+        if database_url.startswith("sqlite"):
+            engine_kwargs["connect_args"] = {"check_same_thread": False}
+        else:
+            engine_kwargs["pool_pre_ping"] = True
+        engine = create_engine(database_url, **engine_kwargs)
+    else:
+        from .session import engine
+    saver = SQLCheckpointSaver(engine, **kwargs)
+    saver.setup()
+    return saver
@@ -1,7 +1,8 @@
 from __future__ import annotations
 import uuid, datetime as dt
 from sqlalchemy import (
-    Column, String, Integer, DateTime, ForeignKey, Boolean, JSON, Float, Text, UniqueConstraint
+    Column, String, Integer, DateTime, ForeignKey, Boolean, JSON, Float, Text, UniqueConstraint,
+    LargeBinary, Index
 )
 from sqlalchemy.orm import declarative_base, relationship
 
@@ -79,8 +80,47 @@ class ReportVersion(Base):
     overall_severity = Column(String(32), nullable=True)
     interventions = Column(JSON, nullable=True)
     report_json = Column(JSON, nullable=True)  # 完整报告结构化 JSON
+    # 报告输入指纹：report_writer 全部输入 + prompt 版本的 sha256；相同指纹直接复用，不再调用 LLM
+    input_fingerprint = Column(String(64), nullable=True)
+    prompt_version = Column(String(32), nullable=True)
     created_at = Column(DateTime, default=dt.datetime.utcnow, nullable=False)
 
     __table_args__ = (
+        # 同时服务“按 session 取最新版本”（version_no 倒序取一条）
         UniqueConstraint("session_id", "version_no", name="uq_report_session_version"),
-    )
\ No newline at end of file
+        Index("ix_report_session_fingerprint", "session_id", "input_fingerprint"),
+    )
+
+class GraphCheckpoint(Base):
+    """
+    LangGraph checkpoint（见 db/checkpointer.py）
+    depth=0 为完整快照（base）；depth>0 为相对 parent 的增量，append-only 列表只存新增尾部。
+    """
+    __tablename__ = "graph_checkpoints"
+    thread_id = Column(String(128), primary_key=True)
+    checkpoint_ns = Column(String(128), primary_key=True, default="")
+    checkpoint_id = Column(String(64), primary_key=True)   # uuid6，按字典序即时间序
+    parent_checkpoint_id = Column(String(64), nullable=True)
+    base_checkpoint_id = Column(String(64), nullable=False)
+    depth = Column(Integer, nullable=False, default=0)
+    payload_type = Column(String(32), nullable=False)
+    payload = Column(LargeBinary, nullable=False)
+    metadata_type = Column(String(32), nullable=False)
+    metadata_blob = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=dt.datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_graph_checkpoints_chain", "thread_id", "checkpoint_ns", "base_checkpoint_id"),
+    )
+
+class GraphCheckpointWrite(Base):
+    __tablename__ = "graph_checkpoint_writes"
+    thread_id = Column(String(128), primary_key=True)
+    checkpoint_ns = Column(String(128), primary_key=True, default="")
+    checkpoint_id = Column(String(64), primary_key=True)
+    task_id = Column(String(64), primary_key=True)
+    idx = Column(Integer, primary_key=True)
+    task_path = Column(String(256), nullable=False, default="")
+    channel = Column(String(128), nullable=False)
+    value_type = Column(String(32), nullable=False)
+    value = Column(LargeBinary, nullable=False)
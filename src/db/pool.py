@@ -0,0 +1,18 @@
+from __future__ import annotations
+from typing import Any, Dict
+from config.settings import Settings
+
+
+def engine_kwargs(url: str, settings: Settings, is_async: bool = False) -> Dict[str, Any]:
+    """连接池参数（sync / async 引擎共用）；SQLite 不用 QueuePool 参数"""
+    kw: Dict[str, Any] = {"pool_pre_ping": True}
+    if not is_async:
+        kw["future"] = True
+    if not url.startswith("sqlite"):
+        kw.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_recycle=settings.db_pool_recycle,
+            pool_timeout=settings.db_pool_timeout,
+        )
+    return kw
@@ -1,9 +1,39 @@
 from __future__ import annotations
 from typing import Dict, Any, List, Optional
-from sqlalchemy import select, func
+from sqlalchemy import select, func, insert
 from sqlalchemy.orm import Session as SASession
 from db.models import User, Session, Message, Answer, ItemScore, ExecutionLog, ReportVersion
 
+# --- 行构造（Repo / AsyncRepo / 写后队列共用；批量写入走 insert().values 的 executemany） ---
+def message_row(session_id: str, m: Dict[str, Any]) -> Dict[str, Any]:
+    return {"session_id": session_id, "role": m["role"], "content": m["content"]}
+
+def execution_log_row(session_id: str, rec: Dict[str, Any]) -> Dict[str, Any]:
+    return {"session_id": session_id, "record": rec}
+
+def answer_row(session_id: str, ans: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "session_id": session_id,
+        "question_id": ans["question_id"],
+        "dimension": ans["dimension"],
+        "question_text": ans["text"],
+        "user_reply": ans["answer"],
+        "score": ans["score"],
+        "weight": ans.get("weight", 1.0),
+        "reverse_scored": bool(ans.get("reverse_scored", False)),
+    }
+
+def item_score_row(session_id: str, item: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "session_id": session_id,
+        "question_id": item["question_id"],
+        "dimension": item["dimension"],
+        "score": item["score"],
+        "weight": item.get("weight", 1.0),
+    }
+
+BULK_MODELS = {"messages": Message, "execution_logs": ExecutionLog, "answers": Answer, "item_scores": ItemScore}
+
 class Repo:
     def __init__(self, sa: SASession):
         self.sa = sa
@@ -30,34 +60,23 @@ class Repo:
 
     # --- 消息 & 执行日志 ---
     def append_messages(self, session_id: str, messages: List[Dict[str, Any]]):
-        for m in messages:
-            self.sa.add(Message(session_id=session_id, role=m["role"], content=m["content"]))
+        self.bulk_insert("messages", [message_row(session_id, m) for m in messages])
 
     def append_execution_logs(self, session_id: str, logs: List[Dict[str, Any]]):
-        for rec in logs:
-            self.sa.add(ExecutionLog(session_id=session_id, record=rec))
+        self.bulk_insert("execution_logs", [execution_log_row(session_id, rec) for rec in logs])
+
+    def bulk_insert(self, kind: str, rows: List[Dict[str, Any]]) -> int:
+        """一次 executemany 写入多行（不经 ORM unit of work；id/created_at 由列默认值生成）"""
+        if rows:
+            self.sa.execute(insert(BULK_MODELS[kind]), rows)
+        return len(rows)
 
     # --- 答案/打分 ---
     def append_answer(self, session_id: str, ans: Dict[str, Any]):
-        self.sa.add(Answer(
-            session_id=session_id,
-            question_id=ans["question_id"],
-            dimension=ans["dimension"],
-            question_text=ans["text"],
-            user_reply=ans["answer"],
-            score=ans["score"],
-            weight=ans.get("weight", 1.0),
-            reverse_scored=bool(ans.get("reverse_scored", False))
-        ))
+        self.sa.add(Answer(**answer_row(session_id, ans)))
 
     def append_item_score(self, session_id: str, item: Dict[str, Any]):
-        self.sa.add(ItemScore(
-            session_id=session_id,
-            question_id=item["question_id"],
-            dimension=item["dimension"],
-            score=item["score"],
-            weight=item.get("weight", 1.0),
-        ))
+        self.sa.add(ItemScore(**item_score_row(session_id, item)))
 
     # --- 报告版本 ---
     def next_report_version_no(self, session_id: str) -> int:
@@ -66,7 +85,29 @@ class Repo:
         ).scalar_one()
         return int(q) + 1
 
+    def latest_report_version(self, session_id: str) -> Optional[ReportVersion]:
+        return self.sa.execute(
+            select(ReportVersion)
+            .where(ReportVersion.session_id == session_id)
+            .order_by(ReportVersion.version_no.desc())
+            .limit(1)
+        ).scalar_one_or_none()
+
+    def find_report_version(self, session_id: str, fingerprint: str) -> Optional[ReportVersion]:
+        """同 session 下输入指纹相同的最新版本（命中即可复用，无需重新生成）"""
+        return self.sa.execute(
+            select(ReportVersion)
+            .where(ReportVersion.session_id == session_id, ReportVersion.input_fingerprint == fingerprint)
+            .order_by(ReportVersion.version_no.desc())
+            .limit(1)
+        ).scalar_one_or_none()
+
     def create_report_version(self, session_id: str, payload: Dict[str, Any]) -> ReportVersion:
+        fingerprint = payload.get("input_fingerprint")
+        if fingerprint:
+            existing = self.find_report_version(session_id, fingerprint)
+            if existing is not None:
+                return existing
         ver = self.next_report_version_no(session_id)
         rv = ReportVersion(
             session_id=session_id,
@@ -77,6 +118,8 @@ class Repo:
             overall_severity=payload.get("overall_severity"),
             interventions=payload.get("interventions"),
             report_json=payload.get("report"),
+            input_fingerprint=fingerprint,
+            prompt_version=payload.get("prompt_version"),
         )
         self.sa.add(rv)
         return rv
\ No newline at end of file
@@ -2,7 +2,8 @@ from __future__ import annotations
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from config.settings import get_settings
+from db.pool import engine_kwargs
 
 settings = get_settings()
-engine = create_engine(settings.database_url, pool_pre_ping=True, future=True)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
\ No newline at end of file
+engine = create_engine(settings.database_url, **engine_kwargs(settings.database_url, settings))
+SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
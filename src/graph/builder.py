@@ -1,6 +1,6 @@
 """
 LangGraph Builder（M-QoL 对话式评估）
-Flow:
+Flow（入口由 _route_entry 按阶段标记分发，恢复时不再重放 Receptionist）:
   Receptionist
     └─(await?)─> END (等待用户补充基础信息)
     └──────────> ProblemExploration
@@ -33,10 +33,40 @@ from src.graph.nodes.report_writer_node import report_writer_node
 
 # State type
 from src.graph.types import TaskExecutionState
+from src.graph.common import cancellable_node
 
 
 # ========= 条件边 =========
 
+def _route_entry(state: TaskExecutionState) -> str:
+    """
+    恢复入口：根据持久化的阶段标记直接跳到当前阶段，避免每次恢复都重放 Receptionist（一次 LLM 调用）
+      - 报告已生成                      -> END
+      - 题目全部完成                    -> Aggregator
+      - 施测中：等待作答                -> Scorer（对用户刚写回的 last_user_reply 打分/澄清）
+      - 施测中：未在等待                -> Interviewer（出当前题）
+      - 画像已完成：已有主意图          -> Planner；否则 -> ProblemExploration
+      - 其余                            -> Receptionist
+    """
+    plan = state.get("plan") or []
+    q_index = int(state.get("q_index", 0))
+    awaiting = bool(state.get("awaiting_user_reply", False))
+
+    if state.get("report"):
+        route = "done"
+    elif plan and (state.get("plan_finished") or q_index >= len(plan)):
+        route = "aggregate"
+    elif plan:
+        route = "score" if awaiting else "ask"
+    elif float(state.get("profile_completeness", 0.0)) >= 0.7 and not awaiting:
+        route = "plan" if state.get("primary_intent") and not state.get("need_more_exploration") else "explore"
+    else:
+        route = "receptionist"
+
+    print(f"[DEBUG] _route_entry: route={route}, q_index={q_index}, plan_len={len(plan)}, awaiting_user_reply={awaiting}")
+    return route
+
+
 def _after_receptionist(state: TaskExecutionState) -> str:
     """
     接待后：如果仍需用户输入（缺字段），暂停；否则进入探索
@@ -99,28 +129,41 @@ def _scorer_next_step(state: TaskExecutionState) -> str:
 
 # ========= Builder =========
 
-def build_assessment_graph():
+def build_assessment_graph(checkpointer: Any = None):
     """
     编译完整工作流为可执行 Graph。
-    - 入口：Receptionist
+    - 入口：_route_entry（首轮 Receptionist；恢复时直接进入当前阶段节点）
     - 暂停点：Receptionist/Interviewer/Scorer（通过 awaiting_user_reply 控制）
     - 恢复：将用户回复写回 state["last_user_reply"] 后，再次 app.invoke(state, config)
+    - checkpointer：传入 src.db.checkpointer.build_checkpointer() 后，按 thread_id 持久化状态，
+      恢复时只需 app.invoke({"last_user_reply": ...}, config)
     """
     sg = StateGraph(TaskExecutionState)
 
     # 注册节点
-    sg.add_node("receptionist", receptionist_node)
-    sg.add_node("problem_exploration", problem_exploration_node)
-    sg.add_node("intent_recognition", intent_recognition_node)
-    sg.add_node("planner", planner_node)
-    sg.add_node("interviewer", interviewer_node)
-    sg.add_node("scorer", scorer_node)
-    sg.add_node("aggregator", aggregator_node)
-    sg.add_node("interventions", interventions_node)
-    sg.add_node("report_writer", report_writer_node)
-
-    # 入口
-    sg.set_entry_point("receptionist")
+    sg.add_node("receptionist", cancellable_node("receptionist", receptionist_node))
+    sg.add_node("problem_exploration", cancellable_node("problem_exploration", problem_exploration_node))
+    sg.add_node("intent_recognition", cancellable_node("intent_recognition", intent_recognition_node))
+    sg.add_node("planner", cancellable_node("planner", planner_node))
+    sg.add_node("interviewer", cancellable_node("interviewer", interviewer_node))
+    sg.add_node("scorer", cancellable_node("scorer", scorer_node))
+    sg.add_node("aggregator", cancellable_node("aggregator", aggregator_node))
+    sg.add_node("interventions", cancellable_node("interventions", interventions_node))
+    sg.add_node("report_writer", cancellable_node("report_writer", report_writer_node))
+
+    # 入口：按阶段标记路由（首轮无标记时即 Receptionist）
+    sg.set_conditional_entry_point(
+        _route_entry,
+        {
+            "receptionist": "receptionist",
+            "explore": "problem_exploration",
+            "plan": "planner",
+            "ask": "interviewer",
+            "score": "scorer",
+            "aggregate": "aggregator",
+            "done": END,
+        },
+    )
 
     # Receptionist -> (等待 or 探索)
     sg.add_conditional_edges(
@@ -174,7 +217,7 @@ def build_assessment_graph():
     sg.add_edge("interventions", "report_writer")
     sg.add_edge("report_writer", END)
 
-    return sg.compile()
+    return sg.compile(checkpointer=checkpointer)
 
 # Studio 需要一个“已编译 graph 对象”的模块级变量：
 assessment_graph = build_assessment_graph()
@@ -198,4 +241,10 @@ assessment_graph = build_assessment_graph()
 # 2) 继续推进（再次调用 app.invoke）
 # state = app.invoke(state, config=config)
 #
-# 注：在访谈/打分阶段也会频繁出现暂停（END），直到全部题目完成并生成报告。
\ No newline at end of file
+# 注：在访谈/打分阶段也会频繁出现暂停（END），直到全部题目完成并生成报告。
+#
+# 使用数据库 checkpointer 时（状态按 thread_id 存在 graph_checkpoints，增量存储）：
+# from src.db.checkpointer import build_checkpointer
+# app = build_assessment_graph(checkpointer=build_checkpointer())
+# app.invoke({"user_id": "U-xxx", "session_id": "S-xxx"}, config=config)
+# app.invoke({"last_user_reply": "用户回复"}, config=config)   # 其余字段从 checkpoint 恢复
\ No newline at end of file
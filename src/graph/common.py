@@ -1,5 +1,7 @@
 from __future__ import annotations
-from typing import Any, Dict
+from typing import Any, Awaitable, Callable, Dict
+import asyncio
+import functools
 import logging
 
 logger = logging.getLogger(__name__)
@@ -36,4 +38,74 @@ def handle_node_error(state: Dict[str, Any], node_name: str, err: Exception) ->
     logger.exception("Node %s error: %s", node_name, err)
     add_execution_result(state, node_name, "error", {"message": str(err)})
     state.setdefault("errors", []).append({"node": node_name, "error": str(err)})
-    return state
\ No newline at end of file
+    return state
+
+def _write_execution_log(session_id: str, user_id: str, rec: Dict[str, Any]) -> None:
+    """未开启写后队列时直接落库一条执行日志（在线程池里调用）"""
+    from db.repository import Repo
+    from db.session import SessionLocal
+    from src.services.write_behind import ensure_owner
+
+    try:
+        ensure_owner(SessionLocal, session_id, user_id)
+        with SessionLocal() as sa:
+            Repo(sa).append_execution_logs(session_id, [rec])
+            sa.commit()
+    except Exception as e:
+        logger.warning(f"Failed to write execution log for {session_id}: {e}")
+
+
+def _record_cancelled(state: Dict[str, Any], config: Any, node_name: str) -> None:
+    """节点被取消（客户端断开 / 取消接口）：写一条 cancelled 执行日志；state 的本步修改不会进 checkpoint"""
+    from src.services.write_behind import ANONYMOUS_USER, get_write_behind, write_behind_enabled
+    from config.settings import get_settings
+
+    thread_id = ((config or {}).get("configurable") or {}).get("thread_id", "unknown")
+    session_id = state.get("session_id") or thread_id
+    user_id = state.get("user_id") or ANONYMOUS_USER
+    rec = {
+        "step": node_name,
+        "status": "cancelled",
+        "payload": {"partial": True, "q_index": state.get("q_index"), "stage": state.get("current_node")},
+    }
+    # 不 await：当前任务正在取消，写库交给线程池
+    loop = asyncio.get_running_loop()
+    if write_behind_enabled() or get_settings().event_db_writer:
+        wb = get_write_behind()
+        wb.ensure_session(session_id, user_id)
+        wb.append_execution_logs(session_id, [rec])
+        loop.run_in_executor(None, wb.flush_session, session_id)
+    else:
+        loop.run_in_executor(None, _write_execution_log, session_id, user_id, rec)
+
+
+def cancellable_node(
+    node_name: str,
+    fn: Callable[[Dict[str, Any], Any], Awaitable[Dict[str, Any]]],
+) -> Callable[[Dict[str, Any], Any], Awaitable[Dict[str, Any]]]:
+    """
+    图节点外层包装：
+    - 设置该节点的 LLM 流空闲超时（llm_config.yaml performance.stream_idle_timeout(s)），
+      超时由 adapter 抛 StreamIdleTimeout，节点自身的异常处理照常记录 error
+    - 设置该节点 LLM 调用的准入优先级（performance.llm_priorities，见 src/llms/limiter.py）
+    - routing.hedge.nodes 中的节点开启对冲请求（见 src/llms/router.py）
+    - 任务被取消时记录 cancelled 执行日志后继续向上抛出（不吞掉取消）
+    """
+    from src.llms.deadline import idle_timeout_for, llm_idle_timeout
+    from src.llms.limiter import llm_priority, priority_for
+    from src.llms.router import hedge_for, llm_hedging
+
+    @functools.wraps(fn)
+    async def _wrapped(state: Dict[str, Any], config: Any) -> Dict[str, Any]:
+        with llm_idle_timeout(idle_timeout_for(node_name)), llm_priority(priority_for(node_name)), \
+                llm_hedging(hedge_for(node_name)):
+            try:
+                return await fn(state, config)
+            except asyncio.CancelledError:
+                try:
+                    _record_cancelled(state, config, node_name)
+                except Exception as e:
+                    logger.warning(f"Failed to record cancellation of {node_name}: {e}")
+                raise
+
+    return _wrapped
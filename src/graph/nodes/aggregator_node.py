@@ -5,13 +5,15 @@ import logging
 from langchain_core.runnables import RunnableConfig
 from src.graph.types import TaskExecutionState
 from src.graph.common import add_execution_result, handle_node_error
-from src.services.aggregator import aggregate_scores
+from src.services.aggregator import aggregate_scores, snapshot
 
 logger = logging.getLogger(__name__)
 
 async def aggregator_node(state: TaskExecutionState, config: RunnableConfig) -> TaskExecutionState:
     try:
-        res = aggregate_scores(state.get("item_scores", []))
+        # 打分时已增量累加（state["agg"]），这里只做一次常数级 finalize；旧状态无累加器时全量回放
+        agg = state.get("agg")
+        res = snapshot(agg) if agg else aggregate_scores(state.get("item_scores", []))
         state["dim_scores"] = res.get("dim_scores", {})
         state["overall_score"] = res.get("overall_score")
         state["severity"] = res.get("severity", {})
@@ -6,7 +6,7 @@ from typing import Dict, Any
 from langchain_core.runnables import RunnableConfig
 from src.graph.types import TaskExecutionState
 from src.graph.common import add_execution_result, handle_node_error, add_ai_message
-from src.llms.adapter import LegacyLLMAdapter
+from src.llms.registry import get_node_llm
 from src.agents.intent_recognition_agent import run_intent_recognition
 
 logger = logging.getLogger(__name__)
@@ -17,7 +17,7 @@ async def intent_recognition_node(state: TaskExecutionState, config: RunnableCon
     logger.info(f"[{thread_id}] IntentRecognition start")
 
     try:
-        llm = LegacyLLMAdapter()
+        llm = get_node_llm("intent_recognition")
         
         # 创建异步事件处理器
         async def emit_handler(event):
@@ -5,30 +5,34 @@ import logging
 from langchain_core.runnables import RunnableConfig
 from src.graph.types import TaskExecutionState
 from src.graph.common import add_execution_result, handle_node_error
-from src.services.intervention import select_interventions
+from src.services.intervention import get_intervention_index, normalize_severity, dimension_label
+from src.services.intervention_retrieval import get_card_retriever
 
 logger = logging.getLogger(__name__)
 
-def _map_dim_key(name: str) -> str:
-    mapping = {
-        "沟通": "communication", "信任": "trust", "亲密/性生活": "intimacy",
-        "子女教育": "parenting", "冲突处理": "conflict", "价值观/角色分工": "values_roles"
-    }
-    return mapping.get(name, name)
-
 async def interventions_node(state: TaskExecutionState, config: RunnableConfig) -> TaskExecutionState:
     try:
         dim_scores = state.get("dim_scores", {})
         severity = state.get("severity", {})
+        top_k = int(config.get("configurable", {}).get("interventions_top_k", 2))
+        # 方案库预编译索引（文件变化自动重载）；维度名/严重性标签在索引内统一
+        index = get_intervention_index()
+        # 规则卡不足时，用会话上下文（主意图 + 最近探索笔记 + 维度名）做本地 BM25 检索补位
+        retriever = get_card_retriever()
+        context = " ".join([str(state.get("primary_intent") or "")] + list(state.get("exploration_notes", [])[-3:]))
         cards_out = []
         for dim in dim_scores.keys():
             sev = severity.get(dim, "中度")
-            cards = select_interventions(
-                dimension=_map_dim_key(dim),
-                severity=sev,
-                yaml_path="data/plans/plans_minimal_v1.yaml",
-                top_k=2
-            )
+            cards = [{**c, "source": "rule"} for c in index.select(dim, sev, top_k=top_k)]
+            if len(cards) < top_k and normalize_severity(sev) != "low":
+                seen = {c.get("id") for c in cards}
+                label = dimension_label(dim)
+                hits = retriever.search(
+                    f"{label} {label} {context}",
+                    top_k=top_k - len(cards),
+                    where=lambda c: c.get("id") not in seen,
+                )
+                cards.extend({**c, "source": "retrieval", "score": s} for c, s in hits)
             cards_out.append({"dimension": dim, "cards": cards})
         state["interventions"] = cards_out
         add_execution_result(state, "interventions", "completed", {"count": len(cards_out)})
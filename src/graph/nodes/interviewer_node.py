@@ -4,6 +4,8 @@ Module: 访谈施测节点（逐题对话式发问 + 等待用户作答）
 职责：
 - 读取 planner 生成的 plan 和当前 q_index
 - 调用 interviewer agent 生成“共情式问法/澄清问法/提示语”
+  （默认 lazy：离线话术缓存/题干直接出题，仅澄清或上一题低置信度时调用 LLM；
+   config["configurable"]["interviewer_mode"]="llm" 恢复每题调用）
 - 向前端“播报”问题（可流式 token），并在 state 标记等待用户作答
 - 不在本节点做打分；用户答复写回 state["last_user_reply"] 后，进入 Scorer 节点
 """
@@ -19,9 +21,11 @@ from src.graph.common import (
     add_ai_message,
     handle_node_error,
 )
-from src.llms.adapter import LegacyLLMAdapter
+from src.llms.registry import get_node_llm
 from src.agents.interviewer_agent import run_interviewer
 from src.services.event_types import StreamEvent, StreamEventType
+from src.services.event_sink import get_event_sink
+from src.services.write_behind import get_write_behind, write_behind_enabled, flush_on_pause
 
 logger = logging.getLogger(__name__)
 
@@ -44,28 +48,21 @@ async def interviewer_node(state: TaskExecutionState, config: RunnableConfig) ->
 
     try:
         # 1) LLM（走你的 llm.py）
-        llm = LegacyLLMAdapter()
+        llm = get_node_llm("interviewer")
 
         # 2) 取得当前题目
         item = plan[q_index]  # {dimension, question_id, question_text, weight, reverse_scored}
 
-        # 3) emit：把 token/state 往前端发（供 SSE/WS）
+        # 3) emit：token/进度事件写入会话事件缓冲（供 SSE/WS 与调试查询），不进 state
+        sink = get_event_sink()
+        session_id = state.get("session_id") or thread_id
+
         async def _emit(event: StreamEvent):
-            # 这里不直接耦合 SSE；我们把事件记到 execution_log，
-            # 若你已有全局事件总线，在此处同时转发即可。
-            add_execution_result(
-                state,
-                "interviewer_event",
-                "progress",
-                {
-                    "event": event.type.value,
-                    "node": event.node or "Interviewer",
-                    "payload": event.payload,
-                },
-            )
-
-        # 4) 调用 interviewer agent（内部会以流式 token 回调 _emit(token)）
-        new_state = await run_interviewer(state, _emit, llm)
+            sink.record(session_id, "interviewer", event)
+
+        # 4) 调用 interviewer agent：默认 lazy（话术缓存/题干直出，仅澄清/低置信度时走 LLM）
+        mode = config.get("configurable", {}).get("interviewer_mode", "lazy")
+        new_state = await run_interviewer(state, _emit, llm, mode=mode)
 
         # 5) 生成展示层输出（给前端一个“可直接发给用户”的话术）
         #    我们尽量从 agent 返回的 JSON 里取，如果没有，就兜底用题干生成。
@@ -98,9 +95,8 @@ async def interviewer_node(state: TaskExecutionState, config: RunnableConfig) ->
         new_state.pop("clarify", None)
 
         # 7) 记录与消息回显（方便在对话流中显示“咨询师问句”）
-        #    如果你 interviewer 的 prompt已经产出了自然语言问句，
-        #    可以把那句放到 add_ai_message；否则用题干兜底。
-        displayed_question = item.get("question_text")
+        #    优先用 agent 给出的问法（LLM 改写或离线话术），否则用题干兜底。
+        displayed_question = new_state.pop("interviewer_utterance", None) or item.get("question_text")
         add_ai_message(new_state, "assistant", displayed_question)
 
         add_execution_result(new_state, "interviewer", "completed", {
@@ -109,6 +105,12 @@ async def interviewer_node(state: TaskExecutionState, config: RunnableConfig) ->
             "dimension": item.get("dimension"),
         })
 
+        # 图在此暂停等待作答：本回合的待写行（作答/打分/日志/问句）一次落库
+        if write_behind_enabled():
+            wb = get_write_behind()
+            wb.ensure_session(session_id, state.get("user_id"))
+            wb.append_messages(session_id, [{"role": "assistant", "content": displayed_question}])
+        await flush_on_pause(session_id)
         return new_state
 
     except Exception as e:
@@ -6,41 +6,28 @@ from typing import Dict, Any
 from langchain_core.runnables import RunnableConfig
 from src.graph.types import TaskExecutionState
 from src.graph.common import add_execution_result, handle_node_error
-from src.services.question_bank import load_question_bank, select_plan_for_intents
+from src.services.question_bank import get_question_bank, select_plan_for_intents
+from src.services.adaptive_planner import start_adaptive_plan, DEFAULT_CONFIDENCE, DEFAULT_MIN_ITEMS
 
 logger = logging.getLogger(__name__)
 
-# 题库默认路径（你也可以放到 config 里）
-DEFAULT_BANK_PATHS = [
-    "data/questions_mqol_v1.csv",
-]
-
 async def planner_node(state: TaskExecutionState, config: RunnableConfig) -> TaskExecutionState:
     thread_id = config.get("configurable", {}).get("thread_id", "unknown")
     logger.info(f"[{thread_id}] Planner start")
 
     try:
-        # 1) 加载题库（找到第一个存在的文件）
-        bank_path = None
-        for p in DEFAULT_BANK_PATHS:
-            try:
-                from pathlib import Path
-                if Path(p).exists():
-                    bank_path = p
-                    break
-            except Exception:
-                pass
-
-        if bank_path is None:
-            logger.warning("题库文件未找到，使用内置最小 demo")
-        bank = load_question_bank(bank_path or "NOT_EXIST")
+        # 1) 取题库（进程内缓存 + 索引，文件变化自动重载；文件不存在时为内置最小 demo）
+        #    configurable.question_bank 可指定版本名或路径，如 "questions_mqol_v2"
+        bank = get_question_bank(config.get("configurable", {}).get("question_bank"))
 
         # 2) 读取意图与次要候选（来自前序节点）
         primary_intent = state.get("primary_intent")
         intents = state.get("intents", [])
 
         # 最多每个主维度抽多少题（可从 config 传入）
-        per_dim = int(config.get("configurable", {}).get("planner_per_dim", 10))
+        conf = config.get("configurable", {})
+        per_dim = int(conf.get("planner_per_dim", 10))
+        mode = conf.get("planner_mode", "fixed")
 
         # 3) 选题
         plan = select_plan_for_intents(
@@ -51,14 +38,27 @@ async def planner_node(state: TaskExecutionState, config: RunnableConfig) -> Tas
         )
 
         # 4) 写回状态
-        state["plan"] = plan
+        #    adaptive：plan 只放第一题，之后由 scorer 每次打分后按 CAT 追加（维度分档确定即停止）
+        if mode == "adaptive":
+            start_adaptive_plan(
+                state, bank, plan,
+                confidence=float(conf.get("cat_confidence", DEFAULT_CONFIDENCE)),
+                min_items=int(conf.get("cat_min_items", DEFAULT_MIN_ITEMS)),
+                max_items=per_dim,
+            )
+        else:
+            state["plan"] = plan
+            state.pop("cat", None)
+        state["bank_path"] = bank.path
         state["q_index"] = 0
         state["plan_finished"] = False  # 初始化为False，避免条件边错误判断
 
         # 5) 记录
         add_execution_result(state, "planner", "completed", {
-            "bank_path": bank_path or "internal_demo",
+            "bank_path": bank.path,
+            "bank_hash": bank.content_hash,
             "selected_count": len(plan),
+            "mode": mode,
             "primary_intent": primary_intent,
             "per_dim": per_dim,
             "dims_in_plan": sorted({p["dimension"] for p in plan}),
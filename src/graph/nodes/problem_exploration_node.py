@@ -10,9 +10,10 @@ from src.graph.types import TaskExecutionState
 from src.graph.common import (
     add_execution_result, handle_node_error, get_latest_human_message, add_ai_message
 )
-from src.llms.adapter import LegacyLLMAdapter
+from src.llms.registry import get_node_llm
 from src.agents.problem_exploration_agent import run_problem_exploration
 from src.services.event_types import StreamEvent, StreamEventType
+from src.services.event_sink import get_event_sink
 
 logger = logging.getLogger(__name__)
 
@@ -26,16 +27,14 @@ async def problem_exploration_node(state: TaskExecutionState, config: RunnableCo
         if latest:
             state.setdefault("exploration_notes", []).append(latest)
 
-        llm = LegacyLLMAdapter()
+        llm = get_node_llm("problem_exploration")
+
+        sink = get_event_sink()
+        session_id = state.get("session_id") or thread_id
 
         async def _emit(event: StreamEvent):
-            # 这里你可以顺带转发到 SSE；下方先记录到 execution_log
-            add_execution_result(
-                state,
-                "problem_exploration_event",
-                event.type.value,
-                {"payload": event.payload, "node": event.node or "ProblemExploration"},
-            )
+            # 流式事件写入会话事件缓冲；state 只保留下方的节点摘要
+            sink.record(session_id, "problem_exploration", event)
 
         new_state = await run_problem_exploration(state, _emit, llm, version="v2")
 
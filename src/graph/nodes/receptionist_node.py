@@ -9,9 +9,11 @@ from langchain_core.runnables import RunnableConfig
 
 from src.graph.types import TaskExecutionState
 from src.graph.common import add_execution_result, handle_node_error, add_ai_message
-from src.llms.adapter import LegacyLLMAdapter
+from src.llms.registry import get_node_llm
 from src.agents.receptionist_agent import run_receptionist
-from src.services.event_types import StreamEvent, StreamEventType
+from src.services.event_types import StreamEvent
+from src.services.event_sink import get_event_sink
+from src.services.write_behind import flush_on_pause
 
 logger = logging.getLogger(__name__)
 
@@ -21,20 +23,14 @@ async def receptionist_node(state: TaskExecutionState, config: RunnableConfig) -
 
     try:
         # 创建LLM客户端
-        llm_client = LegacyLLMAdapter()
+        llm_client = get_node_llm("receptionist")
         
-        # 创建事件发射器
+        # 创建事件发射器：事件写入会话事件缓冲，不直接添加消息到状态（消息添加由 agent 内部处理）
+        sink = get_event_sink()
+        session_id = state.get("session_id") or thread_id
+
         async def emit(event: StreamEvent):
-            # 只记录事件到日志，不直接添加消息到状态
-            # 消息添加由 agent 内部处理
-            if event.type == StreamEventType.token:
-                pass  # 令牌流暂时忽略
-            elif event.type == StreamEventType.summary:
-                # 记录到执行日志，但不直接添加消息
-                add_execution_result(state, "receptionist_event", "summary", {
-                    "payload": event.payload,
-                    "node": event.node or "Receptionist"
-                })
+            sink.record(session_id, "receptionist", event)
 
         # 调用原来的receptionist agent逻辑
         updated_state = await run_receptionist(state, emit, llm_client)
@@ -66,6 +62,8 @@ async def receptionist_node(state: TaskExecutionState, config: RunnableConfig) -
             "profile_completeness": state.get("profile_completeness", 0.0),
             "awaiting_user_reply": state.get("awaiting_user_reply", False),
         })
+        if state["awaiting_user_reply"]:
+            await flush_on_pause(session_id)
         
         return state
 
@@ -1,30 +1,53 @@
 """
-Module: 报告生成节点（调用 report_writer prompt 输出结构化 JSON）
+Module: 报告生成节点（本地骨架 + 并发生成各叙述小节，结构化 JSON）
 """
 import asyncio
 import logging
 from langchain_core.runnables import RunnableConfig
 from src.graph.types import TaskExecutionState
 from src.graph.common import add_execution_result, handle_node_error
-from src.llms.adapter import LegacyLLMAdapter
+from src.llms.registry import get_node_llm
 from src.agents.report_writer_agent import run_report_writer
 from src.services.event_types import StreamEvent, StreamEventType
+from src.services.event_sink import get_event_sink
+from src.services.report_skeleton import build_report_skeleton, report_fingerprint
+from src.services.report_store import load_report_by_fingerprint, save_report
+from src.services.write_behind import flush_on_pause
 
 logger = logging.getLogger(__name__)
 
 async def report_writer_node(state: TaskExecutionState, config: RunnableConfig) -> TaskExecutionState:
     try:
-        llm = LegacyLLMAdapter()
+        llm = get_node_llm("report_writer")
+
+        thread_id = config.get("configurable", {}).get("thread_id", "unknown")
+        sink = get_event_sink()
+        session_id = state.get("session_id") or thread_id
 
         async def _emit(event: StreamEvent):
-            # 如需把 token/state 转发给 SSE，可在此对接；这里仅记录
-            pass
+            sink.record(session_id, "report_writer", event)
 
         state["report_date"] = state.get("report_date")
-        new_state = await run_report_writer(state, _emit, llm)
+        # 输入指纹：profile / 分数 / 干预 / 小节输入 / prompt 版本都没变时复用已存报告（重开、重复 finalize 不耗 LLM）
+        fingerprint, prompt_version = report_fingerprint(state, build_report_skeleton(state))
+        cached = await asyncio.to_thread(load_report_by_fingerprint, session_id, fingerprint)
+
+        concurrency = int(config.get("configurable", {}).get("report_concurrency", 4))
+        new_state = await run_report_writer(
+            state, _emit, llm, concurrency=concurrency,
+            cached_report=cached["report"] if cached else None,
+        )
+        version_no = cached["version_no"] if cached else await asyncio.to_thread(
+            save_report, session_id, new_state, fingerprint, prompt_version)
 
+        await flush_on_pause(session_id)
         add_execution_result(new_state, "report_writer", "completed", {
+            "reused": bool(cached),
+            "version_no": version_no,
             "has_report": bool(new_state.get("report")),
+            "sections": len((new_state.get("report") or {}).get("sections", {})),
+            "fallback_sections": sum(1 for v in (new_state.get("report") or {}).get("sections", {}).values()
+                                     if v.get("fallback")),
             "overall_severity": new_state.get("overall_severity"),
         })
         return new_state
@@ -20,9 +20,12 @@ from src.graph.common import (
     add_ai_message,
     handle_node_error,
 )
-from src.llms.adapter import LegacyLLMAdapter
+from src.llms.registry import get_node_llm
 from src.agents.scorer_agent import run_scorer
-from src.services.event_types import StreamEvent, StreamEventType
+from src.services.event_types import StreamEvent
+from src.services.event_sink import get_event_sink
+from src.services.adaptive_planner import advance_adaptive_plan
+from src.services.write_behind import get_write_behind, write_behind_enabled, flush_on_pause
 
 logger = logging.getLogger(__name__)
 
@@ -59,18 +62,14 @@ async def scorer_node(state: TaskExecutionState, config: RunnableConfig) -> Task
         item = plan[q_index]
 
         # 1) LLM（走你的 llm.py）
-        llm = LegacyLLMAdapter()
+        llm = get_node_llm("scorer")
+
+        # 2) emit：流式 token/中间状态写入会话事件缓冲（不进 state，execution_log 只记下方的节点摘要）
+        sink = get_event_sink()
+        session_id = state.get("session_id") or thread_id
 
-        # 2) emit：流式 token/中间状态的记录（如需转发 SSE，可在此对接）
         async def _emit(event: StreamEvent):
-            if event.type == StreamEventType.token:
-                add_execution_result(state, "scorer_event", "token", {"text": event.payload.get("text", "")})
-            elif event.type in (StreamEventType.state, StreamEventType.score, StreamEventType.summary):
-                add_execution_result(state, "scorer_event", event.type.value, event.payload)
-            else:
-                add_execution_result(state, "scorer_event", "event", {
-                    "type": event.type.value, "payload": event.payload
-                })
+            sink.record(session_id, "scorer", event)
 
         # 3) 业务主体（自然语言推断优先，低置信度触发澄清）
         new_state = await run_scorer(state, _emit, llm)
@@ -78,6 +77,22 @@ async def scorer_node(state: TaskExecutionState, config: RunnableConfig) -> Task
         # 4) 读取 scorer 写入的 last_score（我们在 agents/scorer_agent.py 已写入）
         last_score = new_state.get("last_score") or {}
         score = last_score.get("score")
+
+        # 持久化走写后队列（不等数据库）；回合暂停前统一刷新
+        if write_behind_enabled() and score is not None:
+            wb = get_write_behind()
+            wb.ensure_session(session_id, state.get("user_id"))
+            wb.append_messages(session_id, [{"role": "user", "content": user_reply}])
+            wb.append_answer(session_id, {
+                "question_id": item.get("question_id"),
+                "dimension": item.get("dimension"),
+                "text": item.get("question_text") or "",
+                "answer": user_reply,
+                "score": int(round(score)),
+                "weight": item.get("weight", 1.0),
+                "reverse_scored": bool(item.get("reverse_scored", False)),
+            })
+            wb.append_item_score(session_id, {**last_score, "score": int(round(score))})
         needs_clarify = bool(last_score.get("needs_clarify", False))
         confidence = float(last_score.get("confidence", 0.0))
 
@@ -108,6 +123,7 @@ async def scorer_node(state: TaskExecutionState, config: RunnableConfig) -> Task
                 "question_id": item.get("question_id"),
                 "confidence": confidence,
             })
+            await flush_on_pause(session_id)
             return new_state
 
         # 6) 正常通过 —— 写回可视化消息（可选）
@@ -118,10 +134,13 @@ async def scorer_node(state: TaskExecutionState, config: RunnableConfig) -> Task
             "confidence": confidence,
         })
 
-        # 7) 前进到下一题
+        # 7) 前进到下一题（adaptive 模式：按最新估计追加下一题，所有维度分档确定后不再追加）
         new_state["awaiting_user_reply"] = False
         new_state.pop("clarify", None)
         new_index = q_index + 1
+        if new_state.get("cat"):
+            advance_adaptive_plan(new_state)
+            total = len(new_state["plan"])
 
         if new_index >= total:
             # 已完成所有题
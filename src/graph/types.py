@@ -66,6 +66,51 @@ class TaskExecutionState(MessagesState):
     # 结果数据
     response_text: NotRequired[str]  # 最终响应文本
 
+    # ===== M-QoL 评估流程 =====
+    # 需要在 schema 中声明，LangGraph 才会在多次 invoke / 恢复之间保留这些字段
+    session_id: NotRequired[str]
+    user_id: NotRequired[str]
+    awaiting_user_reply: NotRequired[bool]  # 暂停点标记：等待用户输入
+    last_user_reply: NotRequired[str]
+
+    # 接待 / 探索 / 意图
+    profile: NotRequired[Dict]
+    profile_completeness: NotRequired[float]
+    exploration_notes: NotRequired[List[str]]
+    exploration_round: NotRequired[int]
+    max_intent_rounds: NotRequired[int]
+    intents: NotRequired[List]
+    primary_intent: NotRequired[Optional[str]]
+    intent_confidence: NotRequired[float]
+    need_more_exploration: NotRequired[bool]
+
+    # 施测
+    plan: NotRequired[List[Dict]]
+    bank_path: NotRequired[str]  # planner 选用的题库文件（configurable.question_bank），离线话术按它查找
+    q_index: NotRequired[int]
+    plan_finished: NotRequired[bool]
+    current_question: NotRequired[Dict]
+    clarify: NotRequired[Optional[Dict]]
+    last_score: NotRequired[Dict]
+    answers: NotRequired[List[Dict]]
+    item_scores: NotRequired[List[Dict]]
+    agg: NotRequired[Dict]  # 维度增量累加器（run_scorer 更新，aggregator finalize）
+    cat: NotRequired[Dict]  # 自适应施测状态（planner_mode="adaptive"）：题目池、各维度估计与停止状态
+
+    # 聚合 / 干预 / 报告
+    dim_scores: NotRequired[Dict]
+    overall_score: NotRequired[Optional[float]]
+    severity: NotRequired[Dict]
+    overall_severity: NotRequired[Optional[str]]
+    interventions: NotRequired[List[Dict]]
+    report: NotRequired[Dict]
+    report_date: NotRequired[Optional[str]]
+
+    # 执行日志 / 错误
+    execution_log: NotRequired[List[Dict]]
+    errors: NotRequired[List[Dict]]
+    last_error: NotRequired[str]
+
 
 def create_task_execution_state(**kwargs) -> TaskExecutionState:
     """创建带默认值的TaskExecutionState实例
@@ -1,22 +1,100 @@
 # src/llm/adapter.py
 from __future__ import annotations
-from typing import Any, Callable, Optional
-import os, types
+from typing import Any, Callable, Dict, Optional
+import os, types, json, inspect, asyncio, threading, concurrent.futures
 
 from . import llm as legacy_llm  # 直接用你的 llm.py（包内相对导入）
+from .deadline import StreamIdleTimeout, anext_with_deadline, aclose_quietly, current_idle_timeout, is_end
+from .limiter import get_limiter, is_retryable
+from .profiles import ProfileCall
+
+_UNSET = object()
+
+# === 同步接口的后台事件循环 ===
+# 常驻一个循环而不是每次 asyncio.run：异步客户端（AsyncOpenAI / 共享 httpx 连接池）的连接绑定在
+# 打开它们的循环上，换循环就不能复用
+_sync_loop: Optional[asyncio.AbstractEventLoop] = None
+_sync_loop_lock = threading.Lock()
+
+
+def _get_sync_loop() -> asyncio.AbstractEventLoop:
+    global _sync_loop
+    if _sync_loop is None:
+        with _sync_loop_lock:
+            if _sync_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-sync-loop", daemon=True).start()
+                _sync_loop = loop
+    return _sync_loop
+
+
+def _run_sync(coro: Any, cancel: Optional[threading.Event] = None) -> Any:
+    """
+    在后台循环上运行协程并阻塞等待结果；调用方的 contextvars（优先级 / 空闲超时 / 对冲开关）随任务带过去。
+    cancel 被 set 时取消任务，抛 concurrent.futures.CancelledError
+    """
+    loop = _get_sync_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("sync LLM call inside the sync bridge loop (on_token callback?); use ainvoke / astream")
+    fut = asyncio.run_coroutine_threadsafe(coro, loop)
+    while True:
+        try:
+            return fut.result(timeout=None if cancel is None else 0.05)
+        except concurrent.futures.TimeoutError:
+            if cancel.is_set():
+                fut.cancel()
 
 class LegacyLLMAdapter:
     """
     将旧的 llm.py 适配成统一接口：
       - invoke(prompt: str) -> str
       - stream(prompt: str, on_token: Callable[[str], None]) -> str
+      - ainvoke / astream：原生异步版本（AsyncOpenAI / AsyncAnthropic / ChatOpenAI.astream），
+        不阻塞事件循环；invoke / stream 只是它们的同步封装（协程在常驻的后台事件循环上运行），
+        供脚本/离线场景使用，提供方调用链只有异步这一份
+      - 所有调用经过 limiter.py 的并发 / 速率限制，限流与服务端错误在那里统一退避重试
+        （可重试错误不再降级到其他客户端调用方式）
     尽量兼容 OpenAI/Anthropic/自研/本地网关等多种客户端风格。
     """
-    def __init__(self, provider: Optional[str] = None, model: Optional[str] = None, **kwargs: Any) -> None:
+    def __init__(
+        self,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        http_client: Any = None,
+        http_async_client: Any = None,
+        client: Any = None,
+        async_client: Any = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        profile: Optional[str] = None,
+        max_retries: Optional[int] = None,
+        **kwargs: Any,
+    ) -> None:
         self.provider = (provider or os.getenv("MODEL_PROVIDER") or "").lower().strip()
         self.model = model or os.getenv("MODEL_NAME") or os.getenv("BASIC_MODEL__model", "qwen-max")
         self.kwargs = kwargs
-        
+        # 模型档案（llm_config.yaml agent_configs，见 profiles.py）：每次调用带上 temperature / max_tokens，
+        # 调用延迟与 token 计入该档案的统计
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.profile = profile
+        # limiter 重试次数；None 用 performance.max_retries，路由客户端传 0（由它做故障转移）
+        self.max_retries = max_retries
+        # 共享连接池（见 registry.py）；未传入时在创建客户端时向注册表取
+        self.http_client = http_client
+        self.http_async_client = http_async_client
+        self._async_client: Any = _UNSET if async_client is None else async_client
+
+        # 显式传入客户端（多提供方路由，见 router.py）：不走下面的探测链
+        if client is not None:
+            self.client = client
+            return
+
         # 优先尝试使用新的LLM系统
         try:
             from . import llm as legacy_llm
@@ -58,10 +136,20 @@ class LegacyLLMAdapter:
                 "api_key": api_key,
                 "temperature": float(os.getenv("BASIC_MODEL__temperature", "0.3")),
                 "max_tokens": int(os.getenv("BASIC_MODEL__max_tokens", "4000")),
+                # 重试由 limiter.py 统一处理（带 Retry-After 与全局暂停），关闭 SDK 内置重试避免叠加
+                "max_retries": 0,
             }
             
             if base_url:
                 client_kwargs["base_url"] = base_url
+
+            # 复用进程级 keep-alive 连接池，避免每次新建 httpx 客户端
+            if self.http_client is None or self.http_async_client is None:
+                from .registry import get_http_clients
+                verify_ssl = os.getenv("BASIC_MODEL__verify_ssl", "true").lower() in ("true", "1", "yes", "on")
+                self.http_client, self.http_async_client = get_http_clients(verify_ssl)
+            client_kwargs["http_client"] = self.http_client
+            client_kwargs["http_async_client"] = self.http_async_client
                 
             return ChatOpenAI(**client_kwargs)
             
@@ -70,163 +158,311 @@ class LegacyLLMAdapter:
             return self._fallback_dummy()
 
     # === public API ===
-    def invoke(self, prompt: str) -> str:
-        # 优先尝试直接使用底层OpenAI客户端API
-        if hasattr(self.client, 'client') and hasattr(self.client.client, 'chat'):
-            # ChatOpenAI对象的底层OpenAI客户端
-            try:
-                openai_client = self.client.client
-                resp = openai_client.chat.completions.create(
-                    model=self.model,
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                return self._extract_openai_text(resp)
-            except Exception as e:
-                print(f"Direct OpenAI client failed: {e}")
-        
+    # cache=True 表示调用方（节点）允许使用响应缓存；仅低温度时生效，命中后按小段回放 on_token
+    # 每次调用的延迟 / 首 token / token 数计入模型档案统计（profiles.py）
+    def invoke(self, prompt: str, cache: bool = False) -> str:
+        """ainvoke 的同步封装"""
+        return _run_sync(self.ainvoke(prompt, cache=cache))
+
+    def stream(
+        self,
+        prompt: str,
+        on_token: Callable[[str], None],
+        cache: bool = False,
+        cancel: Optional[threading.Event] = None,
+    ) -> str:
+        """astream 的同步封装；cancel：其他线程 set() 后取消流（关闭底层连接），返回已收到的部分"""
+        parts = []
+
+        def _on_token(t: str) -> None:
+            parts.append(t)
+            if on_token:
+                on_token(t)
+
+        try:
+            return _run_sync(self.astream(prompt, _on_token, cache=cache), cancel)
+        except concurrent.futures.CancelledError:
+            if cancel is not None and cancel.is_set():
+                return "".join(parts)
+            raise
+
+    async def ainvoke(self, prompt: str, cache: bool = False) -> str:
+        call = ProfileCall(self.profile, self.model, prompt)
+        key = self._cache_key(prompt) if cache else None
+        if key:
+            hit = self._cache().get(key)
+            if hit is not None:
+                call.finish(hit, cached=True)
+                return hit
+        try:
+            text = await self._limiter().arun(lambda: self._ainvoke(prompt), prompt, max_retries=self.max_retries)
+        except Exception:
+            call.finish(None, ok=False)
+            raise
+        call.finish(text)
+        if key and text.strip() not in ("", "{}"):
+            self._cache().set(key, text)
+        return text
+
+    async def astream(self, prompt: str, on_token: Optional[Callable[[str], Any]] = None, cache: bool = False) -> str:
+        call = ProfileCall(self.profile, self.model, prompt)
+        key = self._cache_key(prompt) if cache else None
+        if key:
+            hit = self._cache().get(key)
+            if hit is not None:
+                for piece in self._replay_chunks(hit):
+                    await self._emit_token(on_token, piece)
+                    await asyncio.sleep(0)
+                call.finish(hit, cached=True)
+                return hit
+        emitted = []
+
+        async def _on_token(t: str) -> None:
+            if not emitted:
+                call.first_token()
+            emitted.append(1)
+            await self._emit_token(on_token, t)
+
+        # 已推送过 token 的流不重试（前端会收到重复内容）
+        try:
+            text = await self._limiter().arun(
+                lambda: self._astream(prompt, _on_token), prompt, lambda: not emitted, self.max_retries)
+        except Exception:
+            call.finish(None, ok=False)
+            raise
+        call.finish(text)
+        if key and text.strip() not in ("", "{}"):
+            self._cache().set(key, text)
+        return text
+
+    # === sync-only clients ===
+    def _invoke(self, prompt: str) -> str:
+        """只有同步接口的客户端（自研 / 本地网关 / 占位模型）：由 _ainvoke / _astream 放进线程池调用"""
+        messages = [{"role": "user", "content": prompt}]
         if self._has_path(self.client, "chat.completions.create"):
             create = self._get_path(self.client, "chat.completions.create")
-            resp = create(model=self.model, messages=[{"role": "user", "content": prompt}])
+            resp = create(model=self.model, messages=messages, **self._gen_params())
             return self._extract_openai_text(resp)
-            
         if self._has_path(self.client, "messages.create"):
             create = self._get_path(self.client, "messages.create")
-            resp = create(model=self.model, messages=[{"role": "user", "content": prompt}], max_tokens=2048)
+            resp = create(model=self.model, messages=messages, **self._gen_params(anthropic=True))
             return self._extract_anthropic_text(resp)
-            
-        # 如果上面都不行，尝试LangChain客户端
         if hasattr(self.client, "invoke"):
-            # LangChain客户端，使用正确的消息格式
+            # LangChain 客户端，使用消息格式
             try:
                 from langchain_core.messages import HumanMessage
-                # 创建简单的消息格式
-                messages = [HumanMessage(content=prompt)]
-                result = self.client.invoke(messages)
+                result = self.client.invoke([HumanMessage(content=prompt)], **self._lc_params())
                 if hasattr(result, 'content'):
                     return str(result.content)
                 return str(result)
             except Exception as e:
+                if is_retryable(e):
+                    raise
                 print(f"LangChain invoke failed: {e}")
-                # 如果LangChain失败，尝试直接使用OpenAI API格式
-                pass
-        if self._has_path(self.client, "chat.completions.create"):
-            create = self._get_path(self.client, "chat.completions.create")
-            resp = create(model=self.model, messages=[{"role": "user", "content": prompt}])
-            return self._extract_openai_text(resp)
-        if self._has_path(self.client, "messages.create"):
-            create = self._get_path(self.client, "messages.create")
-            resp = create(model=self.model, messages=[{"role": "user", "content": prompt}], max_tokens=2048)
-            return self._extract_anthropic_text(resp)
         for name in ("call", "generate", "text", "__call__"):
             if hasattr(self.client, name):
                 fn = getattr(self.client, name)
                 try:
                     out = fn(prompt)
                 except TypeError:
-                    out = fn(messages=[{"role":"user","content":prompt}])
+                    out = fn(messages=messages)
                 return self._to_str(out)
         return "{}"
 
-    def stream(self, prompt: str, on_token: Callable[[str], None]) -> str:
-        # 优先尝试直接使用底层OpenAI流式API
-        if hasattr(self.client, 'client') and hasattr(self.client.client, 'chat'):
-            # ChatOpenAI对象的底层OpenAI客户端
+    # === async provider calls ===
+    async def _ainvoke(self, prompt: str) -> str:
+        messages = [{"role": "user", "content": prompt}]
+        aclient = self._get_async_client()
+        if aclient is not None:
+            try:
+                if self._has_path(aclient, "chat.completions.create"):
+                    resp = await aclient.chat.completions.create(model=self.model, messages=messages, **self._gen_params())
+                    return self._extract_openai_text(resp)
+                if self._has_path(aclient, "messages.create"):
+                    resp = await aclient.messages.create(model=self.model, messages=messages, **self._gen_params(anthropic=True))
+                    return self._extract_anthropic_text(resp)
+            except Exception as e:
+                if is_retryable(e):
+                    raise
+                print(f"Direct async client failed: {e}")
+
+        # LangChain 客户端（ChatOpenAI.ainvoke）
+        if hasattr(self.client, "ainvoke"):
+            try:
+                from langchain_core.messages import HumanMessage
+                result = await self.client.ainvoke([HumanMessage(content=prompt)], **self._lc_params())
+                if hasattr(result, 'content'):
+                    return str(result.content)
+                return str(result)
+            except Exception as e:
+                if is_retryable(e):
+                    raise
+                print(f"LangChain ainvoke failed: {e}")
+
+        # 只有同步接口的客户端：放进线程池，至少不阻塞事件循环
+        return await asyncio.to_thread(self._invoke, prompt)
+
+    async def _astream(self, prompt: str, on_token: Optional[Callable[[str], Any]] = None) -> str:
+        """
+        异步逐 token 推送。on_token 可以是普通函数，也可以是 async 函数（会被 await）。
+        已经推送过 token 的流失败时直接抛出，避免降级重放导致前端收到重复内容。
+        取消 / 空闲超时（llm_idle_timeout 作用域，见 deadline.py）时关闭底层流，提供方随即停止生成；
+        空闲超时不降级到其他调用方式，直接抛 StreamIdleTimeout。
+        """
+        messages = [{"role": "user", "content": prompt}]
+        aclient = self._get_async_client()
+        parts: list[str] = []
+        idle = current_idle_timeout()
+
+        if aclient is not None and self._has_path(aclient, "chat.completions.create"):
             try:
-                openai_client = self.client.client
-                stream = openai_client.chat.completions.create(
-                    model=self.model,
-                    messages=[{"role": "user", "content": prompt}],
-                    stream=True
-                )
-                parts=[]
-                for chunk in stream:
-                    delta = self._extract_openai_delta(chunk)
-                    if delta:
-                        parts.append(delta)
-                        if on_token:
-                            on_token(delta)
+                stream = await asyncio.wait_for(
+                    aclient.chat.completions.create(model=self.model, messages=messages, stream=True, **self._gen_params()), idle)
+                try:
+                    it = stream.__aiter__()
+                    while not is_end(chunk := await anext_with_deadline(it, idle)):
+                        delta = self._extract_openai_delta(chunk)
+                        if delta:
+                            parts.append(delta)
+                            await self._emit_token(on_token, delta)
+                finally:
+                    await aclose_quietly(stream)
                 return "".join(parts)
+            except StreamIdleTimeout:
+                raise
+            except asyncio.TimeoutError:
+                raise StreamIdleTimeout(f"no response headers within {idle}s") from None
             except Exception as e:
-                print(f"Direct OpenAI stream failed: {e}")
-        
-        if self._has_path(self.client, "chat.completions.create"):
-            create = self._get_path(self.client, "chat.completions.create")
-            stream = create(model=self.model, messages=[{"role":"user","content":prompt}], stream=True)
-            parts=[]
-            for chunk in stream:
-                delta = self._extract_openai_delta(chunk)
-                if delta:
-                    parts.append(delta)
-                    if on_token:
-                        on_token(delta)
-            return "".join(parts)
-            
-        if self._has_path(self.client, "messages.stream"):
-            stream_fn = self._get_path(self.client, "messages.stream")
-            parts=[]
-            with stream_fn(model=self.model, messages=[{"role":"user","content":prompt}], max_tokens=2048) as s:
-                for event in s:
-                    token = self._extract_anthropic_delta(event)
-                    if token:
-                        parts.append(token)
-                        if on_token:
-                            on_token(token)
-            try: s.get_final_message()
-            except Exception: pass
-            return "".join(parts)
-            
-        # 如果底层API不可用，尝试LangChain客户端
-        if hasattr(self.client, "stream") and hasattr(self.client, 'invoke'):
-            # LangChain客户端，需要Messages格式
+                if parts or is_retryable(e):
+                    raise
+                print(f"Direct async OpenAI stream failed: {e}")
+
+        if aclient is not None and self._has_path(aclient, "messages.stream"):
+            try:
+                async with aclient.messages.stream(model=self.model, messages=messages, **self._gen_params(anthropic=True)) as s:
+                    it = s.__aiter__()
+                    while not is_end(event := await anext_with_deadline(it, idle)):
+                        token = self._extract_anthropic_delta(event)
+                        if token:
+                            parts.append(token)
+                            await self._emit_token(on_token, token)
+                return "".join(parts)
+            except StreamIdleTimeout:
+                raise
+            except Exception as e:
+                if parts or is_retryable(e):
+                    raise
+                print(f"Direct async Anthropic stream failed: {e}")
+
+        # LangChain 客户端（ChatOpenAI.astream）
+        if hasattr(self.client, "astream") and hasattr(self.client, "ainvoke"):
             try:
                 from langchain_core.messages import HumanMessage
-                messages = [HumanMessage(content=prompt)]
-                # LangChain stream方法不接受回调函数，只接受消息和配置
-                result = self.client.stream(messages)
-                parts = []
-                for chunk in result:
-                    if hasattr(chunk, 'content') and chunk.content:
-                        parts.append(chunk.content)
-                        if on_token:
-                            on_token(chunk.content)
-                return ''.join(parts)
+                agen = self.client.astream([HumanMessage(content=prompt)], **self._lc_params())
+                try:
+                    it = agen.__aiter__()
+                    while not is_end(chunk := await anext_with_deadline(it, idle)):
+                        if hasattr(chunk, 'content') and chunk.content:
+                            parts.append(chunk.content)
+                            await self._emit_token(on_token, chunk.content)
+                finally:
+                    await aclose_quietly(agen)
+                return "".join(parts)
+            except StreamIdleTimeout:
+                raise
             except Exception as e:
-                print(f"LangChain stream failed: {e}")
-                # 如果LangChain失败，降级到invoke
-                text = self.invoke(prompt)
-                if on_token:
-                    on_token(text)
-                return text
-        if self._has_path(self.client, "chat.completions.create"):
-            create = self._get_path(self.client, "chat.completions.create")
-            stream = create(model=self.model, messages=[{"role":"user","content":prompt}], stream=True)
-            parts=[]
-            for chunk in stream:
-                delta = self._extract_openai_delta(chunk)
-                if delta:
-                    parts.append(delta)
-                    if on_token:
-                        on_token(delta)
-            return "".join(parts)
-        if self._has_path(self.client, "messages.stream"):
-            stream_fn = self._get_path(self.client, "messages.stream")
-            parts=[]
-            with stream_fn(model=self.model, messages=[{"role":"user","content":prompt}], max_tokens=2048) as s:
-                for event in s:
-                    token = self._extract_anthropic_delta(event)
-                    if token:
-                        parts.append(token)
-                        if on_token:
-                            on_token(token)
-                try: s.get_final_message()
-                except Exception: pass
-            return "".join(parts)
-        # 降级：无流式 -> 一次性回调
-        text = self.invoke(prompt)
-        if on_token:
-            on_token(text)
+                if parts or is_retryable(e):
+                    raise
+                print(f"LangChain astream failed: {e}")
+
+        # 降级：无异步流式 -> 线程池 invoke + 一次性回调
+        text = await asyncio.to_thread(self._invoke, prompt)
+        await self._emit_token(on_token, text)
         return text
 
+    def _gen_params(self, anthropic: bool = False) -> Dict[str, Any]:
+        """每次调用的生成参数（档案未设置的项不传，沿用客户端默认；Anthropic 必须给 max_tokens）"""
+        params: Dict[str, Any] = {}
+        if self.temperature is not None:
+            params["temperature"] = self.temperature
+        if self.max_tokens is not None or anthropic:
+            params["max_tokens"] = self.max_tokens or 2048
+        return params
+
+    def _lc_params(self) -> Dict[str, Any]:
+        """LangChain 客户端的调用参数：带档案时覆盖客户端自身的 model"""
+        params = self._gen_params()
+        if self.profile:
+            params["model"] = self.model
+        return params
+
+    def _limiter(self):
+        """按 (provider, model) 共享的准入控制与重试（见 limiter.py）"""
+        return get_limiter(self.provider, self.model)
+
+    # === cache helpers ===
+    REPLAY_CHUNK_CHARS = 16
+
+    def _cache(self):
+        from .cache import get_response_cache
+        return get_response_cache()
+
+    def _temperature(self) -> float:
+        if self.temperature is not None:
+            return float(self.temperature)
+        t = getattr(self.client, "temperature", None)
+        if isinstance(t, (int, float)):
+            return float(t)
+        return float(self.kwargs.get("temperature", os.getenv("BASIC_MODEL__temperature", "0.3")))
+
+    def _cache_key(self, prompt: str) -> Optional[str]:
+        from .cache import make_cache_key, is_cacheable_temperature
+        temperature = self._temperature()
+        if not is_cacheable_temperature(temperature):
+            return None
+        return make_cache_key(self.model, temperature, prompt, self.max_tokens)
+
+    def _replay_chunks(self, text: str):
+        n = self.REPLAY_CHUNK_CHARS
+        return [text[i:i + n] for i in range(0, len(text), n)]
+
+    # === async helpers ===
+    def _get_async_client(self) -> Any:
+        if self._async_client is _UNSET:
+            self._async_client = self._create_async_client()
+        return self._async_client
+
+    def _create_async_client(self) -> Any:
+        """为当前同步客户端找到/构造对应的异步客户端；找不到返回 None（走 LangChain 或线程池）"""
+        # ChatOpenAI 自带 AsyncOpenAI
+        root = getattr(self.client, "root_async_client", None)
+        if root is not None and self._has_path(root, "chat.completions.create"):
+            return root
+
+        # 本身就是异步客户端
+        for dotted in ("chat.completions.create", "messages.create"):
+            if self._has_path(self.client, dotted) and inspect.iscoroutinefunction(self._get_path(self.client, dotted)):
+                return self.client
+
+        # 原生 OpenAI / Anthropic 同步客户端 -> 按同样的 key/base_url 构造异步版本
+        try:
+            if self._has_path(self.client, "chat.completions.create") and hasattr(self.client, "api_key"):
+                from openai import AsyncOpenAI
+                return AsyncOpenAI(api_key=self.client.api_key, base_url=str(self.client.base_url))
+            if self._has_path(self.client, "messages.create") and hasattr(self.client, "api_key"):
+                from anthropic import AsyncAnthropic
+                return AsyncAnthropic(api_key=self.client.api_key, base_url=str(self.client.base_url))
+        except Exception as e:
+            print(f"Warning: Failed to create async client: {e}")
+        return None
+
+    async def _emit_token(self, on_token: Optional[Callable[[str], Any]], token: str) -> None:
+        if not on_token or not token:
+            return
+        out = on_token(token)
+        if inspect.isawaitable(out):
+            await out
+
     # === helpers ===
     def _try_call(self, obj: Any, name: str, *args, **kw):
         if hasattr(obj, name):
@@ -304,4 +540,49 @@ class LegacyLLMAdapter:
             def invoke(self, prompt:str)->str: return "{}"
             def stream(self, prompt:str, on_token:Callable[[str],None])->str:
                 on_token("{}"); return "{}"
-        return _Dummy()
\ No newline at end of file
+        return _Dummy()
+
+
+# ===== JSON 调用（异步）=====
+def parse_json_object(text: str) -> Dict[str, Any]:
+    """从 LLM 文本中解析出一个 JSON 对象；兼容 ```json 代码块和前后多余文字，失败返回 {}"""
+    if not text:
+        return {}
+    s = text.strip()
+    if s.startswith("```"):
+        s = s.strip("`")
+        if s.lower().startswith("json"):
+            s = s[4:]
+    start, end = s.find("{"), s.rfind("}")
+    if start < 0 or end <= start:
+        return {}
+    try:
+        data = json.loads(s[start:end + 1])
+    except Exception:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+async def acall_json_with_stream(
+    llm_client: Any,
+    prompt: str,
+    on_token: Optional[Callable[[str], Any]] = None,
+    cache: bool = False,
+) -> Dict[str, Any]:
+    """
+    call_json_with_stream_legacy 的异步版本：await 流式输出（token 回调在事件循环线程内触发），
+    结束后解析为 JSON。没有 astream 的旧客户端在线程池里 invoke，再一次性回调。
+    cache=True：允许命中响应缓存（仅对打分/意图识别这类低温度、确定性的调用开启）。
+    """
+    if hasattr(llm_client, "astream"):
+        if cache:
+            text = await llm_client.astream(prompt, on_token, cache=True)
+        else:
+            text = await llm_client.astream(prompt, on_token)
+    else:
+        text = await asyncio.to_thread(llm_client.invoke, prompt)
+        if on_token and text:
+            out = on_token(text)
+            if inspect.isawaitable(out):
+                await out
+    return parse_json_object(text)
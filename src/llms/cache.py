@@ -0,0 +1,197 @@
+"""
+LLM 响应缓存
+- key = sha256(model, temperature, max_tokens, 渲染后的 prompt)；max_tokens 不同的档案不共享条目（小上限的截断回复不会给大上限的调用方）
+- 两级：进程内 LRU（OrderedDict，带 TTL） + 可选 SQLite（WAL 模式，多个 uvicorn worker 共享同一文件）
+- 只缓存调用方显式 opt-in 的请求（低温度的打分/意图识别），共情回复等生成类请求不走缓存
+- 配置：config/llm_config.yaml 的 performance.cache_*；环境变量 LLM_CACHE_PATH 可覆盖磁盘路径
+"""
+
+from __future__ import annotations
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from . import llm as legacy_llm
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(model: str, temperature: Optional[float], prompt: str, max_tokens: Optional[int] = None) -> str:
+    raw = json.dumps([model, temperature, max_tokens, prompt], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    get/set 线程安全；命中内存层直接返回，命中磁盘层会回填内存层。
+    统计：hits（memory/disk）、misses、evictions（LRU 淘汰）、expired（TTL 过期）、writes。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 100,
+        ttl_seconds: float = 24 * 3600,
+        sqlite_path: Optional[str] = None,
+        max_disk_entries: int = 10000,
+    ) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self.max_disk_entries = int(max_disk_entries)
+        self._mem: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expired": 0, "writes": 0}
+        self._db: Optional[sqlite3.Connection] = None
+        self.sqlite_path = sqlite_path
+        if sqlite_path:
+            self._open_db(sqlite_path)
+
+    # === SQLite 层 ===
+    def _open_db(self, path: str) -> None:
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            db = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("PRAGMA busy_timeout=5000")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_response_cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, created_at REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS ix_llm_response_cache_created ON llm_response_cache(created_at)")
+            self._db = db
+        except Exception as e:
+            logger.warning(f"LLM response cache: failed to open sqlite {path}: {e}")
+            self._db = None
+
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[float, str]]:
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM llm_response_cache WHERE key = ?", (key,)
+            ).fetchone()
+        except Exception as e:
+            logger.warning(f"LLM response cache read failed: {e}")
+            return None
+        if not row:
+            return None
+        value, expires_at = row
+        if expires_at <= now:
+            self._stats["expired"] += 1
+            return None
+        return expires_at, value
+
+    def _disk_set(self, key: str, value: str, expires_at: float, now: float) -> None:
+        if self._db is None:
+            return
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_response_cache(key, value, expires_at, created_at) VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, now),
+            )
+            # 顺带清理：过期行 + 超过上限的最旧行
+            if self._stats["writes"] % 100 == 0:
+                self._db.execute("DELETE FROM llm_response_cache WHERE expires_at <= ?", (now,))
+                cur = self._db.execute(
+                    "DELETE FROM llm_response_cache WHERE key IN ("
+                    " SELECT key FROM llm_response_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,),
+                )
+                self._stats["evictions"] += max(cur.rowcount, 0)
+        except Exception as e:
+            logger.warning(f"LLM response cache write failed: {e}")
+
+    # === public API ===
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None:
+                if hit[0] > now:
+                    self._mem.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return hit[1]
+                del self._mem[key]
+                self._stats["expired"] += 1
+            disk = self._disk_get(key, now)
+            if disk is not None:
+                self._stats["disk_hits"] += 1
+                self._mem_put(key, disk)
+                return disk[1]
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        if not value:
+            return
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        with self._lock:
+            self._stats["writes"] += 1
+            self._mem_put(key, (expires_at, value))
+            self._disk_set(key, value, expires_at, now)
+
+    def _mem_put(self, key: str, entry: Tuple[float, str]) -> None:
+        self._mem[key] = entry
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_response_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+            total = hits + self._stats["misses"]
+            return {
+                **self._stats,
+                "hits": hits,
+                "hit_rate": round(hits / total, 4) if total else 0.0,
+                "size": len(self._mem),
+                "max_entries": self.max_entries,
+                "sqlite_path": self.sqlite_path if self._db is not None else None,
+            }
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+_cache_max_temperature: float = 0.3
+
+
+def get_response_cache() -> ResponseCache:
+    global _cache, _cache_max_temperature
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                conf = legacy_llm._load_yaml_config(legacy_llm._get_config_file_path())
+                perf = conf.get("performance") or {}
+                _cache_max_temperature = float(perf.get("cache_max_temperature", 0.3))
+                _cache = ResponseCache(
+                    max_entries=int(perf.get("cache_size", 100)),
+                    ttl_seconds=float(perf.get("cache_ttl", 24 * 3600)),
+                    sqlite_path=os.getenv("LLM_CACHE_PATH") or perf.get("cache_path") or None,
+                    max_disk_entries=int(perf.get("cache_disk_size", 10000)),
+                )
+    return _cache
+
+
+def is_cacheable_temperature(temperature: Optional[float]) -> bool:
+    """只缓存低温度（近似确定性）的调用"""
+    get_response_cache()
+    return temperature is None or float(temperature) <= _cache_max_temperature
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    return get_response_cache().stats()
@@ -0,0 +1,89 @@
+"""
+流式调用的取消与空闲超时
+- StreamIdleTimeout：流超过 idle 秒没有新 chunk（包括首个 token 前）即中止
+- 超时按节点配置（config/llm_config.yaml performance.stream_idle_timeout / stream_idle_timeouts），
+  图节点外层用 llm_idle_timeout(...) 设置作用域（contextvar，gather 出的子任务同样继承）
+- anext_with_deadline / aclose_quietly：adapter 逐个取 chunk，结束、超时或任务被取消时
+  都在 finally 里关闭底层流（释放 HTTP 连接，提供方停止生成）
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IDLE_TIMEOUT = 30.0
+
+_END = object()
+_idle_timeout: ContextVar[Optional[float]] = ContextVar("llm_idle_timeout", default=None)
+
+
+class StreamIdleTimeout(TimeoutError):
+    """流式调用在 idle 秒内没有收到新 chunk"""
+
+
+@lru_cache(maxsize=1)
+def _idle_config() -> Dict[str, Any]:
+    from . import llm as legacy_llm
+
+    perf = legacy_llm._load_yaml_config(legacy_llm._get_config_file_path()).get("performance") or {}
+    return {
+        "default": float(perf.get("stream_idle_timeout", DEFAULT_IDLE_TIMEOUT)),
+        "nodes": {str(k): float(v) for k, v in (perf.get("stream_idle_timeouts") or {}).items()},
+    }
+
+
+def idle_timeout_for(node: str) -> float:
+    conf = _idle_config()
+    return conf["nodes"].get(node, conf["default"])
+
+
+def current_idle_timeout() -> Optional[float]:
+    return _idle_timeout.get()
+
+
+@contextmanager
+def llm_idle_timeout(seconds: Optional[float]) -> Iterator[None]:
+    token = _idle_timeout.set(seconds if seconds and seconds > 0 else None)
+    try:
+        yield
+    finally:
+        _idle_timeout.reset(token)
+
+
+async def anext_with_deadline(it: Any, idle: Optional[float]) -> Any:
+    """取下一个 chunk；流结束返回 END，超时抛 StreamIdleTimeout"""
+    try:
+        if idle:
+            return await asyncio.wait_for(it.__anext__(), idle)
+        return await it.__anext__()
+    except StopAsyncIteration:
+        return _END
+    except asyncio.TimeoutError:
+        raise StreamIdleTimeout(f"no stream chunk for {idle}s") from None
+
+
+def is_end(chunk: Any) -> bool:
+    return chunk is _END
+
+
+async def aclose_quietly(stream: Any) -> None:
+    """关闭异步流（OpenAI AsyncStream.close / async generator.aclose）；关闭失败只记日志"""
+    for name in ("aclose", "close"):
+        fn = getattr(stream, name, None)
+        if fn is None:
+            continue
+        try:
+            out = fn()
+            if inspect.isawaitable(out):
+                await out
+        except Exception as e:
+            logger.debug(f"Failed to close stream: {e}")
+        return
@@ -0,0 +1,108 @@
+"""
+本地假的 OpenAI 兼容服务（只实现 POST /v1/chat/completions，含 stream=true 的 SSE），
+用于演练 router.py 的故障转移 / 熔断 / 对冲，不访问真实提供方。
+
+    python -m llms.fake_openai --port 9001 --delay 2          # 首 token 前等待 2 秒
+    python -m llms.fake_openai --port 9002 --status 429       # 一律返回 429（带 Retry-After）
+    python -m llms.fake_openai --port 9003 --fail-rate 0.3    # 30% 请求返回 503
+
+也可在测试里直接 start_fake_server(port=0, ...) 起在后台线程，返回 (server, base_url)。
+"""
+
+from __future__ import annotations
+
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+
+
+def _handler(reply: str, delay: float, token_delay: float, status: int, fail_rate: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):  # 安静
+            pass
+
+        def _json(self, code: int, body: dict, headers: Optional[dict] = None) -> None:
+            data = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                return self._json(404, {"error": {"message": "not found"}})
+            if status != 200 or random.random() < fail_rate:
+                code = status if status != 200 else 503
+                return self._json(code, {"error": {"message": f"fake {code}", "type": "fake"}}, {"Retry-After": "1"})
+            time.sleep(delay)
+            model = body.get("model", "fake")
+            base = {"id": "chatcmpl-fake", "created": int(time.time()), "model": model}
+            if not body.get("stream"):
+                return self._json(200, {
+                    **base, "object": "chat.completion",
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": reply}}],
+                })
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            try:
+                for i in range(0, len(reply), 4):
+                    chunk = {**base, "object": "chat.completion.chunk",
+                             "choices": [{"index": 0, "delta": {"content": reply[i:i + 4]}, "finish_reason": None}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                    time.sleep(token_delay)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass   # 客户端取消（对冲落败 / 超过 SLO）
+            self.close_connection = True
+
+    return Handler
+
+
+def start_fake_server(
+    port: int = 0,
+    reply: str = '{"ok": true}',
+    delay: float = 0.0,
+    token_delay: float = 0.01,
+    status: int = 200,
+    fail_rate: float = 0.0,
+) -> Tuple[ThreadingHTTPServer, str]:
+    server = ThreadingHTTPServer(("127.0.0.1", port), _handler(reply, delay, token_delay, status, fail_rate))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Fake OpenAI-compatible chat completions server")
+    ap.add_argument("--port", type=int, default=9001)
+    ap.add_argument("--reply", default='{"ok": true}')
+    ap.add_argument("--delay", type=float, default=0.0, help="首 token 前等待秒数")
+    ap.add_argument("--token-delay", type=float, default=0.01)
+    ap.add_argument("--status", type=int, default=200, help="非 200 时一律返回该状态码")
+    ap.add_argument("--fail-rate", type=float, default=0.0)
+    args = ap.parse_args()
+    server, url = start_fake_server(args.port, args.reply, args.delay, args.token_delay, args.status, args.fail_rate)
+    print(f"fake OpenAI server on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
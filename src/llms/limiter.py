@@ -0,0 +1,394 @@
+"""
+提供方准入控制（进程级共享，跨会话）
+- 按 (provider, model) 一个 ProviderLimiter：并发上限 + 请求/分钟、token/分钟两个令牌桶
+- 调用前按 prompt 估算 token 预扣，结束后按实际输出结算（超出部分记为欠账，后续调用等待）
+- 优先级：interactive（interviewer / scorer 等对话路径）优先于 batch（report_writer）；
+  有 interactive 在排队、或令牌桶余量低于 batch_reserve 时 batch 调用继续等待
+- 重试：限流 / 5xx / 连接错误按指数退避 + 抖动重试（performance.max_retries / retry_delay），
+  响应带 Retry-After 时至少等待该时长，且整个 (provider, model) 暂停放行，避免 429 连锁
+- 配置：config/llm_config.yaml performance.rate_limits（default / <provider> / <provider>/<model> 逐级覆盖）
+  与 performance.llm_priorities（节点 -> interactive|batch）
+- 指标：get_limiter_stats()（也并入 registry.get_pool_stats()["limiters"]）
+
+用法（adapter 内部）：
+    limiter = get_limiter(provider, model)
+    text = await limiter.arun(lambda: self._ainvoke(prompt), prompt)
+"""
+
+from __future__ import annotations
+
+import re
+import time
+import random
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, asdict, fields
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, BATCH)
+
+_POLL = 0.02   # 并发槽 / 优先级等待时的轮询间隔（秒）
+_RETRYABLE_STATUS = (408, 409, 429, 500, 502, 503, 504, 529)
+_CJK_RE = re.compile(r"[\u3000-\u303f\u3400-\u9fff\uf900-\ufaff\uff00-\uffef]")
+
+_priority: ContextVar[str] = ContextVar("llm_priority", default=INTERACTIVE)
+
+
+@dataclass(frozen=True)
+class LimitConfig:
+    max_concurrency: int = 16
+    requests_per_minute: float = 300
+    tokens_per_minute: float = 200000
+    est_output_tokens: int = 512       # 预扣的输出 token，结束后按实际结算
+    batch_reserve: float = 0.2         # 令牌桶余量低于该比例时只放行 interactive
+    max_retries: int = 3
+    retry_delay: float = 1.0           # 退避基数（秒）
+    max_retry_delay: float = 20.0
+
+    @classmethod
+    def from_config(cls, conf: Dict[str, Any], provider: str, model: str) -> "LimitConfig":
+        perf = conf.get("performance") or {}
+        limits = perf.get("rate_limits") or {}
+        merged: Dict[str, Any] = {
+            "max_retries": perf.get("max_retries", cls.max_retries),
+            "retry_delay": perf.get("retry_delay", cls.retry_delay),
+            "max_retry_delay": perf.get("max_retry_delay", cls.max_retry_delay),
+        }
+        for key in ("default", provider, f"{provider}/{model}"):
+            merged.update(limits.get(key) or {})
+        known = {f.name for f in fields(cls)}
+        kwargs = {}
+        for k, v in merged.items():
+            if k in known and v is not None:
+                kwargs[k] = int(v) if k in ("max_concurrency", "est_output_tokens", "max_retries") else float(v)
+        return cls(**kwargs)
+
+
+@lru_cache(maxsize=1)
+def _load_config() -> Dict[str, Any]:
+    from . import llm as legacy_llm
+
+    return legacy_llm._load_yaml_config(legacy_llm._get_config_file_path())
+
+
+# === 优先级（图节点外层设置，gather 出的子任务继承） ===
+def priority_for(node: str) -> str:
+    prio = ((_load_config().get("performance") or {}).get("llm_priorities") or {}).get(node, INTERACTIVE)
+    return prio if prio in PRIORITIES else INTERACTIVE
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+@contextmanager
+def llm_priority(priority: str) -> Iterator[None]:
+    token = _priority.set(priority if priority in PRIORITIES else INTERACTIVE)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+# === token 估算 ===
+def estimate_tokens(text: str) -> int:
+    """粗略估算：CJK 每字约 1 token，其余约 4 字符 1 token"""
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+# === 错误分类 ===
+def _status_of(exc: BaseException) -> Optional[int]:
+    for obj in (exc, getattr(exc, "response", None)):
+        for attr in ("status_code", "status", "http_status"):
+            code = getattr(obj, attr, None)
+            if isinstance(code, int):
+                return code
+    return None
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """从异常携带的响应头读取 Retry-After / retry-after-ms（秒数或 HTTP 日期）"""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or getattr(exc, "headers", None)
+    if not headers:
+        return None
+    try:
+        ms = headers.get("retry-after-ms")
+        if ms:
+            return max(0.0, float(ms) / 1000)
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """限流 / 服务端错误 / 连接与超时错误（不含流空闲超时与取消）"""
+    from .deadline import StreamIdleTimeout
+
+    if isinstance(exc, (StreamIdleTimeout, asyncio.CancelledError)):
+        return False
+    status = _status_of(exc)
+    if status is not None:
+        return status in _RETRYABLE_STATUS
+    name = type(exc).__name__
+    return name in ("APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError") or any(
+        base.__module__.startswith("httpx") and base.__name__ in ("TransportError", "TimeoutException")
+        for base in type(exc).__mro__
+    )
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    return _status_of(exc) == 429 or type(exc).__name__ == "RateLimitError"
+
+
+# === 令牌桶 ===
+class TokenBucket:
+    """容量 = 每分钟额度，连续匀速补充；余额可为负（结算欠账）。调用方持有 ProviderLimiter 的锁"""
+
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = max(1.0, float(per_minute))
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self._ts = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._ts) * self.rate)
+        self._ts = now
+
+    def wait_for(self, amount: float, reserve: float = 0.0) -> float:
+        """取走 amount 后余额不低于 reserve*capacity 需要等待的秒数（0 = 现在可取）"""
+        need = min(amount, self.capacity) + reserve * self.capacity - self.level
+        return max(0.0, need / self.rate)
+
+    def take(self, amount: float) -> None:
+        self.level -= amount
+
+    def give(self, amount: float) -> None:
+        self.level = min(self.capacity, self.level + amount)
+
+
+class ProviderLimiter:
+    def __init__(self, key: Tuple[str, str], config: LimitConfig) -> None:
+        self.key = key
+        self.config = config
+        self._lock = threading.Lock()
+        self._requests = TokenBucket(config.requests_per_minute)
+        self._tokens = TokenBucket(config.tokens_per_minute)
+        self._in_flight = 0
+        self._waiting = {p: 0 for p in PRIORITIES}
+        self._paused_until = 0.0
+        self._stats = {
+            "calls": 0, "throttled": 0, "retries": 0, "rate_limited": 0, "failures": 0,
+            "wait_s": 0.0, "tokens_est": 0, "tokens_settled": 0,
+        }
+
+    # === 准入 ===
+    def _try_admit(self, priority: str, cost: int) -> float:
+        """尝试占用一个并发槽并扣桶；成功返回 0，否则返回建议等待秒数"""
+        now = time.monotonic()
+        with self._lock:
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self._in_flight >= self.config.max_concurrency:
+                return _POLL
+            reserve = 0.0
+            if priority == BATCH:
+                if self._waiting[INTERACTIVE]:
+                    return _POLL
+                reserve = self.config.batch_reserve
+            self._requests.refill(now)
+            self._tokens.refill(now)
+            wait = max(self._requests.wait_for(1, reserve), self._tokens.wait_for(cost, reserve))
+            if wait > 0:
+                return wait
+            self._requests.take(1)
+            self._tokens.take(cost)
+            self._in_flight += 1
+            self._stats["calls"] += 1
+            self._stats["tokens_est"] += cost
+            return 0.0
+
+    def _release(self, cost: int, actual: Optional[int]) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            if actual is not None:
+                # 结算：多扣的还回去，少扣的记欠账
+                if actual < cost:
+                    self._tokens.give(cost - actual)
+                else:
+                    self._tokens.take(actual - cost)
+                self._stats["tokens_settled"] += actual
+
+    def _enter_wait(self, priority: str) -> None:
+        with self._lock:
+            self._waiting[priority] += 1
+
+    def _leave_wait(self, priority: str, waited: float) -> None:
+        with self._lock:
+            self._waiting[priority] -= 1
+            if waited > 0:
+                self._stats["throttled"] += 1
+                self._stats["wait_s"] += waited
+
+    async def _aacquire(self, priority: str, cost: int) -> None:
+        wait = self._try_admit(priority, cost)
+        if not wait:
+            return
+        t0 = time.monotonic()
+        self._enter_wait(priority)
+        try:
+            while wait:
+                await asyncio.sleep(min(wait, 1.0))
+                wait = self._try_admit(priority, cost)
+        finally:
+            self._leave_wait(priority, time.monotonic() - t0)
+
+    def _acquire(self, priority: str, cost: int) -> None:
+        wait = self._try_admit(priority, cost)
+        if not wait:
+            return
+        t0 = time.monotonic()
+        self._enter_wait(priority)
+        try:
+            while wait:
+                time.sleep(min(wait, 1.0))
+                wait = self._try_admit(priority, cost)
+        finally:
+            self._leave_wait(priority, time.monotonic() - t0)
+
+    # === 重试 ===
+    def _backoff(self, attempt: int, exc: BaseException, max_retries: Optional[int] = None) -> Optional[float]:
+        """返回本次失败后的等待秒数；不可重试 / 次数用尽返回 None"""
+        with self._lock:
+            self._stats["failures"] += 1
+            limited = is_rate_limited(exc)
+            if limited:
+                self._stats["rate_limited"] += 1
+        limit = self.config.max_retries if max_retries is None else max_retries
+        if attempt >= limit or not is_retryable(exc):
+            return None
+        cap = min(self.config.max_retry_delay, self.config.retry_delay * (2 ** attempt))
+        delay = cap / 2 + random.uniform(0, cap / 2)
+        retry_after = retry_after_seconds(exc)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.config.max_retry_delay * 3))
+        if limited or retry_after is not None:
+            # 提供方要求放慢：该 (provider, model) 的所有调用一起暂停
+            with self._lock:
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        with self._lock:
+            self._stats["retries"] += 1
+        logger.warning(f"LLM call to {self.key} failed ({type(exc).__name__}: {exc}), retry {attempt + 1} in {delay:.2f}s")
+        return delay
+
+    async def arun(
+        self,
+        call: Callable[[], Awaitable[str]],
+        prompt: str,
+        can_retry: Callable[[], bool] = lambda: True,
+        max_retries: Optional[int] = None,
+    ) -> str:
+        """
+        准入 -> 调用 -> 结算；失败按退避重试。
+        can_retry：流式调用已经推送过 token 时返回 False（重试会让前端收到重复内容）
+        max_retries：覆盖配置的重试次数；路由客户端的适配器传 0，失败立即交给 router.py 故障转移
+        """
+        priority = current_priority()
+        cost = estimate_tokens(prompt) + self.config.est_output_tokens
+        attempt = 0
+        while True:
+            await self._aacquire(priority, cost)
+            actual: Optional[int] = None
+            try:
+                text = await call()
+                actual = estimate_tokens(prompt) + estimate_tokens(text)
+                return text
+            except Exception as e:
+                delay = self._backoff(attempt, e, max_retries) if can_retry() else None
+                if delay is None:
+                    raise
+            finally:
+                self._release(cost, actual)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def run(
+        self,
+        call: Callable[[], str],
+        prompt: str,
+        can_retry: Callable[[], bool] = lambda: True,
+        max_retries: Optional[int] = None,
+    ) -> str:
+        """arun 的同步版本（脚本 / 线程池里的调用）"""
+        priority = current_priority()
+        cost = estimate_tokens(prompt) + self.config.est_output_tokens
+        attempt = 0
+        while True:
+            self._acquire(priority, cost)
+            actual: Optional[int] = None
+            try:
+                text = call()
+                actual = estimate_tokens(prompt) + estimate_tokens(text)
+                return text
+            except Exception as e:
+                delay = self._backoff(attempt, e, max_retries) if can_retry() else None
+                if delay is None:
+                    raise
+            finally:
+                self._release(cost, actual)
+            attempt += 1
+            time.sleep(delay)
+
+    # === 指标 ===
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            self._requests.refill(now)
+            self._tokens.refill(now)
+            return {
+                **self._stats,
+                "wait_s": round(self._stats["wait_s"], 3),
+                "in_flight": self._in_flight,
+                "waiting": dict(self._waiting),
+                "requests_available": round(self._requests.level, 2),
+                "tokens_available": round(self._tokens.level, 1),
+                "paused_for_s": round(max(0.0, self._paused_until - now), 3),
+                "config": asdict(self.config),
+            }
+
+
+_limiters: Dict[Tuple[str, str], ProviderLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider: Optional[str], model: Optional[str]) -> ProviderLimiter:
+    key = ((provider or "default").lower(), model or "")
+    limiter = _limiters.get(key)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(key)
+            if limiter is None:
+                limiter = ProviderLimiter(key, LimitConfig.from_config(_load_config(), *key))
+                _limiters[key] = limiter
+    return limiter
+
+
+def get_limiter_stats() -> Dict[str, Any]:
+    return {f"{p}/{m}": limiter.stats() for (p, m), limiter in list(_limiters.items())}
@@ -141,12 +141,14 @@ def _create_llm_use_conf(llm_type: LLMType, conf: Dict[str, Any]) -> BaseLanguag
     # 处理SSL验证设置
     verify_ssl = merged_conf.pop("verify_ssl", True)
     
-    # 如果禁用SSL验证，创建自定义HTTP客户端
+    # 使用进程级共享的 keep-alive 连接池（按 verify_ssl 区分）
+    from .registry import get_http_clients
+    http_client, http_async_client = get_http_clients(verify_ssl)
+    merged_conf["http_client"] = http_client
+    merged_conf["http_async_client"] = http_async_client
+    # 重试由 limiter.py 统一处理，关闭 SDK 内置重试避免叠加
+    merged_conf.setdefault("max_retries", 0)
     if not verify_ssl:
-        http_client = httpx.Client(verify=False)
-        http_async_client = httpx.AsyncClient(verify=False)
-        merged_conf["http_client"] = http_client
-        merged_conf["http_async_client"] = http_async_client
         logger.warning(f"SSL verification disabled for {llm_type} LLM")
     
     try:
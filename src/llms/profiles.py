@@ -0,0 +1,174 @@
+"""
+按节点的模型档案（config/llm_config.yaml agent_configs + node_profiles）
+- agent_configs.<profile>：model_name / temperature / max_tokens；enabled: false 表示该角色不用 LLM
+- node_profiles：图节点 -> 档案名（接待/访谈用 onboarding_model，意图识别用便宜快速的 classifier_model，
+  打分用 assessor_model，报告用 reporter_model ...）；未映射的节点用默认适配器
+- registry.get_node_llm(node) 按档案取共享的适配器；调用时带上 temperature / max_tokens
+- 统计：每个档案的调用数、错误、缓存命中、延迟（p50/p95）、首 token 时间（p95）、估算的输入/输出 token，
+  get_profile_stats() 查看，便于按角色分别调成本与延迟
+
+用法（节点）：
+    llm = get_node_llm("scorer")
+"""
+
+from __future__ import annotations
+
+import time
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Deque, Dict, Optional
+
+from .limiter import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE = "default"
+
+
+@dataclass(frozen=True)
+class ModelProfile:
+    name: str
+    model: Optional[str] = None
+    temperature: Optional[float] = None
+    max_tokens: Optional[int] = None
+    enabled: bool = True
+    description: str = ""
+
+    @classmethod
+    def from_config(cls, name: str, conf: Dict[str, Any]) -> "ModelProfile":
+        return cls(
+            name=name,
+            model=conf.get("model_name") or None,
+            temperature=float(conf["temperature"]) if conf.get("temperature") is not None else None,
+            max_tokens=int(conf["max_tokens"]) if conf.get("max_tokens") is not None else None,
+            enabled=bool(conf.get("enabled", True)),
+            description=str(conf.get("description") or ""),
+        )
+
+
+@lru_cache(maxsize=1)
+def _load_config() -> Dict[str, Any]:
+    from . import llm as legacy_llm
+
+    return legacy_llm._load_yaml_config(legacy_llm._get_config_file_path())
+
+
+@lru_cache(maxsize=1)
+def load_profiles() -> Dict[str, ModelProfile]:
+    return {
+        name: ModelProfile.from_config(name, conf or {})
+        for name, conf in (_load_config().get("agent_configs") or {}).items()
+    }
+
+
+def profile_for_node(node: str) -> Optional[ModelProfile]:
+    """节点对应的档案；未映射、档案不存在或已禁用时返回 None（用默认适配器）"""
+    name = (_load_config().get("node_profiles") or {}).get(node)
+    if not name:
+        return None
+    profile = load_profiles().get(name)
+    if profile is None:
+        logger.warning(f"node_profiles.{node} -> unknown profile {name}, using default model")
+        return None
+    if not profile.enabled:
+        logger.warning(f"Profile {name} is disabled but mapped to LLM node {node}, using default model")
+        return None
+    return profile
+
+
+# === 统计 ===
+class _Window:
+    def __init__(self, maxlen: int = 500) -> None:
+        self._samples: Deque[float] = deque(maxlen=maxlen)
+
+    def add(self, v: float) -> None:
+        self._samples.append(v)
+
+    def pct(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        s = sorted(self._samples)
+        return s[min(len(s) - 1, int(len(s) * q))]
+
+
+class ProfileStats:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, Any]] = {}
+        self._latency: Dict[str, _Window] = {}
+        self._ttft: Dict[str, _Window] = {}
+
+    def record(
+        self,
+        profile: str,
+        model: str,
+        latency: float,
+        ttft: Optional[float],
+        tokens_in: int,
+        tokens_out: int,
+        ok: bool,
+        cached: bool,
+    ) -> None:
+        with self._lock:
+            c = self._counts.setdefault(profile, {
+                "model": model, "calls": 0, "errors": 0, "cached": 0, "tokens_in": 0, "tokens_out": 0,
+            })
+            c["calls"] += 1
+            c["errors"] += 0 if ok else 1
+            c["cached"] += 1 if cached else 0
+            if cached:
+                return   # 缓存命中不产生提供方开销，不计入延迟 / token
+            c["tokens_in"] += tokens_in
+            c["tokens_out"] += tokens_out
+            self._latency.setdefault(profile, _Window()).add(latency)
+            if ttft is not None:
+                self._ttft.setdefault(profile, _Window()).add(ttft)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            out = {}
+            for name, c in self._counts.items():
+                lat, ttft = self._latency.get(name), self._ttft.get(name)
+                billed = c["calls"] - c["cached"]
+                ms = lambda v: round(v * 1000, 1) if v is not None else None
+                out[name] = {
+                    **c,
+                    "avg_tokens_out": round(c["tokens_out"] / billed, 1) if billed else 0.0,
+                    "latency_ms": {"p50": ms(lat.pct(0.5)), "p95": ms(lat.pct(0.95))} if lat else {},
+                    "ttft_ms": {"p50": ms(ttft.pct(0.5)), "p95": ms(ttft.pct(0.95))} if ttft else {},
+                }
+            return out
+
+
+_stats = ProfileStats()
+
+
+class ProfileCall:
+    """一次调用的计时：first_token() 记首 token，finish() 结算入档案统计"""
+
+    def __init__(self, profile: Optional[str], model: str, prompt: str) -> None:
+        self.profile = profile or DEFAULT_PROFILE
+        self.model = model
+        self.prompt = prompt
+        self._t0 = time.perf_counter()
+        self._ttft: Optional[float] = None
+
+    def first_token(self) -> None:
+        if self._ttft is None:
+            self._ttft = time.perf_counter() - self._t0
+
+    def finish(self, text: Optional[str], ok: bool = True, cached: bool = False) -> None:
+        try:
+            _stats.record(
+                self.profile, self.model, time.perf_counter() - self._t0, self._ttft,
+                estimate_tokens(self.prompt), estimate_tokens(text or ""), ok, cached,
+            )
+        except Exception as e:
+            logger.debug(f"Failed to record profile stats: {e}")
+
+
+def get_profile_stats() -> Dict[str, Any]:
+    return _stats.snapshot()
@@ -0,0 +1,237 @@
+"""
+LLM 客户端注册表（进程级共享）
+- 按解析后的 (provider, model, base_url, verify_ssl) 复用 LegacyLLMAdapter，节点里 O(1) 取用，
+  不再每轮对话重新走 _try_call 探测链、重新创建 ChatOpenAI
+- 同一 verify_ssl 设置下共用一对长连接 httpx 连接池（sync + async），避免每轮 TCP/TLS 握手
+- 连接池大小来自 config/llm_config.yaml 的 performance.pool，可用 get_pool_stats() 查看
+  （同时给出 limiter.py 的并发 / 令牌桶 / 重试指标与 profiles.py 的按档案统计）
+- get_node_llm(node)：按 node_profiles 取节点的模型档案（model / temperature / max_tokens）
+"""
+
+from __future__ import annotations
+
+import os
+import logging
+import threading
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+import httpx
+
+from . import llm as legacy_llm
+from .adapter import LegacyLLMAdapter
+from .limiter import get_limiter_stats
+from .profiles import ModelProfile, get_profile_stats, profile_for_node
+
+logger = logging.getLogger(__name__)
+
+
+class ClientKey(NamedTuple):
+    provider: str
+    model: str
+    base_url: str
+    verify_ssl: bool
+    profile: str = ""      # 模型档案（profiles.py），同一模型不同 temperature / max_tokens 分开缓存
+
+
+@dataclass(frozen=True)
+class PoolLimits:
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 60.0
+    timeout: float = 30.0
+    connect_timeout: float = 10.0
+
+    @classmethod
+    def from_config(cls, conf: Dict[str, Any]) -> "PoolLimits":
+        perf = conf.get("performance") or {}
+        pool = perf.get("pool") or {}
+        return cls(
+            max_connections=int(pool.get("max_connections", cls.max_connections)),
+            max_keepalive_connections=int(pool.get("max_keepalive_connections", cls.max_keepalive_connections)),
+            keepalive_expiry=float(pool.get("keepalive_expiry", cls.keepalive_expiry)),
+            timeout=float(perf.get("timeout", cls.timeout)),
+            connect_timeout=float(pool.get("connect_timeout", cls.connect_timeout)),
+        )
+
+
+def resolve_client_key(provider: Optional[str] = None, model: Optional[str] = None) -> ClientKey:
+    """与 LegacyLLMAdapter 相同的环境变量解析规则，得到注册表 key"""
+    provider = (provider or os.getenv("MODEL_PROVIDER") or "").lower().strip()
+    model = model or os.getenv("MODEL_NAME") or os.getenv("BASIC_MODEL__model", "qwen-max")
+    base_url = (
+        os.getenv("BASIC_MODEL__base_url")
+        or os.getenv("BASE_URL")
+        or os.getenv("OPENAI_BASE_URL")
+        or ""
+    )
+    verify_ssl = os.getenv("BASIC_MODEL__verify_ssl", "true").lower() in ("true", "1", "yes", "on")
+    return ClientKey(provider, model, base_url.rstrip("/"), verify_ssl)
+
+
+def _pool_snapshot(client: Any) -> Dict[str, int]:
+    """读取 httpx 底层 httpcore 连接池的连接数（私有属性，取不到时返回 0）"""
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    try:
+        conns = list(getattr(pool, "connections", None) or [])
+    except Exception:
+        conns = []
+    idle = 0
+    for c in conns:
+        try:
+            idle += 1 if c.is_idle() else 0
+        except Exception:
+            pass
+    return {"connections": len(conns), "idle": idle, "active": len(conns) - idle}
+
+
+class LLMClientRegistry:
+    """
+    线程安全的客户端注册表。
+    注意：httpx.AsyncClient 的连接绑定创建它的事件循环，uvicorn 单 worker 单 loop 下可安全共享。
+    """
+
+    def __init__(self, limits: Optional[PoolLimits] = None) -> None:
+        self.limits = limits or PoolLimits.from_config(
+            legacy_llm._load_yaml_config(legacy_llm._get_config_file_path())
+        )
+        self._lock = threading.Lock()
+        self._adapters: Dict[ClientKey, LegacyLLMAdapter] = {}
+        self._http: Dict[bool, Tuple[httpx.Client, httpx.AsyncClient]] = {}
+        self._hits = 0
+        self._misses = 0
+
+    # === httpx 连接池 ===
+    def http_clients(self, verify_ssl: bool = True) -> Tuple[httpx.Client, httpx.AsyncClient]:
+        pair = self._http.get(verify_ssl)
+        if pair is not None:
+            return pair
+        with self._lock:
+            pair = self._http.get(verify_ssl)
+            if pair is None:
+                lim = httpx.Limits(
+                    max_connections=self.limits.max_connections,
+                    max_keepalive_connections=self.limits.max_keepalive_connections,
+                    keepalive_expiry=self.limits.keepalive_expiry,
+                )
+                timeout = httpx.Timeout(self.limits.timeout, connect=self.limits.connect_timeout)
+                pair = (
+                    httpx.Client(limits=lim, timeout=timeout, verify=verify_ssl),
+                    httpx.AsyncClient(limits=lim, timeout=timeout, verify=verify_ssl),
+                )
+                self._http[verify_ssl] = pair
+                if not verify_ssl:
+                    logger.warning("SSL verification disabled for pooled LLM http clients")
+        return pair
+
+    # === Adapter ===
+    def get(
+        self,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        profile: Optional[ModelProfile] = None,
+    ) -> LegacyLLMAdapter:
+        key = resolve_client_key(provider, model or (profile.model if profile else None))
+        if profile is not None:
+            key = key._replace(profile=profile.name)
+        adapter = self._adapters.get(key)
+        if adapter is not None:
+            self._hits += 1
+            return adapter
+        with self._lock:
+            adapter = self._adapters.get(key)
+            if adapter is None:
+                self._misses += 1
+                http_client, http_async_client = self.http_clients(key.verify_ssl)
+                adapter = LegacyLLMAdapter(
+                    provider=key.provider or None,
+                    model=key.model,
+                    http_client=http_client,
+                    http_async_client=http_async_client,
+                    temperature=profile.temperature if profile else None,
+                    max_tokens=profile.max_tokens if profile else None,
+                    profile=profile.name if profile else None,
+                )
+                self._adapters[key] = adapter
+                logger.info(f"Created pooled LLM adapter for {key}")
+            else:
+                self._hits += 1
+        return adapter
+
+    def stats(self) -> Dict[str, Any]:
+        from .router import get_router_stats
+
+        return {
+            "limits": asdict(self.limits),
+            "adapters": len(self._adapters),
+            "hits": self._hits,
+            "misses": self._misses,
+            "pools": {
+                ("verified" if verify else "unverified"): {
+                    "sync": _pool_snapshot(pair[0]),
+                    "async": _pool_snapshot(pair[1]),
+                }
+                for verify, pair in self._http.items()
+            },
+            "limiters": get_limiter_stats(),
+            "router": get_router_stats(),
+            "profiles": get_profile_stats(),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            for client, _ in self._http.values():
+                client.close()
+            self._http.clear()
+            self._adapters.clear()
+
+    async def aclose(self) -> None:
+        pairs = list(self._http.values())
+        self.close()
+        for _, aclient in pairs:
+            await aclient.aclose()
+
+
+_registry: Optional[LLMClientRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> LLMClientRegistry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = LLMClientRegistry()
+    return _registry
+
+
+# 便捷函数
+def get_llm_adapter(provider: Optional[str] = None, model: Optional[str] = None) -> LegacyLLMAdapter:
+    """
+    节点统一入口：取共享的 LegacyLLMAdapter（带连接池）。
+    llm_config.yaml routing.enabled 且未指定 provider 时返回多提供方路由客户端（接口相同，见 router.py）
+    """
+    if provider is None and model is None:
+        from .router import get_router, routing_enabled
+        if routing_enabled():
+            return get_router()
+    return get_registry().get(provider, model)
+
+
+def get_node_llm(node: str) -> LegacyLLMAdapter:
+    """按 llm_config.yaml node_profiles 取该节点的模型档案适配器（未映射时同 get_llm_adapter()）"""
+    from .router import get_router, routing_enabled
+
+    profile = profile_for_node(node)
+    if routing_enabled():
+        return get_router(profile)
+    return get_registry().get(profile=profile)
+
+
+def get_http_clients(verify_ssl: bool = True) -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """取共享的 httpx 连接池（ChatOpenAI 的 http_client / http_async_client）"""
+    return get_registry().http_clients(verify_ssl)
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    return get_registry().stats()
@@ -0,0 +1,483 @@
+"""
+多提供方路由（config/llm_config.yaml 的 providers + routing）
+- RoutingLLMClient 与 LegacyLLMAdapter 接口相同（invoke / stream / ainvoke / astream），
+  routing.enabled 时由 registry.get_llm_adapter() 返回，节点无需改动
+- 故障转移：按 routing.order 依次尝试；调用出错，或超过 latency_slo 仍没有首个 token
+  （非流式：没有返回）即取消该调用并切到下一个提供方。已推送过 token 的流不再切换
+- 熔断：每个提供方一个 CircuitBreaker，连续失败 failure_threshold 次后打开，
+  reset_timeout 秒后半开放行一个探测请求，成功即关闭
+- 对冲（hedging）：routing.hedge.nodes 中的节点（scorer / intent_recognition），主调用在
+  主提供方的 p95 首 token 时间内还没有输出时，向下一个提供方再发一个请求，
+  先产出首 token 的胜出，另一个立即取消（关闭流，释放连接与限流槽）
+- 每个提供方一个 LegacyLLMAdapter（OpenAI 兼容客户端 + 共享 httpx 连接池），
+  各自经过 limiter.py 的准入控制，但不在 limiter 里重试（失败立即转移）
+- 同步接口只做顺序故障转移（不做 SLO / 对冲），供脚本 / 离线场景使用
+
+本地演练：python -m llms.fake_openai --port 9001 --delay 2 启动假的 OpenAI 兼容服务，
+把 providers.<name>.base_url 指向它（或直接 RoutingLLMClient(specs, RoutingConfig(...))）。
+"""
+
+from __future__ import annotations
+
+import os
+import time
+import asyncio
+import inspect
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from .adapter import LegacyLLMAdapter
+from .profiles import ModelProfile
+
+logger = logging.getLogger(__name__)
+
+_hedge: ContextVar[bool] = ContextVar("llm_hedge", default=False)
+
+
+class NoProviderAvailable(RuntimeError):
+    """所有提供方都已熔断或调用失败"""
+
+
+@dataclass(frozen=True)
+class ProviderSpec:
+    name: str
+    base_url: str
+    api_key: str
+    models: Tuple[str, ...] = ()
+    verify_ssl: bool = True
+
+    @classmethod
+    def from_config(cls, name: str, conf: Dict[str, Any]) -> Optional["ProviderSpec"]:
+        """api_key 优先取 api_key_env 指向的环境变量；没有 key 的提供方跳过"""
+        api_key = (os.getenv(conf["api_key_env"]) if conf.get("api_key_env") else None) or conf.get("api_key")
+        if not api_key or not conf.get("base_url"):
+            logger.info(f"Provider {name} skipped: missing base_url or api key")
+            return None
+        return cls(
+            name=name,
+            base_url=str(conf["base_url"]).rstrip("/"),
+            api_key=str(api_key),
+            models=tuple(conf.get("models") or ()),
+            verify_ssl=bool(conf.get("verify_ssl", True)),
+        )
+
+
+@dataclass(frozen=True)
+class RoutingConfig:
+    order: Tuple[str, ...] = ()
+    model: str = ""                                    # 主模型（主提供方上的名字）
+    model_map: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    latency_slo: float = 20.0                          # 首 token（非流式：响应）SLO，秒
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+    hedge_nodes: Tuple[str, ...] = ()
+    hedge_min_delay: float = 0.5                       # p95 样本不足时的对冲延迟
+    hedge_max_delay: float = 5.0
+    hedge_min_samples: int = 20
+
+    @classmethod
+    def from_config(cls, conf: Dict[str, Any]) -> "RoutingConfig":
+        routing = conf.get("routing") or {}
+        breaker = routing.get("breaker") or {}
+        hedge = routing.get("hedge") or {}
+        return cls(
+            order=tuple(routing.get("order") or (conf.get("providers") or {}).keys()),
+            model=str(routing.get("model") or os.getenv("MODEL_NAME") or ""),
+            model_map={str(k): dict(v or {}) for k, v in (routing.get("model_map") or {}).items()},
+            latency_slo=float(routing.get("latency_slo", cls.latency_slo)),
+            failure_threshold=int(breaker.get("failure_threshold", cls.failure_threshold)),
+            reset_timeout=float(breaker.get("reset_timeout", cls.reset_timeout)),
+            hedge_nodes=tuple(hedge.get("nodes") or ()) if hedge.get("enabled") else (),
+            hedge_min_delay=float(hedge.get("min_delay", cls.hedge_min_delay)),
+            hedge_max_delay=float(hedge.get("max_delay", cls.hedge_max_delay)),
+            hedge_min_samples=int(hedge.get("min_samples", cls.hedge_min_samples)),
+        )
+
+
+@lru_cache(maxsize=1)
+def _load_config() -> Dict[str, Any]:
+    from . import llm as legacy_llm
+
+    return legacy_llm._load_yaml_config(legacy_llm._get_config_file_path())
+
+
+def routing_enabled() -> bool:
+    return bool((_load_config().get("routing") or {}).get("enabled"))
+
+
+# === 对冲开关（图节点外层设置） ===
+def hedge_for(node: str) -> bool:
+    return node in RoutingConfig.from_config(_load_config()).hedge_nodes
+
+
+@contextmanager
+def llm_hedging(enabled: bool) -> Iterator[None]:
+    token = _hedge.set(bool(enabled))
+    try:
+        yield
+    finally:
+        _hedge.reset(token)
+
+
+class CircuitBreaker:
+    """closed -> (连续失败 threshold 次) open -> (reset_timeout 后) half_open -> 成功 closed / 失败 open"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._probing:
+                    self.trips += 1
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def release_probe(self) -> None:
+        """探测请求被取消（对冲落败 / 客户端断开），既不算成功也不算失败"""
+        with self._lock:
+            self._probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {"state": self.state, "consecutive_failures": self._failures, "trips": self.trips}
+
+
+class _LatencyWindow:
+    def __init__(self, maxlen: int = 200) -> None:
+        self._samples: Deque[float] = deque(maxlen=maxlen)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def p95(self) -> Optional[float]:
+        if not self._samples:
+            return None
+        s = sorted(self._samples)
+        return s[min(len(s) - 1, int(len(s) * 0.95))]
+
+
+class _Race:
+    """一次路由调用中的多个尝试：首个产出 token 的尝试胜出，只有胜者的 token 转发给调用方"""
+
+    def __init__(self, on_token: Optional[Callable[[str], Any]]) -> None:
+        self.on_token = on_token
+        self.winner: Optional[str] = None
+        self.first_at = 0.0
+        self.first = asyncio.Event()
+
+    def sink(self, name: str) -> Callable[[str], Any]:
+        async def _on_token(token: str) -> None:
+            if self.winner is None:
+                self.winner = name
+                self.first_at = time.monotonic()
+                self.first.set()
+            if self.winner == name and self.on_token:
+                out = self.on_token(token)
+                if inspect.isawaitable(out):
+                    await out
+        return _on_token
+
+
+class RoutingLLMClient:
+    def __init__(
+        self,
+        specs: Dict[str, ProviderSpec],
+        config: RoutingConfig,
+        adapter_factory: Optional[Callable[[ProviderSpec, str, Optional[ModelProfile]], LegacyLLMAdapter]] = None,
+        profile: Optional[ModelProfile] = None,
+    ) -> None:
+        self.config = config
+        self.order = [n for n in (config.order or tuple(specs)) if n in specs]
+        if not self.order:
+            raise NoProviderAvailable("no usable provider in llm_config.yaml providers")
+        self.specs = specs
+        self.profile = profile
+        self.model = (profile.model if profile else None) or config.model or (specs[self.order[0]].models or ("",))[0]
+        self.provider = self.order[0]
+        self._factory = adapter_factory or _openai_adapter
+        self._adapters: Dict[str, LegacyLLMAdapter] = {}
+        self._breakers = {n: CircuitBreaker(config.failure_threshold, config.reset_timeout) for n in self.order}
+        self._ttft = {(n, streaming): _LatencyWindow() for n in self.order for streaming in (True, False)}
+        self._lock = threading.Lock()
+        self._stats = {n: {"calls": 0, "wins": 0, "failures": 0, "slo_timeouts": 0, "hedges": 0} for n in self.order}
+
+    @classmethod
+    def from_config(cls, conf: Dict[str, Any], profile: Optional[ModelProfile] = None) -> "RoutingLLMClient":
+        specs = {}
+        for name, pconf in (conf.get("providers") or {}).items():
+            spec = ProviderSpec.from_config(name, pconf or {})
+            if spec is not None:
+                specs[name] = spec
+        return cls(specs, RoutingConfig.from_config(conf), profile=profile)
+
+    # === 提供方选择 ===
+    def model_for(self, name: str) -> str:
+        """主模型在该提供方上的对应模型：model_map 优先，其次提供方支持主模型，否则取其第一个模型"""
+        mapped = (self.config.model_map.get(self.model) or {}).get(name)
+        if mapped:
+            return mapped
+        models = self.specs[name].models
+        if not models or self.model in models:
+            return self.model
+        return models[0]
+
+    def adapter(self, name: str) -> LegacyLLMAdapter:
+        adapter = self._adapters.get(name)
+        if adapter is None:
+            with self._lock:
+                adapter = self._adapters.get(name)
+                if adapter is None:
+                    adapter = self._factory(self.specs[name], self.model_for(name), self.profile)
+                    self._adapters[name] = adapter
+        return adapter
+
+    def _candidates(self) -> Iterator[str]:
+        """按顺序产出当前放行的提供方（熔断器的 allow() 在真正要用时才调用，避免白占半开探测名额）"""
+        for name in self.order:
+            if self._breakers[name].allow():
+                yield name
+
+    def _hedge_delay(self, name: str, streaming: bool) -> float:
+        window = self._ttft[(name, streaming)]
+        p95 = window.p95() if len(window) >= self.config.hedge_min_samples else None
+        delay = p95 if p95 is not None else self.config.hedge_min_delay
+        return min(max(delay, self.config.hedge_min_delay), self.config.hedge_max_delay)
+
+    def _bump(self, name: str, key: str) -> None:
+        with self._lock:
+            self._stats[name][key] += 1
+
+    # === 异步调用 ===
+    async def ainvoke(self, prompt: str, cache: bool = False) -> str:
+        return await self._route(prompt, None, cache, streaming=False)
+
+    async def astream(self, prompt: str, on_token: Optional[Callable[[str], Any]] = None, cache: bool = False) -> str:
+        return await self._route(prompt, on_token, cache, streaming=True)
+
+    async def _attempt(self, name: str, prompt: str, race: _Race, cache: bool, streaming: bool) -> str:
+        adapter = self.adapter(name)
+        if streaming:
+            return await adapter.astream(prompt, race.sink(name), cache=cache)
+        text = await adapter.ainvoke(prompt, cache=cache)
+        await race.sink(name)("")   # 非流式：完成即视为"首个输出"
+        return text
+
+    async def _route(self, prompt: str, on_token: Optional[Callable[[str], Any]], cache: bool, streaming: bool) -> str:
+        race = _Race(on_token)
+        candidates = self._candidates()
+        pending: Dict[asyncio.Task, Tuple[str, float]] = {}
+        errors: List[str] = []
+        hedge = _hedge.get() and len(self.order) > 1
+        first_waiter = asyncio.ensure_future(race.first.wait())
+
+        def launch() -> bool:
+            name = next(candidates, None)
+            if name is None:
+                return False
+            self._bump(name, "calls")
+            task = asyncio.ensure_future(self._attempt(name, prompt, race, cache, streaming))
+            pending[task] = (name, time.monotonic())
+            return True
+
+        def drop(task: asyncio.Task) -> None:
+            name, _ = pending.pop(task)
+            task.cancel()
+            self._breakers[name].release_probe()
+
+        if not launch():
+            first_waiter.cancel()
+            raise NoProviderAvailable("all providers are circuit-open")
+        primary, primary_t0 = next(iter(pending.values()))
+        hedge_at = primary_t0 + self._hedge_delay(primary, streaming) if hedge else None
+        settled = False
+        try:
+            while pending:
+                now = time.monotonic()
+                if race.winner is None:
+                    deadlines = [t0 + self.config.latency_slo for _, t0 in pending.values()]
+                    if hedge_at is not None:
+                        deadlines.append(hedge_at)
+                    timeout = max(0.0, min(deadlines) - now)
+                    waiters = [*pending, first_waiter]
+                else:
+                    timeout = None
+                    waiters = list(pending)
+                done, _ = await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if race.winner is not None and not settled:
+                    # 首 token 已产生：记录 TTFT，取消其他尝试
+                    settled = True
+                    for task, (name, t0) in list(pending.items()):
+                        if name == race.winner:
+                            self._ttft[(name, streaming)].add(race.first_at - t0)
+                        elif not task.done():
+                            drop(task)
+
+                for task in done:
+                    if task is first_waiter or task not in pending:
+                        continue
+                    name, t0 = pending.pop(task)
+                    exc = task.exception()
+                    if exc is None:
+                        self._breakers[name].record_success()
+                        if race.winner in (None, name):
+                            self._bump(name, "wins")
+                            return task.result()
+                        continue
+                    self._breakers[name].record_failure()
+                    self._bump(name, "failures")
+                    errors.append(f"{name}: {type(exc).__name__}: {exc}")
+                    if race.winner == name:
+                        raise exc   # 已推送过 token，不能换提供方重来
+                    logger.warning(f"LLM provider {name} failed, failing over: {exc}")
+                    if not pending:
+                        launch()
+
+                if race.winner is None:
+                    now = time.monotonic()
+                    for task, (name, t0) in list(pending.items()):
+                        if now - t0 >= self.config.latency_slo:
+                            logger.warning(f"LLM provider {name} exceeded latency SLO {self.config.latency_slo}s, failing over")
+                            self._breakers[name].record_failure()
+                            drop(task)
+                            self._bump(name, "slo_timeouts")
+                            errors.append(f"{name}: latency SLO exceeded")
+                    if not pending:
+                        launch()
+                    if hedge_at is not None and now >= hedge_at:
+                        hedge_at = None
+                        if launch():
+                            self._bump(primary, "hedges")
+            raise NoProviderAvailable("; ".join(errors) or "all providers are circuit-open")
+        finally:
+            first_waiter.cancel()
+            for task in list(pending):
+                drop(task)
+
+    # === 同步调用（顺序故障转移） ===
+    def invoke(self, prompt: str, cache: bool = False) -> str:
+        return self._route_sync(lambda a: a.invoke(prompt, cache=cache), lambda: False)
+
+    def stream(self, prompt: str, on_token: Callable[[str], None], cache: bool = False, cancel: Any = None) -> str:
+        emitted = []
+
+        def _on_token(t: str) -> None:
+            emitted.append(1)
+            if on_token:
+                on_token(t)
+
+        return self._route_sync(lambda a: a.stream(prompt, _on_token, cache=cache, cancel=cancel), lambda: bool(emitted))
+
+    def _route_sync(self, call: Callable[[LegacyLLMAdapter], str], emitted: Callable[[], bool]) -> str:
+        errors: List[str] = []
+        for name in self._candidates():
+            self._bump(name, "calls")
+            try:
+                text = call(self.adapter(name))
+            except Exception as e:
+                self._breakers[name].record_failure()
+                self._bump(name, "failures")
+                if emitted():
+                    raise
+                errors.append(f"{name}: {type(e).__name__}: {e}")
+                logger.warning(f"LLM provider {name} failed, failing over: {e}")
+                continue
+            self._breakers[name].record_success()
+            self._bump(name, "wins")
+            return text
+        raise NoProviderAvailable("; ".join(errors) or "all providers are circuit-open")
+
+    # === 指标 ===
+    def stats(self) -> Dict[str, Any]:
+        out = {}
+        for name in self.order:
+            p95 = {("stream" if s else "invoke"): self._ttft[(name, s)].p95() for s in (True, False)}
+            out[name] = {
+                **self._stats[name],
+                "model": self.model_for(name),
+                "breaker": self._breakers[name].stats(),
+                "ttft_p95_s": {k: round(v, 3) for k, v in p95.items() if v is not None},
+            }
+        return out
+
+
+def _openai_adapter(spec: ProviderSpec, model: str, profile: Optional[ModelProfile] = None) -> LegacyLLMAdapter:
+    """OpenAI 兼容客户端（DashScope compatible-mode / OpenAI / Ollama /v1 / 本地假服务）"""
+    from openai import AsyncOpenAI, OpenAI
+    from .registry import get_http_clients
+
+    http_client, http_async_client = get_http_clients(spec.verify_ssl)
+    # SDK 与 limiter 都不重试：失败立即记入熔断器并转移到下一个提供方（准入 / 限速仍走 limiter.py）
+    return LegacyLLMAdapter(
+        provider=spec.name,
+        model=model,
+        http_client=http_client,
+        http_async_client=http_async_client,
+        client=OpenAI(api_key=spec.api_key, base_url=spec.base_url, http_client=http_client, max_retries=0),
+        async_client=AsyncOpenAI(api_key=spec.api_key, base_url=spec.base_url, http_client=http_async_client, max_retries=0),
+        temperature=profile.temperature if profile else None,
+        max_tokens=profile.max_tokens if profile else None,
+        profile=profile.name if profile else None,
+        max_retries=0,
+    )
+
+
+_routers: Dict[str, RoutingLLMClient] = {}
+_router_lock = threading.Lock()
+
+
+def get_router(profile: Optional[ModelProfile] = None) -> RoutingLLMClient:
+    """按模型档案共享的路由客户端（无档案时为 "default"）"""
+    key = profile.name if profile else "default"
+    router = _routers.get(key)
+    if router is None:
+        with _router_lock:
+            router = _routers.get(key)
+            if router is None:
+                router = RoutingLLMClient.from_config(_load_config(), profile)
+                _routers[key] = router
+    return router
+
+
+def get_router_stats() -> Dict[str, Any]:
+    return {key: router.stats() for key, router in list(_routers.items())}
@@ -0,0 +1,289 @@
+"""
+自适应施测（CAT）：逐题决定下一题，维度的严重性分档一旦确定就停止追问
+- 题目参数（离线标定，data/<bank>.calibration.json）：
+    x_i = mean_i + slope_i * (θ - dim_mean) + e_i,  e_i ~ N(0, resid_var_i)
+  θ 为该维度“全部作答时”的平均分（即 aggregator 用来分档的量）
+- 每次打分后按线性高斯模型更新 θ 的后验（先验 N(dim_mean, dim_var)），
+  信息量 slope² / resid_var 最大的未答题作为下一题
+- 停止条件（按维度）：
+    determined  作答 ≥ min_items，后验落在同一分档的概率 ≥ confidence，且已答题均分的分档与之一致
+    max_items   作答数达到 max_items（即 planner_per_dim）
+    exhausted   候选题用完
+- 未标定的题使用默认参数（mean=3, slope=1, resid_var=1），退化为“带先验的均分估计”
+
+标定：
+    python -m src.services.adaptive_planner --bank questions_mqol_v1 [--database-url ...]
+从历史 item_scores（已做反向计分）按会话估计维度均分，对每题做回归。
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import logging
+import argparse
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .question_bank import QuestionBank, get_question_bank, resolve_bank_path
+from .severity import SEVERE, MODERATE, GOOD, classify_severity, severity_thresholds
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIDENCE = 0.9
+DEFAULT_MIN_ITEMS = 2
+MIN_CALIBRATION_SAMPLES = 20
+
+_DEFAULT_ITEM = {"mean": 3.0, "slope": 1.0, "resid_var": 1.0}
+_DEFAULT_DIM = {"mean": 3.0, "var": 1.0}
+_FINAL_STATES = ("determined", "max_items", "exhausted")
+
+
+# ========== 标定参数 ==========
+def calibration_path_for(bank: Optional[str] = None) -> Path:
+    p = resolve_bank_path(bank)
+    return p.with_name(p.stem + ".calibration.json")
+
+
+_calib_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+_calib_lock = threading.Lock()
+
+
+def load_calibration(bank: Optional[str] = None) -> Dict[str, Any]:
+    """按 mtime 缓存；没有标定文件时返回空参数（全部用默认值）"""
+    path = calibration_path_for(bank)
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return {"items": {}, "dims": {}}
+    hit = _calib_cache.get(str(path))
+    if hit and hit[0] == mtime:
+        return hit[1]
+    with _calib_lock:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f) or {}
+        except Exception as e:
+            logger.warning(f"Failed to load calibration {path}: {e}")
+            data = {}
+        data.setdefault("items", {})
+        data.setdefault("dims", {})
+        _calib_cache[str(path)] = (mtime, data)
+    return data
+
+
+def _item_params(calib: Dict[str, Any], qid: str) -> Dict[str, float]:
+    return {**_DEFAULT_ITEM, **(calib["items"].get(qid) or {})}
+
+
+def item_information(calib: Dict[str, Any], qid: str) -> float:
+    p = _item_params(calib, qid)
+    return p["slope"] ** 2 / max(p["resid_var"], 1e-6)
+
+
+# ========== 估计 ==========
+def _norm_cdf(x: float) -> float:
+    return 0.5 * (1.0 + math.erf(x / math.sqrt(2.0)))
+
+
+def estimate_dimension(calib: Dict[str, Any], dimension: str, scores: Dict[str, float]) -> Tuple[float, float]:
+    """返回 θ 的后验 (mean, sd)"""
+    prior = {**_DEFAULT_DIM, **(calib["dims"].get(dimension) or {})}
+    precision = 1.0 / max(prior["var"], 1e-6)
+    acc = 0.0
+    for qid, x in scores.items():
+        p = _item_params(calib, qid)
+        psi = max(p["resid_var"], 1e-6)
+        precision += p["slope"] ** 2 / psi
+        acc += p["slope"] * (float(x) - p["mean"]) / psi
+    mean = prior["mean"] + acc / precision
+    return mean, math.sqrt(1.0 / precision)
+
+
+def band_probability(mean: float, sd: float) -> Tuple[str, float]:
+    """后验均值所在分档，以及 θ 落在该分档内的概率"""
+    severe, moderate = severity_thresholds()
+    band = classify_severity(mean)
+    lo, hi = {
+        SEVERE: (-math.inf, severe),
+        MODERATE: (severe, moderate),
+        GOOD: (moderate, math.inf),
+    }[band]
+    p_hi = 1.0 if hi == math.inf else _norm_cdf((hi - mean) / sd)
+    p_lo = 0.0 if lo == -math.inf else _norm_cdf((lo - mean) / sd)
+    return band, p_hi - p_lo
+
+
+# ========== 施测流程 ==========
+def _latest_scores(state: Dict[str, Any]) -> Dict[str, float]:
+    """同一题多次打分（澄清后重打）取最后一次；优先用增量累加器里的最新分"""
+    agg = state.get("agg")
+    if agg:
+        return {qid: rec["score"] for qid, rec in agg["items"].items()}
+    out: Dict[str, float] = {}
+    for rec in state.get("item_scores") or []:
+        if rec.get("score") is not None:
+            out[str(rec.get("question_id"))] = float(rec["score"])
+    return out
+
+
+def start_adaptive_plan(
+    state: Dict[str, Any],
+    bank: QuestionBank,
+    pool_plan: List[Dict[str, Any]],
+    confidence: float = DEFAULT_CONFIDENCE,
+    min_items: int = DEFAULT_MIN_ITEMS,
+    max_items: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    pool_plan 为固定模式选出的候选题（决定参与的维度与每维度的题目池）；
+    state["plan"] 先只放第一题，之后每次打分由 advance_adaptive_plan 追加
+    """
+    pool: Dict[str, List[str]] = {}
+    for it in pool_plan:
+        pool.setdefault(it["dimension"], []).append(str(it["question_id"]))
+    state["cat"] = {
+        "bank": bank.path,
+        "order": list(pool.keys()),
+        "pool": pool,
+        "confidence": float(confidence),
+        "min_items": max(1, int(min_items)),
+        "max_items": int(max_items) if max_items else max((len(v) for v in pool.values()), default=0),
+        "status": {},
+    }
+    state["plan"] = []
+    advance_adaptive_plan(state, bank)
+    return state["cat"]
+
+
+def advance_adaptive_plan(state: Dict[str, Any], bank: Optional[QuestionBank] = None) -> bool:
+    """
+    更新各维度估计，向 state["plan"] 追加下一题；全部维度停止时返回 False。
+    维度按顺序逐个完成（话题连贯，和固定模式一样按维度分组提问）。
+    """
+    cat = state.get("cat")
+    if not cat:
+        return False
+    bank = bank or get_question_bank(cat["bank"])
+    calib = load_calibration(cat["bank"])
+    scores = _latest_scores(state)
+    plan = state.setdefault("plan", [])
+    asked = {str(p.get("question_id")) for p in plan}
+
+    for dim in cat["order"]:
+        status = cat["status"].setdefault(dim, {"state": "active"})
+        if status["state"] in _FINAL_STATES:
+            continue
+        pool = cat["pool"][dim]
+        answered = {qid: scores[qid] for qid in pool if qid in scores}
+        if answered:
+            mean, sd = estimate_dimension(calib, dim, answered)
+            band, prob = band_probability(mean, sd)
+            observed = classify_severity(sum(answered.values()) / len(answered))
+            status.update({"n": len(answered), "mean": round(mean, 3), "sd": round(sd, 3),
+                           "band": band, "p": round(prob, 3)})
+            if len(answered) >= cat["min_items"] and prob >= cat["confidence"] and observed == band:
+                status["state"] = "determined"
+                continue
+            if len(answered) >= cat["max_items"]:
+                status["state"] = "max_items"
+                continue
+        remaining = [qid for qid in pool if qid not in asked]
+        if not remaining:
+            status["state"] = "exhausted"
+            continue
+        nxt = max(remaining, key=lambda q: (item_information(calib, q), -bank.position.get(q, 0)))
+        item = bank.get(nxt)
+        if item is None:
+            pool.remove(nxt)
+            return advance_adaptive_plan(state, bank)
+        plan.append(item.to_plan_item())
+        return True
+    return False
+
+
+# ========== 离线标定 ==========
+def calibrate(rows: Iterable[Dict[str, Any]], min_samples: int = MIN_CALIBRATION_SAMPLES) -> Dict[str, Any]:
+    """
+    rows: [{session_id, question_id, dimension, score}]（score 已做反向计分）
+    θ 用同一会话同维度其余题的均分（留一）估计，对每题做简单线性回归。
+    """
+    by_session: Dict[Tuple[str, str], Dict[str, float]] = {}
+    for r in rows:
+        key = (str(r["session_id"]), str(r["dimension"]))
+        by_session.setdefault(key, {})[str(r["question_id"])] = float(r["score"])
+
+    dim_means: Dict[str, List[float]] = {}
+    pairs: Dict[str, List[Tuple[float, float]]] = {}
+    for (_, dim), answers in by_session.items():
+        total = sum(answers.values())
+        dim_means.setdefault(dim, []).append(total / len(answers))
+        if len(answers) < 2:
+            continue
+        for qid, x in answers.items():
+            pairs.setdefault(qid, []).append(((total - x) / (len(answers) - 1), x))
+
+    def _mean_var(xs: List[float]) -> Tuple[float, float]:
+        m = sum(xs) / len(xs)
+        return m, sum((x - m) ** 2 for x in xs) / max(len(xs) - 1, 1)
+
+    dims = {}
+    for dim, xs in dim_means.items():
+        if len(xs) >= min_samples:
+            m, v = _mean_var(xs)
+            dims[dim] = {"mean": round(m, 4), "var": round(max(v, 0.05), 4), "n": len(xs)}
+
+    items = {}
+    for qid, ps in pairs.items():
+        if len(ps) < min_samples:
+            continue
+        mt, vt = _mean_var([p[0] for p in ps])
+        mx, _ = _mean_var([p[1] for p in ps])
+        cov = sum((t - mt) * (x - mx) for t, x in ps) / max(len(ps) - 1, 1)
+        slope = min(1.5, max(0.2, cov / vt)) if vt > 1e-6 else 1.0
+        resid = sum((x - (mx + slope * (t - mt))) ** 2 for t, x in ps) / max(len(ps) - 2, 1)
+        items[qid] = {"mean": round(mx, 4), "slope": round(slope, 4), "resid_var": round(max(resid, 0.2), 4), "n": len(ps)}
+    return {"items": items, "dims": dims}
+
+
+def calibrate_from_db(bank: Optional[str] = None, database_url: Optional[str] = None) -> Dict[str, Any]:
+    from sqlalchemy import create_engine, select
+    from sqlalchemy.orm import Session as SASession
+    from db.models import ItemScore
+
+    if database_url:
+        engine = create_engine(database_url, future=True)
+    else:
+        from db.session import engine
+
+    qb = get_question_bank(bank)
+    with SASession(engine) as sa:
+        result = sa.execute(select(ItemScore.session_id, ItemScore.question_id, ItemScore.dimension, ItemScore.score))
+        rows = [
+            {"session_id": s, "question_id": q, "dimension": d, "score": sc}
+            for s, q, d, sc in result if qb.get(q) is not None
+        ]
+    calib = calibrate(rows)
+    calib["bank"] = qb.version
+    calib["bank_hash"] = qb.content_hash
+    calib["rows"] = len(rows)
+    return calib
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="根据历史 item_scores 标定 CAT 题目参数")
+    parser.add_argument("--bank", default=None, help="题库版本名或路径，默认 questions_mqol_v1")
+    parser.add_argument("--database-url", default=None, help="默认使用 Settings.database_url")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    calib = calibrate_from_db(args.bank, args.database_url)
+    out = calibration_path_for(args.bank)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(calib, f, ensure_ascii=False, indent=2, sort_keys=True)
+    print(json.dumps({"path": str(out), "rows": calib["rows"], "items": len(calib["items"]),
+                      "dims": len(calib["dims"])}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+维度聚合（增量）
+- state["agg"] 为运行中的累加器，run_scorer 每打一题 O(1) 更新：
+    {"dims":  {dim: {"wsum": Σw·s, "wtotal": Σw, "count": n}},
+     "items": {question_id: {"dimension", "score", "weight"}}}
+  同一题重打（澄清后）先扣掉旧贡献再加新贡献，item_scores 里的重复行不会重复计分
+- snapshot() 随时给出当前 dim_scores / severity / overall（可作为实时进度推送）
+- aggregator_node 只需 snapshot 一次（维度数常数级）；没有累加器的旧状态回落 aggregate_scores()
+- 维度分 = 题目加权均分；总分 = 维度分按 dim_weights（severity_thresholds.yaml，默认 1.0）加权
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Optional
+
+from .severity import classify_severity, load_severity_config
+
+
+# 两位小数四舍五入前加一个极小量：不同求和顺序（增量/全量/向量化）在 .xx5 边界上结果一致
+_ROUND_EPS = 1e-9
+
+
+def round_score(x: float) -> float:
+    return round(x + _ROUND_EPS, 2)
+
+
+def new_running_aggregate() -> Dict[str, Any]:
+    return {"dims": {}, "items": {}}
+
+
+def update_running_aggregate(
+    agg: Dict[str, Any],
+    question_id: str,
+    dimension: str,
+    score: float,
+    weight: float = 1.0,
+) -> Dict[str, Any]:
+    qid = str(question_id)
+    weight = float(weight if weight is not None else 1.0)
+    old = agg["items"].get(qid)
+    if old is not None:
+        acc = agg["dims"][old["dimension"]]
+        acc["wsum"] -= old["score"] * old["weight"]
+        acc["wtotal"] -= old["weight"]
+        acc["count"] -= 1
+        if acc["count"] <= 0:
+            del agg["dims"][old["dimension"]]
+    acc = agg["dims"].setdefault(dimension, {"wsum": 0.0, "wtotal": 0.0, "count": 0})
+    acc["wsum"] += float(score) * weight
+    acc["wtotal"] += weight
+    acc["count"] += 1
+    agg["items"][qid] = {"dimension": dimension, "score": float(score), "weight": weight}
+    return agg
+
+
+def snapshot(agg: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    dim_weights = load_severity_config()["dim_weights"]
+    dim_scores: Dict[str, float] = {}
+    for dim, acc in (agg or {}).get("dims", {}).items():
+        if acc["wtotal"] > 0:
+            dim_scores[dim] = round_score(acc["wsum"] / acc["wtotal"])
+
+    overall = None
+    if dim_scores:
+        total_w = sum(dim_weights.get(d, 1.0) for d in dim_scores)
+        if total_w > 0:
+            overall = round_score(sum(s * dim_weights.get(d, 1.0) for d, s in dim_scores.items()) / total_w)
+
+    return {
+        "dim_scores": dim_scores,
+        "severity": {d: classify_severity(s) for d, s in dim_scores.items()},
+        "overall_score": overall,
+        "overall_severity": classify_severity(overall),
+        "answered": len((agg or {}).get("items", {})),
+    }
+
+
+def aggregate_scores(item_scores: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """全量聚合（兼容入口）：按出现顺序回放，同题取最后一次"""
+    agg = new_running_aggregate()
+    for i, rec in enumerate(item_scores or []):
+        if rec.get("score") is None or not rec.get("dimension"):
+            continue
+        qid = rec.get("question_id") or f"#{i}"
+        update_running_aggregate(agg, qid, rec["dimension"], rec["score"], rec.get("weight", 1.0))
+    return snapshot(agg)
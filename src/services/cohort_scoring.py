@@ -0,0 +1,345 @@
+"""
+批量（队列）评分引擎：对成千上万个已完成会话一次性算维度分 / 总分 / 严重性分布
+- 按块流式读取 ItemScore（或 Answer）行 -> 会话 × 题目 矩阵（缺答为 NaN）
+- 题目维度、权重、反向计分向量来自题库（question_bank）；同一会话同一题取最后一次打分
+- 维度加权均分 / 总分（dim_weights）/ 严重性分档（severity_thresholds.yaml）全部向量化计算，
+  口径与单会话的 services.aggregator.aggregate_scores 一致
+- 输出列式文件：.npz（默认）/ .parquet（需 pyarrow）/ .csv
+- 依赖 numpy（可选依赖：pip install -e .[analytics]）
+
+用法：
+    python -m src.services.cohort_scoring --out var/cohort_v1.npz [--source answers] [--chunk-size 50000]
+    python -m src.services.cohort_scoring --bench 20000      # 与逐会话 aggregate_scores 对比
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import time
+import random
+import logging
+import argparse
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .question_bank import QuestionBank, get_question_bank
+from .severity import SEVERE, MODERATE, GOOD, load_severity_config
+from .aggregator import _ROUND_EPS, aggregate_scores
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_LABELS = (SEVERE, MODERATE, GOOD)
+DEFAULT_CHUNK_SIZE = 50000
+
+
+class CohortResult:
+    """列式结果：每个属性都是长度为 n_sessions 的数组"""
+
+    def __init__(
+        self,
+        session_ids: np.ndarray,
+        dimensions: Sequence[str],
+        dim_scores: np.ndarray,
+        overall_score: np.ndarray,
+        answered: np.ndarray,
+        thresholds: Tuple[float, float],
+    ) -> None:
+        self.session_ids = session_ids
+        self.dimensions = list(dimensions)
+        self.dim_scores = dim_scores                    # (n, D)，未作答维度为 NaN
+        self.overall_score = overall_score              # (n,)
+        self.answered = answered                        # (n,)
+        self.thresholds = thresholds
+        self.dim_severity = severity_codes(dim_scores, thresholds)        # (n, D)，-1 = 无
+        self.overall_severity = severity_codes(overall_score, thresholds)
+
+    def __len__(self) -> int:
+        return len(self.session_ids)
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        cols: Dict[str, np.ndarray] = {
+            "session_id": self.session_ids.astype(str),
+            "answered": self.answered,
+            "overall_score": self.overall_score,
+            "overall_severity": severity_labels(self.overall_severity),
+        }
+        for j, dim in enumerate(self.dimensions):
+            cols[f"score_{dim}"] = self.dim_scores[:, j]
+            cols[f"severity_{dim}"] = severity_labels(self.dim_severity[:, j])
+        return cols
+
+    def summary(self) -> Dict[str, Any]:
+        """维度分布：均值、分位数、各分档人数"""
+        out: Dict[str, Any] = {"sessions": len(self), "dimensions": {}}
+        for j, dim in enumerate(self.dimensions + ["overall"]):
+            scores = self.overall_score if dim == "overall" else self.dim_scores[:, j]
+            codes = self.overall_severity if dim == "overall" else self.dim_severity[:, j]
+            valid = scores[~np.isnan(scores)]
+            if valid.size == 0:
+                continue
+            p10, p50, p90 = np.percentile(valid, [10, 50, 90])
+            out["dimensions"][dim] = {
+                "n": int(valid.size),
+                "mean": round(float(valid.mean()), 3),
+                "p10": round(float(p10), 2), "p50": round(float(p50), 2), "p90": round(float(p90), 2),
+                "bands": {label: int((codes == k).sum()) for k, label in enumerate(SEVERITY_LABELS)},
+            }
+        return out
+
+    def write(self, path: str) -> str:
+        p = Path(path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        cols = self.columns()
+        suffix = p.suffix.lower()
+        if suffix == ".parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            pq.write_table(pa.table(cols), p)
+        elif suffix == ".csv":
+            names = list(cols.keys())
+            with open(p, "w", encoding="utf-8", newline="") as f:
+                w = csv.writer(f)
+                w.writerow(names)
+                for row in zip(*(cols[n].tolist() for n in names)):
+                    w.writerow(["" if isinstance(v, float) and np.isnan(v) else v for v in row])
+        else:
+            if suffix != ".npz":
+                p = p.with_suffix(".npz")
+            np.savez_compressed(p, **cols)
+        return str(p)
+
+
+# ========== 向量化计算 ==========
+def severity_codes(scores: np.ndarray, thresholds: Tuple[float, float]) -> np.ndarray:
+    """0=严重 1=中度 2=良好 -1=无分数（左闭右开，与 classify_severity 一致）"""
+    codes = np.digitize(scores, np.asarray(thresholds, dtype=float), right=False).astype(np.int8)
+    codes[np.isnan(scores)] = -1
+    return codes
+
+
+def severity_labels(codes: np.ndarray) -> np.ndarray:
+    lookup = np.array(SEVERITY_LABELS + ("",), dtype=object)
+    return lookup[np.where(codes < 0, len(SEVERITY_LABELS), codes)]
+
+
+class CohortScorer:
+    def __init__(self, bank: QuestionBank) -> None:
+        self.bank = bank
+        self.dimensions: List[str] = bank.dimensions
+        self.qpos: Dict[str, int] = {it.question_id: i for i, it in enumerate(bank.items)}
+        dim_pos = {d: j for j, d in enumerate(self.dimensions)}
+        n_q, n_d = len(bank.items), len(self.dimensions)
+        self.weights = np.array([it.weight for it in bank.items], dtype=np.float64)
+        self.reverse = np.array([it.reverse_scored for it in bank.items], dtype=bool)
+        # 题目 -> 维度 one-hot（Q × D）
+        self.dim_matrix = np.zeros((n_q, n_d), dtype=np.float64)
+        self.dim_matrix[np.arange(n_q), [dim_pos[it.dimension] for it in bank.items]] = 1.0
+        conf = load_severity_config()
+        self.thresholds = (conf["thresholds"]["severe"], conf["thresholds"]["moderate"])
+        self.dim_weights = np.array([conf["dim_weights"].get(d, 1.0) for d in self.dimensions], dtype=np.float64)
+
+    def score_matrix(self, scores: np.ndarray, raw: bool = False) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        scores: (n, Q)，缺答为 NaN；raw=True 表示尚未反向计分（Answer 原始分）
+        返回 (dim_scores (n, D), overall (n,), answered (n,))
+        """
+        if raw:
+            scores = np.where(self.reverse, 6.0 - scores, scores)
+        present = ~np.isnan(scores)
+        filled = np.where(present, scores, 0.0)
+        wsum = (filled * self.weights) @ self.dim_matrix
+        wtot = (present * self.weights) @ self.dim_matrix
+        with np.errstate(invalid="ignore", divide="ignore"):
+            dim_scores = np.round(np.where(wtot > 0, wsum / wtot, np.nan) + _ROUND_EPS, 2)
+        has = ~np.isnan(dim_scores)
+        dw = np.where(has, self.dim_weights, 0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            overall = np.where(
+                dw.sum(axis=1) > 0,
+                np.nansum(np.where(has, dim_scores, 0.0) * dw, axis=1) / dw.sum(axis=1),
+                np.nan,
+            )
+        return dim_scores, np.round(overall + _ROUND_EPS, 2), present.sum(axis=1)
+
+    def build_matrix(
+        self,
+        session_ids: np.ndarray,
+        question_ids: Sequence[str],
+        scores: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """(session, question, score) 行（按会话、时间排序）-> (会话, n × Q 矩阵)；同格后写覆盖先写"""
+        change = np.empty(len(session_ids), dtype=bool)
+        change[:1] = True
+        change[1:] = session_ids[1:] != session_ids[:-1]
+        uniq, rows = session_ids[change], np.cumsum(change) - 1
+        cols = np.fromiter((self.qpos.get(q, -1) for q in question_ids), dtype=np.int64, count=len(question_ids))
+        keep = cols >= 0
+        rows, cols, vals = rows[keep], cols[keep], scores[keep]
+        n_q = len(self.qpos)
+        flat = rows * n_q + cols
+        # 同一 (会话, 题) 只保留最后一次：反转后 unique 取首次出现
+        _, last = np.unique(flat[::-1], return_index=True)
+        idx = len(flat) - 1 - last
+        mat = np.full((len(uniq), n_q), np.nan)
+        mat[rows[idx], cols[idx]] = vals[idx]
+        return uniq, mat
+
+    def score_rows(self, chunks: Iterable[Tuple[np.ndarray, List[str], np.ndarray]], raw: bool = False) -> CohortResult:
+        """
+        chunks: 按 session_id 排序的 (session_ids, question_ids, scores) 块；
+        跨块的会话会被暂存到下一块一起处理，内存只与块大小有关
+        """
+        out_ids, out_dims, out_overall, out_answered = [], [], [], []
+        carry: Optional[Tuple[np.ndarray, List[str], np.ndarray]] = None
+
+        def _emit(sids, qids, vals):
+            uniq, mat = self.build_matrix(sids, qids, vals)
+            dims, overall, answered = self.score_matrix(mat, raw=raw)
+            out_ids.append(uniq)
+            out_dims.append(dims)
+            out_overall.append(overall)
+            out_answered.append(answered)
+
+        for sids, qids, vals in chunks:
+            if carry is not None:
+                sids = np.concatenate([carry[0], sids])
+                qids = carry[1] + list(qids)
+                vals = np.concatenate([carry[2], vals])
+                carry = None
+            if len(sids) == 0:
+                continue
+            # 最后一个会话可能延续到下一块
+            last, cut = sids[-1], len(sids) - 1
+            while cut > 0 and sids[cut - 1] == last:
+                cut -= 1
+            if cut > 0:
+                _emit(sids[:cut], list(qids[:cut]), vals[:cut])
+            carry = (sids[cut:], list(qids[cut:]), vals[cut:])
+        if carry is not None and len(carry[0]):
+            _emit(*carry)
+
+        n_d = len(self.dimensions)
+        return CohortResult(
+            session_ids=np.concatenate(out_ids) if out_ids else np.array([], dtype=object),
+            dimensions=self.dimensions,
+            dim_scores=np.vstack(out_dims) if out_dims else np.empty((0, n_d)),
+            overall_score=np.concatenate(out_overall) if out_overall else np.empty(0),
+            answered=np.concatenate(out_answered) if out_answered else np.empty(0, dtype=np.int64),
+            thresholds=self.thresholds,
+        )
+
+
+# ========== 数据源 ==========
+def iter_db_chunks(
+    source: str = "item_scores",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    database_url: Optional[str] = None,
+) -> Iterator[Tuple[np.ndarray, List[str], np.ndarray]]:
+    """按 (session_id, created_at) 顺序流式读取；Answer 的 score 与 ItemScore 一样已做反向计分"""
+    from sqlalchemy import create_engine, select
+    from sqlalchemy.orm import Session as SASession
+    from db.models import ItemScore, Answer
+
+    model = Answer if source == "answers" else ItemScore
+    if database_url:
+        engine = create_engine(database_url, future=True)
+    else:
+        from db.session import engine
+
+    stmt = (
+        select(model.session_id, model.question_id, model.score)
+        .order_by(model.session_id, model.created_at)
+        .execution_options(yield_per=chunk_size, stream_results=True)
+    )
+    with SASession(engine) as sa:
+        for part in sa.execute(stmt).partitions(chunk_size):
+            sids, qids, vals = zip(*part)
+            yield np.array(sids, dtype=object), list(qids), np.array(vals, dtype=np.float64)
+
+
+def score_cohort(
+    bank: Optional[str] = None,
+    source: str = "item_scores",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    database_url: Optional[str] = None,
+) -> CohortResult:
+    scorer = CohortScorer(get_question_bank(bank))
+    return scorer.score_rows(iter_db_chunks(source, chunk_size, database_url))
+
+
+# ========== 基准 ==========
+def _synthetic_rows(bank: QuestionBank, n_sessions: int, seed: int = 0) -> List[Tuple[str, str, str, float, float]]:
+    rnd = random.Random(seed)
+    items = bank.items
+    rows = []
+    for s in range(n_sessions):
+        sid = f"S{s:07d}"
+        for it in rnd.sample(items, k=min(len(items), rnd.randint(20, 40))):
+            rows.append((sid, it.question_id, it.dimension, float(rnd.randint(1, 5)), it.weight))
+            if rnd.random() < 0.05:  # 澄清后重打
+                rows.append((sid, it.question_id, it.dimension, float(rnd.randint(1, 5)), it.weight))
+    return rows
+
+
+def benchmark(n_sessions: int = 20000, bank: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+    qb = get_question_bank(bank)
+    rows = _synthetic_rows(qb, n_sessions)
+
+    t0 = time.perf_counter()
+    per_session: Dict[str, List[Dict[str, Any]]] = {}
+    for sid, qid, dim, score, weight in rows:
+        per_session.setdefault(sid, []).append({"question_id": qid, "dimension": dim, "score": score, "weight": weight})
+    baseline = {sid: aggregate_scores(recs) for sid, recs in per_session.items()}
+    t_loop = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    scorer = CohortScorer(qb)
+
+    def _chunks():
+        for i in range(0, len(rows), chunk_size):
+            part = rows[i:i + chunk_size]
+            yield (np.array([r[0] for r in part], dtype=object), [r[1] for r in part],
+                   np.array([r[3] for r in part], dtype=np.float64))
+
+    res = scorer.score_rows(_chunks())
+    t_vec = time.perf_counter() - t0
+
+    mismatches = 0
+    for i, sid in enumerate(res.session_ids):
+        b = baseline[sid]
+        if b["overall_score"] is None or abs(b["overall_score"] - res.overall_score[i]) > 1e-6:
+            mismatches += 1
+    return {
+        "sessions": len(res),
+        "rows": len(rows),
+        "per_session_seconds": round(t_loop, 3),
+        "vectorized_seconds": round(t_vec, 3),
+        "speedup": round(t_loop / t_vec, 1) if t_vec else None,
+        "overall_mismatches": mismatches,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="批量计算会话维度分/严重性分布（列式输出）")
+    parser.add_argument("--bank", default=None)
+    parser.add_argument("--source", choices=["item_scores", "answers"], default="item_scores")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--out", default="var/cohort_scores.npz", help=".npz / .parquet / .csv")
+    parser.add_argument("--bench", type=int, default=0, help="只跑基准：合成 N 个会话，与逐会话聚合对比")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.bench:
+        print(json.dumps(benchmark(args.bench, args.bank, args.chunk_size), ensure_ascii=False))
+        return
+    res = score_cohort(args.bank, args.source, args.chunk_size, args.database_url)
+    path = res.write(args.out)
+    print(json.dumps({"path": path, **res.summary()}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
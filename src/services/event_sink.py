@@ -0,0 +1,239 @@
+"""
+会话事件缓冲（流式 token / 进度事件）
+- 节点的 emit 回调写到这里，不再 append 到 state["execution_log"]；
+  state 只保留节点级摘要（completed/scored/...），大小不随 token 数增长
+- 每个会话一个有界环形缓冲（deque(maxlen)），事件带会话内递增 seq，便于按 seq 增量拉取
+- 保留策略：单会话 buffer_size 条；会话空闲超过 session_ttl 秒丢弃；会话数超过 max_sessions 时淘汰最久未活跃的
+- 订阅：subscribe() 给每个连接（SSE）一个有界 asyncio 队列，record() 实时推送；
+  队列满时不阻塞节点，只标记 overflowed，消费者按 seq 从环形缓冲补齐（同一机制用于 Last-Event-ID 续传）
+- 可选 DB 写入：非 token 事件经写后队列（services/write_behind.py）批量写入 execution_logs
+
+查询（调试用）：
+    sink = get_event_sink()
+    sink.query(session_id, node="scorer", types=["score"], since_seq=120, limit=50)
+    sink.stats()
+"""
+
+from __future__ import annotations
+
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 不落库的高频事件
+_TRANSIENT_TYPES = ("token",)
+
+
+def _event_fields(event: Any) -> tuple:
+    """兼容 StreamEvent（type 为枚举）与普通 dict"""
+    if isinstance(event, dict):
+        etype, payload, node = event.get("type"), event.get("payload"), event.get("node")
+    else:
+        etype, payload, node = getattr(event, "type", None), getattr(event, "payload", None), getattr(event, "node", None)
+    etype = getattr(etype, "value", etype)
+    return str(etype or "event"), payload if payload is not None else {}, node
+
+
+class EventSubscription:
+    """单个连接的有界事件队列；只在所属事件循环里消费"""
+
+    def __init__(self, session_id: str, max_queue: int = 256) -> None:
+        self.session_id = session_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, int(max_queue)))
+        self.overflowed = False
+        self.dropped = 0
+
+    def offer(self, rec: Dict[str, Any]) -> None:
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self._put(rec)
+        elif not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._put, rec)
+
+    def _put(self, rec: Dict[str, Any]) -> None:
+        try:
+            self.queue.put_nowait(rec)
+        except asyncio.QueueFull:
+            # 慢消费者：丢弃并标记，消费者稍后按 seq 从环形缓冲补齐
+            self.overflowed = True
+            self.dropped += 1
+
+    def drain(self) -> None:
+        """补齐前清空队列（补齐会从缓冲重新读取这些事件）"""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.overflowed = False
+
+    async def get(self) -> Dict[str, Any]:
+        return await self.queue.get()
+
+
+class _SessionBuffer:
+    __slots__ = ("events", "next_seq", "last_active")
+
+    def __init__(self, size: int) -> None:
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=size)
+        self.next_seq = 1
+        self.last_active = time.monotonic()
+
+
+class SessionEventSink:
+    def __init__(
+        self,
+        buffer_size: int = 500,
+        session_ttl: float = 3600,
+        max_sessions: int = 1000,
+        writer: Optional[Any] = None,
+    ) -> None:
+        self.buffer_size = max(1, int(buffer_size))
+        self.session_ttl = float(session_ttl)
+        self.max_sessions = max(1, int(max_sessions))
+        self.writer = writer
+        self._sessions: "OrderedDict[str, _SessionBuffer]" = OrderedDict()
+        self._subscribers: Dict[str, List[EventSubscription]] = {}
+        self._lock = threading.Lock()
+        self._stats = {"recorded": 0, "dropped": 0, "expired_sessions": 0, "evicted_sessions": 0}
+
+    # === 写入 ===
+    def record(self, session_id: str, node: str, event: Any) -> Dict[str, Any]:
+        etype, payload, event_node = _event_fields(event)
+        now = time.monotonic()
+        with self._lock:
+            buf = self._sessions.get(session_id)
+            if buf is None:
+                buf = self._sessions[session_id] = _SessionBuffer(self.buffer_size)
+                self._enforce_retention(now)
+            else:
+                self._sessions.move_to_end(session_id)
+            if len(buf.events) == buf.events.maxlen:
+                self._stats["dropped"] += 1
+            rec = {
+                "seq": buf.next_seq,
+                "ts": time.time(),
+                "node": node,
+                "type": etype,
+                "payload": payload,
+            }
+            if event_node and event_node != node:
+                rec["source"] = event_node
+            buf.next_seq += 1
+            buf.last_active = now
+            buf.events.append(rec)
+            self._stats["recorded"] += 1
+            subscribers = list(self._subscribers.get(session_id, ()))
+        for sub in subscribers:
+            sub.offer(rec)
+        if self.writer is not None and etype not in _TRANSIENT_TYPES:
+            self.writer.add(session_id, {"step": f"{node}_event", "status": etype, "payload": payload, "seq": rec["seq"]})
+        return rec
+
+    # === 订阅 ===
+    def subscribe(self, session_id: str, max_queue: int = 256) -> EventSubscription:
+        """需在事件循环内调用；订阅之后再 query() 回放，按 seq 去重即可无缝衔接"""
+        sub = EventSubscription(session_id, max_queue)
+        with self._lock:
+            self._subscribers.setdefault(session_id, []).append(sub)
+        return sub
+
+    def unsubscribe(self, sub: EventSubscription) -> None:
+        with self._lock:
+            subs = self._subscribers.get(sub.session_id)
+            if subs and sub in subs:
+                subs.remove(sub)
+                if not subs:
+                    del self._subscribers[sub.session_id]
+
+    def _enforce_retention(self, now: float) -> None:
+        # 调用方持有锁；OrderedDict 按最近活跃排序，最久未活跃的在最前
+        while self._sessions:
+            sid, buf = next(iter(self._sessions.items()))
+            if now - buf.last_active > self.session_ttl:
+                del self._sessions[sid]
+                self._stats["expired_sessions"] += 1
+            elif len(self._sessions) > self.max_sessions:
+                del self._sessions[sid]
+                self._stats["evicted_sessions"] += 1
+            else:
+                break
+
+    # === 查询 ===
+    def query(
+        self,
+        session_id: str,
+        node: Optional[str] = None,
+        types: Optional[Iterable[str]] = None,
+        since_seq: int = 0,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        type_set = set(types) if types else None
+        with self._lock:
+            buf = self._sessions.get(session_id)
+            events = list(buf.events) if buf else []
+        out = [
+            e for e in events
+            if e["seq"] > since_seq
+            and (node is None or e["node"] == node)
+            and (type_set is None or e["type"] in type_set)
+        ]
+        return out[-limit:] if limit else out
+
+    def last_seq(self, session_id: str) -> int:
+        with self._lock:
+            buf = self._sessions.get(session_id)
+            return buf.next_seq - 1 if buf else 0
+
+    def sessions(self) -> List[str]:
+        with self._lock:
+            return list(self._sessions.keys())
+
+    def clear(self, session_id: Optional[str] = None) -> None:
+        with self._lock:
+            if session_id is None:
+                self._sessions.clear()
+            else:
+                self._sessions.pop(session_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._enforce_retention(time.monotonic())
+            out = {
+                **self._stats,
+                "sessions": len(self._sessions),
+                "buffered": sum(len(b.events) for b in self._sessions.values()),
+                "buffer_size": self.buffer_size,
+                "subscribers": sum(len(s) for s in self._subscribers.values()),
+            }
+        if self.writer is not None:
+            out["db_writer"] = self.writer.stats()
+        return out
+
+
+_sink: Optional[SessionEventSink] = None
+_sink_lock = threading.Lock()
+
+
+def get_event_sink() -> SessionEventSink:
+    global _sink
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                from config.settings import get_settings
+                from .write_behind import get_write_behind
+
+                settings = get_settings()
+                _sink = SessionEventSink(
+                    buffer_size=settings.event_buffer_size,
+                    session_ttl=settings.event_session_ttl,
+                    max_sessions=settings.event_max_sessions,
+                    writer=get_write_behind() if settings.event_db_writer else None,
+                )
+    return _sink
@@ -0,0 +1,181 @@
+"""
+干预卡索引（data/plans_minimal_v1.yaml）
+- 方案库只在文件变化时解析一次；applies_if 表达式预编译为谓词
+    语法："dimension==communication && severity==high"，支持 == / != / in [a,b]、&&、||
+- 按 (dimension, severity) 预建索引，选卡就是一次字典查找；未见过的维度首次查询时求值并缓存
+- 严重性标签统一：严重/重度/severe -> high，中度/moderate -> mid，良好/轻度/good -> low
+- 文件 mtime 变化自动热加载
+
+用法：
+    cards = get_intervention_index().select("communication", "严重", top_k=2)
+"""
+
+from __future__ import annotations
+
+import re
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+DEFAULT_PLANS_PATH = _PROJECT_ROOT / "data" / "plans_minimal_v1.yaml"
+
+SEVERITY_LEVELS = ("high", "mid", "low")
+_SEVERITY_ALIASES = {
+    "high": "high", "severe": "high", "严重": "high", "重度": "high",
+    "mid": "mid", "medium": "mid", "moderate": "mid", "中度": "mid", "中等": "mid",
+    "low": "low", "mild": "low", "good": "low", "none": "low", "良好": "low", "轻度": "low",
+}
+# 维度中文名 -> 题库维度 key
+_DIMENSION_ALIASES = {
+    "沟通": "communication", "信任": "trust", "亲密/性生活": "intimacy",
+    "子女教育": "parenting", "冲突处理": "conflict", "价值观/角色分工": "values_roles",
+}
+
+Predicate = Callable[[str, str], bool]
+
+
+def normalize_severity(label: Any) -> Optional[str]:
+    if label is None:
+        return None
+    return _SEVERITY_ALIASES.get(str(label).strip().lower())
+
+
+def normalize_dimension(name: Any) -> str:
+    s = str(name or "").strip()
+    return _DIMENSION_ALIASES.get(s, s)
+
+
+def dimension_label(dimension: str) -> str:
+    """维度 key -> 中文名（检索查询用）"""
+    for label, key in _DIMENSION_ALIASES.items():
+        if key == dimension:
+            return label
+    return dimension
+
+
+# ========== applies_if 编译 ==========
+_TERM_RE = re.compile(r"^\s*(dimension|severity)\s*(==|!=|\s+in\s+)\s*(.+?)\s*$")
+
+
+def _normalize_value(field: str, value: str) -> str:
+    value = value.strip().strip("'\"")
+    if field == "severity":
+        return normalize_severity(value) or value
+    return normalize_dimension(value)
+
+
+def compile_applies_if(expr: Optional[str]) -> Predicate:
+    """把 applies_if 编译为 (dimension, severity) -> bool；空表达式恒为真"""
+    if not expr or not str(expr).strip():
+        return lambda dim, sev: True
+    clauses: List[List[Tuple[str, str, frozenset]]] = []
+    for alt in str(expr).split("||"):
+        terms = []
+        for raw in alt.split("&&"):
+            m = _TERM_RE.match(raw)
+            if not m:
+                raise ValueError(f"Unsupported applies_if term: {raw.strip()!r} in {expr!r}")
+            field, op, value = m.group(1), m.group(2).strip(), m.group(3)
+            if op == "in":
+                values = [v for v in value.strip("[]() ").split(",") if v.strip()]
+            else:
+                values = [value]
+            terms.append((field, op, frozenset(_normalize_value(field, v) for v in values)))
+        clauses.append(terms)
+
+    def _pred(dim: str, sev: str) -> bool:
+        ctx = {"dimension": dim, "severity": sev}
+        for terms in clauses:
+            if all((ctx[f] in vals) != (op == "!=") for f, op, vals in terms):
+                return True
+        return False
+
+    return _pred
+
+
+# ========== 索引 ==========
+class InterventionIndex:
+    def __init__(self, cards: List[Dict[str, Any]], path: str = "") -> None:
+        self.path = path
+        self.cards: List[Tuple[Dict[str, Any], Predicate]] = []
+        for card in cards:
+            try:
+                self.cards.append((card, compile_applies_if(card.get("applies_if"))))
+            except ValueError as e:
+                logger.warning(f"Skip intervention card {card.get('id')}: {e}")
+        self._index: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        dims = {normalize_dimension(d) for d in _DIMENSION_ALIASES.values()}
+        for card, _ in self.cards:
+            dims.update(re.findall(r"dimension\s*==\s*['\"]?([\w/]+)", str(card.get("applies_if") or "")))
+        for dim in dims:
+            for sev in SEVERITY_LEVELS:
+                self._index[(dim, sev)] = self._match(dim, sev)
+
+    def _match(self, dim: str, sev: str) -> List[Dict[str, Any]]:
+        return [card for card, pred in self.cards if pred(dim, sev)]
+
+    def lookup(self, dimension: str, severity: Any) -> List[Dict[str, Any]]:
+        dim = normalize_dimension(dimension)
+        sev = normalize_severity(severity)
+        if sev is None:
+            logger.warning(f"Unknown severity label {severity!r}, treating as mid")
+            sev = "mid"
+        key = (dim, sev)
+        hit = self._index.get(key)
+        if hit is None:
+            with self._lock:
+                hit = self._index.setdefault(key, self._match(dim, sev))
+        return hit
+
+    def select(self, dimension: str, severity: Any, top_k: int = 2) -> List[Dict[str, Any]]:
+        return [dict(card) for card in self.lookup(dimension, severity)[:max(0, int(top_k))]]
+
+
+_cache: Dict[str, Tuple[float, InterventionIndex]] = {}
+_cache_lock = threading.Lock()
+
+
+def get_intervention_index(yaml_path: Optional[str] = None) -> InterventionIndex:
+    path = Path(yaml_path) if yaml_path else DEFAULT_PLANS_PATH
+    if not path.is_absolute() and not path.exists():
+        path = _PROJECT_ROOT / path
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        logger.warning(f"Intervention plans not found: {path}")
+        return InterventionIndex([], path=str(path))
+    key = str(path)
+    hit = _cache.get(key)
+    if hit and hit[0] == mtime:
+        return hit[1]
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit and hit[0] == mtime:
+            return hit[1]
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = yaml.safe_load(f) or {}
+        except Exception as e:
+            logger.warning(f"Failed to load intervention plans {path}: {e}")
+            return hit[1] if hit else InterventionIndex([], path=key)
+        index = InterventionIndex(list(data.get("plans") or []), path=key)
+        _cache[key] = (mtime, index)
+        logger.info(f"Loaded intervention index {path.name} ({len(index.cards)} cards)")
+        return index
+
+
+def select_interventions(
+    dimension: str,
+    severity: Any,
+    yaml_path: Optional[str] = None,
+    top_k: int = 2,
+) -> List[Dict[str, Any]]:
+    """兼容入口"""
+    return get_intervention_index(yaml_path).select(dimension, severity, top_k=top_k)
@@ -0,0 +1,175 @@
+"""
+干预卡本地检索（BM25，CJK 字符 n-gram）
+- 文档 = 卡片的 summary + steps + scripts.coach
+- 分词：中文按字 unigram + bigram，英文/数字按词；无需分词词典
+- 倒排表常驻内存：term -> {doc: tf}（稀疏），idf / avgdl 查询时按当前文档数计算
+- 增量：sync() 按卡片 id + 内容哈希对比，只对新增/变化/删除的卡片改倒排表
+- 不依赖外部向量库或网络；几十～上千张卡时单次查询在毫秒以内
+
+用法：
+    hits = get_card_retriever().search("经常吵架 冷战 沟通", top_k=3)   # [(card, score), ...]
+"""
+
+from __future__ import annotations
+
+import re
+import math
+import json
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .intervention import InterventionIndex, get_intervention_index
+
+logger = logging.getLogger(__name__)
+
+K1 = 1.5
+B = 0.75
+
+_CJK_RE = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    s = unicodedata.normalize("NFKC", text or "").lower()
+    tokens: List[str] = []
+    for run in _CJK_RE.findall(s):
+        tokens.extend(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    tokens.extend(_WORD_RE.findall(_CJK_RE.sub(" ", s)))
+    return tokens
+
+
+def card_text(card: Dict[str, Any]) -> str:
+    parts = [str(card.get("summary") or "")]
+    parts.extend(str(s) for s in (card.get("steps") or []))
+    scripts = card.get("scripts") or {}
+    if isinstance(scripts, dict):
+        parts.append(str(scripts.get("coach") or ""))
+    return "\n".join(p for p in parts if p)
+
+
+def _card_hash(card: Dict[str, Any]) -> str:
+    raw = json.dumps(card, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class CardRetriever:
+    def __init__(self) -> None:
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_len: Dict[str, int] = {}
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._hashes: Dict[str, str] = {}
+        self._total_len = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    # === 增量维护 ===
+    def add(self, card: Dict[str, Any]) -> None:
+        card_id = str(card.get("id") or _card_hash(card)[:12])
+        with self._lock:
+            if card_id in self._docs:
+                self.remove(card_id)
+            tf = Counter(tokenize(card_text(card)))
+            for term, n in tf.items():
+                self._postings.setdefault(term, {})[card_id] = n
+            length = sum(tf.values())
+            self._doc_len[card_id] = length
+            self._total_len += length
+            self._docs[card_id] = card
+            self._hashes[card_id] = _card_hash(card)
+
+    def remove(self, card_id: str) -> None:
+        with self._lock:
+            card = self._docs.pop(card_id, None)
+            if card is None:
+                return
+            for term in set(tokenize(card_text(card))):
+                posting = self._postings.get(term)
+                if posting is not None:
+                    posting.pop(card_id, None)
+                    if not posting:
+                        del self._postings[term]
+            self._total_len -= self._doc_len.pop(card_id, 0)
+            self._hashes.pop(card_id, None)
+
+    def sync(self, cards: List[Dict[str, Any]]) -> Dict[str, int]:
+        """与最新卡片列表对齐：只处理新增/变化/删除的卡片"""
+        stats = {"added": 0, "updated": 0, "removed": 0}
+        with self._lock:
+            incoming = {str(c.get("id") or _card_hash(c)[:12]): c for c in cards}
+            for card_id in list(self._docs):
+                if card_id not in incoming:
+                    self.remove(card_id)
+                    stats["removed"] += 1
+            for card_id, card in incoming.items():
+                old = self._hashes.get(card_id)
+                if old == _card_hash(card):
+                    continue
+                self.add(card)
+                stats["updated" if old else "added"] += 1
+        return stats
+
+    # === 查询 ===
+    def search(
+        self,
+        query: str,
+        top_k: int = 3,
+        where: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        min_score: float = 0.0,
+    ) -> List[Tuple[Dict[str, Any], float]]:
+        q = Counter(tokenize(query))
+        if not q:
+            return []
+        with self._lock:
+            n_docs = len(self._docs)
+            if n_docs == 0:
+                return []
+            avgdl = self._total_len / n_docs
+            scores: Dict[str, float] = {}
+            for term, qtf in q.items():
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1.0 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+                for card_id, tf in posting.items():
+                    norm = tf * (K1 + 1) / (tf + K1 * (1 - B + B * self._doc_len[card_id] / avgdl))
+                    scores[card_id] = scores.get(card_id, 0.0) + qtf * idf * norm
+            ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+            out: List[Tuple[Dict[str, Any], float]] = []
+            for card_id, score in ranked:
+                if score <= min_score:
+                    break
+                card = self._docs[card_id]
+                if where is not None and not where(card):
+                    continue
+                out.append((card, round(score, 4)))
+                if len(out) >= top_k:
+                    break
+            return out
+
+
+_retriever: Optional[CardRetriever] = None
+_synced_index: Optional[InterventionIndex] = None
+_retriever_lock = threading.Lock()
+
+
+def get_card_retriever(yaml_path: Optional[str] = None) -> CardRetriever:
+    """与干预卡索引同源：方案库热加载后，下一次取用时增量同步"""
+    global _retriever, _synced_index
+    index = get_intervention_index(yaml_path)
+    if _retriever is not None and _synced_index is index:
+        return _retriever
+    with _retriever_lock:
+        if _retriever is None:
+            _retriever = CardRetriever()
+        if _synced_index is not index:
+            stats = _retriever.sync([card for card, _ in index.cards])
+            _synced_index = index
+            logger.info(f"Intervention retriever synced: {stats}")
+    return _retriever
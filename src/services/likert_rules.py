@@ -0,0 +1,234 @@
+"""
+Likert 1–5 本地预打分（规则版，scorer.md 评分原则的确定性子集）
+- 数字作答："4"、"打3分"、"选五"          -> numeric_user
+- 澄清选择：clarify.strategy = likert_1_5 / two_anchors -> numeric_user / anchor_choice
+- 高置信词表：符合/同意/满意/频率词 + 否定词、程度副词
+输出与 LLM 打分相同的结构：{score, confidence, needs_clarify, method, evidence}；
+score 为正向语义原始分，反向题仍由 run_scorer 统一做 6 - score。
+命中不了或置信度不足时返回 None / 低置信度结果，由调用方回落到 LLM。
+
+说明：scorer.md 里的“冷战/经常吵/贬低”这类内容词，正负方向取决于题干表述（正向题 vs 负向题），
+规则层无法可靠判断，这里不收录，交给 LLM；词条之外还带着这类内容词的回复（“经常吵”）同样只给低置信度。
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+# 本地结果至少要达到该置信度才跳过 LLM（可被 state["prescore_threshold"] 覆盖）
+PRESCORE_THRESHOLD = 0.8
+
+_CN_DIGITS = {"一": 1, "二": 2, "两": 2, "三": 3, "四": 4, "五": 5}
+
+# (词, 正向语义分值, 基础置信度)；按长度优先匹配，已匹配区间不再重复计分
+_LEXICON: List[Tuple[str, int, float]] = [
+    # 符合 / 同意
+    ("完全符合", 5, 0.92), ("非常符合", 5, 0.9), ("完全同意", 5, 0.92), ("非常同意", 5, 0.9),
+    ("比较符合", 4, 0.85), ("基本符合", 4, 0.85), ("比较同意", 4, 0.85), ("符合", 4, 0.82), ("同意", 4, 0.8),
+    ("完全不符合", 1, 0.92), ("完全不同意", 1, 0.92), ("根本不是", 1, 0.88),
+    # 满意度
+    ("非常满意", 5, 0.9), ("特别满意", 5, 0.9), ("很满意", 5, 0.86), ("满意", 4, 0.82),
+    ("很不满意", 1, 0.9), ("非常不满意", 1, 0.92),
+    # 频率
+    ("总是", 5, 0.85), ("一直都", 5, 0.85), ("每次都", 5, 0.85), ("经常", 4, 0.82), ("多数时候", 4, 0.82),
+    ("大多数时候", 4, 0.82), ("很少", 2, 0.82), ("几乎没有", 1, 0.86), ("从不", 1, 0.88), ("从来没有", 1, 0.88),
+    ("从来不", 1, 0.88),
+    # 中性 / 模糊（模糊词置信度低于阈值 -> 回落 LLM，通常会触发澄清）
+    ("一般", 3, 0.8), ("中等", 3, 0.8), ("还行", 3, 0.7), ("还可以", 3, 0.7), ("凑合", 3, 0.7),
+    ("说不清", 3, 0.5), ("看情况", 3, 0.5), ("时好时坏", 3, 0.5), ("不好说", 3, 0.5), ("偶尔", 3, 0.55),
+    ("有时候", 3, 0.55), ("有时", 3, 0.55),
+]
+_LEXICON.sort(key=lambda x: len(x[0]), reverse=True)
+
+# 紧邻词条前的修饰语（越长越先匹配）
+# 强否定：“一点也不满意”“根本不符合” -> 1
+_STRONG_NEGATORS = ("一点也不", "一点都不", "一点也没", "一点都没", "根本不", "根本没", "完全不", "完全没", "压根不", "压根没")
+# 弱否定（对冲）：“不太满意”“没那么满意”“不总是” -> 2–3，而不是 6 - base 的极端值
+_WEAK_NEGATORS = (
+    "不是特别", "不是很", "没那么", "没有那么", "说不上", "谈不上", "不总是", "不太", "不怎么", "不大", "不算", "不很",
+)
+_NEGATORS = ("并非", "并不", "不是", "没有", "没", "不")
+# 否定一个负向词是对冲而不是反转：“不是从不” ≈ 有时（3），不是 5
+_HEDGING_NEGATORS = ("不是", "并非")
+# 词条前出现但没被上面任何修饰语解释的否定字（“不见得满意”“不是不满意”）：规则读不懂，交给 LLM
+_NEGATION_CHARS = "不没未无别"
+_UNKNOWN_NEGATION_CONF = 0.6
+_INTENSIFIERS = ("非常", "特别", "十分", "极其", "超级", "很", "太")
+_SOFTENERS = ("有点", "稍微", "比较", "还算", "略")
+
+_CONTRAST = ("但是", "但", "不过", "可是", "就是有时", "只是")
+# 词条之外允许出现的虚词 / 口头语；除此之外还有剩余内容（“经常吵”“总是冷战”）时，
+# 方向取决于内容词和题干，规则结果降到阈值以下交给 LLM
+_FILLERS = (
+    "我觉得", "我感觉", "我认为", "觉得", "感觉", "其实", "目前", "现在", "平时", "这方面", "这个",
+    "我们", "我", "还是", "算是", "基本上", "嗯", "呃", "挺", "蛮", "都", "也", "就", "是", "的", "对",
+)
+_FILLER_RE = re.compile("|".join(sorted(_FILLERS, key=len, reverse=True)))
+_LEFTOVER_CONF = 0.6
+_TRAILING = "吧啊呀呢嘛哦哈的了"
+_PUNCT_RE = re.compile(r"[\s,，.。!！?？~～、;；:：\"'“”‘’()（）…\-]+")
+_NUMERIC_RE = re.compile(r"^(?:我)?(?:选|打|给|是|算)?([1-5一二两三四五])分?$")
+_NUMERIC_INLINE_RE = re.compile(r"([1-5一二两三四五])分")
+
+
+def normalize_reply(text: str) -> str:
+    """全角转半角、去空白和标点、去句尾语气词"""
+    s = unicodedata.normalize("NFKC", text or "").strip().lower()
+    s = _PUNCT_RE.sub("", s)
+    return s.rstrip(_TRAILING) or s
+
+
+def _to_score(tok: str) -> int:
+    return int(tok) if tok.isdigit() else _CN_DIGITS[tok]
+
+
+def _result(score: int, confidence: float, method: str, evidence: List[str]) -> Dict[str, Any]:
+    return {
+        "score": int(min(5, max(1, score))),
+        "confidence": round(float(confidence), 2),
+        "needs_clarify": False,
+        "method": method,
+        "evidence": evidence[:4],
+    }
+
+
+def _score_clarify(clarify: Dict[str, Any], reply: str) -> Optional[Dict[str, Any]]:
+    strategy = clarify.get("strategy")
+    selection = clarify.get("selection")
+    if strategy == "likert_1_5" and selection is not None:
+        try:
+            sel = int(selection)
+        except (TypeError, ValueError):
+            return None
+        if 1 <= sel <= 5:
+            return _result(sel, 0.95, "numeric_user", [str(selection)])
+    if strategy == "two_anchors" and selection in ("low", "high"):
+        score = 2 if selection == "low" else 4
+        # 用户口述极端时允许 1/5
+        lex = _score_lexicon(reply)
+        if lex and lex["score"] in (1, 5) and (lex["score"] < 3) == (selection == "low"):
+            return _result(lex["score"], 0.85, "anchor_choice", [selection] + lex["evidence"])
+        return _result(score, 0.85, "anchor_choice", [selection])
+    return None
+
+
+def _modifier_before(s: str, start: int, options: Tuple[str, ...]) -> Optional[str]:
+    for m in options:
+        if s[max(0, start - len(m)):start] == m:
+            return m
+    return None
+
+
+def _score_lexicon(reply: str) -> Optional[Dict[str, Any]]:
+    s = normalize_reply(reply)
+    if not s:
+        return None
+    taken = [False] * len(s)
+    hits: List[Tuple[int, float, str]] = []
+    spans: List[Tuple[int, int]] = []
+
+    for term, base, conf in _LEXICON:
+        start = s.find(term)
+        while start >= 0:
+            end = start + len(term)
+            if not any(taken[start:end]):
+                for i in range(start, end):
+                    taken[i] = True
+                score, evidence = base, term
+                strong = _modifier_before(s, start, _STRONG_NEGATORS)
+                weak = None if strong else _modifier_before(s, start, _WEAK_NEGATORS)
+                neg = None if (strong or weak) else _modifier_before(s, start, _NEGATORS)
+                if neg and any((neg + term).startswith(w) for w in _WEAK_NEGATORS):
+                    # “不很满意”“不总是”：否定词与词条开头合起来是弱否定
+                    weak, neg = neg, None
+                if strong:
+                    # “一点也不满意”“根本不符合” -> 极端
+                    score = 1 if base > 3 else (5 if base < 3 else 3)
+                    evidence = strong + term
+                elif weak:
+                    # “不太满意”“不很满意”≈ 2；对频率极值的对冲“不总是”≈ 3
+                    if base == 5 and not term.startswith(_INTENSIFIERS):
+                        score = 3
+                    else:
+                        score = 2 if base >= 3 else 4
+                    evidence = weak + term
+                elif neg and neg in _HEDGING_NEGATORS and base < 3:
+                    score = 3
+                    evidence = neg + term
+                elif neg:
+                    score = 6 - base
+                    evidence = neg + term
+                    pre = _modifier_before(s, start - len(neg), _INTENSIFIERS)
+                    if pre and score != 3:
+                        # “很不满意” -> 更极端
+                        score = 1 if score < 3 else 5
+                        evidence = pre + evidence
+                else:
+                    intens = _modifier_before(s, start, _INTENSIFIERS)
+                    soft = _modifier_before(s, start, _SOFTENERS)
+                    if intens and base != 3:
+                        score = 5 if base > 3 else 1
+                        evidence = intens + term
+                    elif soft and base in (1, 5):
+                        score = 4 if base == 5 else 2
+                        evidence = soft + term
+                if base == 3 and (strong or weak or neg):
+                    # “不一般”“没看情况”之类，语义不稳定
+                    conf = min(conf, 0.5)
+                # 修饰语之前还有没解释的否定（“不见得满意”“不是不满意”）-> 低于阈值，交给 LLM
+                mod_start = start - (len(evidence) - len(term))
+                if any(ch in _NEGATION_CHARS for ch in s[max(0, mod_start - 3):mod_start]):
+                    conf = min(conf, _UNKNOWN_NEGATION_CONF)
+                hits.append((score, conf, evidence))
+                spans.append((mod_start, end))
+            start = s.find(term, start + 1)
+
+    if not hits:
+        return None
+    directions = {(h[0] > 3) - (h[0] < 3) for h in hits}
+    if len(directions) > 1:
+        # 正负线索并存（“还行但经常吵”） -> 交给 LLM
+        return None
+
+    score = round(sum(h[0] for h in hits) / len(hits))
+    confidence = max(h[1] for h in hits)
+    # 词条（含修饰语）要覆盖整句回复，才能高置信度跳过 LLM
+    covered = [False] * len(s)
+    for a, b in spans:
+        covered[a:b] = [True] * (b - a)
+    leftover = "".join(ch if not c else " " for ch, c in zip(s, covered))
+    if _FILLER_RE.sub("", leftover).strip():
+        confidence = min(confidence, _LEFTOVER_CONF)
+    if any(c in s for c in _CONTRAST):
+        confidence -= 0.2
+    # 长回复里可能还有规则没读懂的信息
+    if len(s) > 12:
+        confidence -= 0.1
+    return _result(score, confidence, "rule_lexicon", [h[2] for h in hits])
+
+
+def prescore_reply(user_reply: str, clarify: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """
+    返回 {score, confidence, needs_clarify, method, evidence} 或 None（无法本地判断）。
+    调用方需自行比较 confidence 与 PRESCORE_THRESHOLD 决定是否回落 LLM。
+    """
+    if isinstance(clarify, dict):
+        res = _score_clarify(clarify, user_reply or "")
+        if res:
+            return res
+
+    s = normalize_reply(user_reply or "")
+    if not s:
+        return None
+
+    m = _NUMERIC_RE.match(s)
+    if m:
+        return _result(_to_score(m.group(1)), 0.95, "numeric_user", [m.group(0)])
+    inline = {_to_score(t) for t in _NUMERIC_INLINE_RE.findall(s)}
+    if len(inline) == 1:
+        score = inline.pop()
+        return _result(score, 0.9, "numeric_user", [f"{score}分"])
+
+    return _score_lexicon(user_reply or "")
@@ -0,0 +1,234 @@
+"""
+题库服务（解析一次 + 预建索引 + 文件变更自动重载）
+- 每个题库文件只在版本变化时解析一次（UTF-8 BOM、intents 以 ; 分隔）
+- 紧凑条目（QuestionItem，NamedTuple）+ 索引：by_id / by_dimension / by_intent
+- 重载：每次取用时比较 mtime/size，变化后再比较内容哈希，内容没变只更新 mtime
+- 多版本并存：按路径分别缓存，questions_mqol_v1 / questions_mqol_v2 可同时服务，切换无需重启
+
+用法：
+    bank = get_question_bank("questions_mqol_v2")        # 版本名 -> data/<name>.csv；也可直接传路径
+    plan = select_plan_for_intents(bank, primary_intent="沟通质量", intents=[...], per_dim=10)
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+DATA_DIR = _PROJECT_ROOT / "data"
+DEFAULT_BANK_VERSION = "questions_mqol_v1"
+
+
+class QuestionItem(NamedTuple):
+    question_id: str
+    dimension: str
+    question_text: str
+    reverse_scored: bool
+    weight: float
+    intents: Tuple[str, ...]
+
+    def to_plan_item(self) -> Dict[str, Any]:
+        return {
+            "dimension": self.dimension,
+            "question_id": self.question_id,
+            "question_text": self.question_text,
+            "weight": self.weight,
+            "reverse_scored": self.reverse_scored,
+            "intents": list(self.intents),
+        }
+
+
+class QuestionBank:
+    def __init__(self, items: Iterable[QuestionItem], path: str = "internal_demo", content_hash: str = "") -> None:
+        self.items: Tuple[QuestionItem, ...] = tuple(items)
+        self.path = path
+        self.content_hash = content_hash
+        self.by_id: Dict[str, QuestionItem] = {}
+        self.by_dimension: Dict[str, List[QuestionItem]] = {}
+        self.by_intent: Dict[str, List[QuestionItem]] = {}
+        self.position: Dict[str, int] = {}
+        for i, it in enumerate(self.items):
+            self.position[it.question_id] = i
+            self.by_id[it.question_id] = it
+            self.by_dimension.setdefault(it.dimension, []).append(it)
+            for tag in it.intents:
+                self.by_intent.setdefault(tag, []).append(it)
+
+    @property
+    def version(self) -> str:
+        return Path(self.path).stem
+
+    @property
+    def dimensions(self) -> List[str]:
+        return list(self.by_dimension.keys())
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def get(self, question_id: str) -> Optional[QuestionItem]:
+        return self.by_id.get(str(question_id))
+
+
+# 题库文件缺失时的最小 demo（保证流程能跑通）
+_DEMO_ITEMS = (
+    QuestionItem("D01", "communication", "我和伴侣能比较顺畅地沟通彼此的想法。", False, 1.0, ("沟通质量",)),
+    QuestionItem("D02", "conflict", "我们发生争执时，通常能找到双方都接受的解决办法。", False, 1.0, ("冲突管理",)),
+    QuestionItem("D03", "intimacy", "我对我们之间的亲密程度感到满意。", False, 1.0, ("亲密",)),
+)
+
+
+def _parse_bank(raw: bytes) -> List[QuestionItem]:
+    items: List[QuestionItem] = []
+    for r in csv.DictReader(io.StringIO(raw.decode("utf-8-sig"))):
+        qid = (r.get("id") or "").strip()
+        if not qid:
+            continue
+        try:
+            weight = float(r.get("weight") or 1.0)
+        except ValueError:
+            weight = 1.0
+        items.append(QuestionItem(
+            question_id=qid,
+            dimension=(r.get("dimension") or "").strip(),
+            question_text=(r.get("text") or "").strip(),
+            reverse_scored=str(r.get("reverse_scored", "")).strip().lower() == "true",
+            weight=weight,
+            intents=tuple(t.strip() for t in (r.get("intents") or "").split(";") if t.strip()),
+        ))
+    return items
+
+
+def resolve_bank_path(bank: Optional[str] = None) -> Path:
+    """版本名（questions_mqol_v2）或路径（data/questions_mqol_v2.csv）-> 绝对路径"""
+    name = bank or DEFAULT_BANK_VERSION
+    p = Path(name)
+    if p.suffix.lower() != ".csv":
+        p = DATA_DIR / f"{name}.csv"
+    elif not p.is_absolute() and not p.exists():
+        p = _PROJECT_ROOT / p
+    return p
+
+
+class _Entry:
+    __slots__ = ("mtime", "size", "bank")
+
+    def __init__(self, mtime: float, size: int, bank: QuestionBank) -> None:
+        self.mtime, self.size, self.bank = mtime, size, bank
+
+
+_banks: Dict[str, _Entry] = {}
+_banks_lock = threading.Lock()
+_demo_bank = QuestionBank(_DEMO_ITEMS)
+
+
+def get_question_bank(bank: Optional[str] = None) -> QuestionBank:
+    """按版本名/路径取题库；文件变化自动重载，文件不存在时返回内置 demo"""
+    path = resolve_bank_path(bank)
+    try:
+        st = path.stat()
+    except OSError:
+        logger.warning(f"Question bank not found: {path}, using internal demo")
+        return _demo_bank
+    key = str(path)
+    entry = _banks.get(key)
+    if entry and entry.mtime == st.st_mtime and entry.size == st.st_size:
+        return entry.bank
+
+    with _banks_lock:
+        entry = _banks.get(key)
+        if entry and entry.mtime == st.st_mtime and entry.size == st.st_size:
+            return entry.bank
+        raw = path.read_bytes()
+        digest = hashlib.sha256(raw).hexdigest()[:12]
+        if entry and entry.bank.content_hash == digest:
+            # 只是 touch 了文件，内容没变
+            entry.mtime, entry.size = st.st_mtime, st.st_size
+            return entry.bank
+        qb = QuestionBank(_parse_bank(raw), path=key, content_hash=digest)
+        _banks[key] = _Entry(st.st_mtime, st.st_size, qb)
+        logger.info(f"Loaded question bank {qb.version} ({len(qb)} items, hash={digest})")
+        return qb
+
+
+def load_question_bank(bank_path: Optional[str] = None) -> QuestionBank:
+    """兼容旧接口：等价于 get_question_bank(bank_path)"""
+    return get_question_bank(bank_path)
+
+
+def loaded_banks() -> Dict[str, Dict[str, Any]]:
+    return {
+        e.bank.version: {"path": k, "items": len(e.bank), "hash": e.bank.content_hash}
+        for k, e in _banks.items()
+    }
+
+
+# ========== 选题 ==========
+def _intent_labels(primary_intent: Any, intents: Any) -> List[str]:
+    """主意图在前；次要意图按置信度降序（兼容字符串或 {label/intent/name, confidence/score} 字典）"""
+    def _label(x: Any) -> Optional[str]:
+        if isinstance(x, str):
+            return x.strip() or None
+        if isinstance(x, dict):
+            v = x.get("label") or x.get("intent") or x.get("name")
+            return str(v).strip() if v else None
+        return None
+
+    def _conf(x: Any) -> float:
+        if isinstance(x, dict):
+            try:
+                return float(x.get("confidence", x.get("score", 0.0)) or 0.0)
+            except (TypeError, ValueError):
+                return 0.0
+        return 0.0
+
+    labels: List[str] = []
+    first = _label(primary_intent)
+    if first:
+        labels.append(first)
+    for x in sorted(intents or [], key=_conf, reverse=True):
+        lab = _label(x)
+        if lab and lab not in labels:
+            labels.append(lab)
+    return labels
+
+
+def select_plan_for_intents(
+    bank: QuestionBank,
+    primary_intent: Any = None,
+    intents: Any = None,
+    per_dim: int = 10,
+) -> List[Dict[str, Any]]:
+    """
+    按意图标签从索引取题：
+      - 依次遍历主意图、次要意图，对应 by_intent 列表中的题目
+      - 每个维度最多 per_dim 题，题目去重，维度内保持题库顺序
+      - 没有任何意图命中时，按维度均衡抽题（每维度前 per_dim 题）
+    """
+    per_dim = max(1, int(per_dim))
+    picked: Dict[str, List[QuestionItem]] = {}
+    seen: set = set()
+
+    for label in _intent_labels(primary_intent, intents):
+        for it in bank.by_intent.get(label, ()):
+            bucket = picked.setdefault(it.dimension, [])
+            if it.question_id in seen or len(bucket) >= per_dim:
+                continue
+            bucket.append(it)
+            seen.add(it.question_id)
+
+    if not picked:
+        picked = {dim: items[:per_dim] for dim, items in bank.by_dimension.items()}
+
+    plan: List[Dict[str, Any]] = []
+    for dim in bank.dimensions:
+        for it in sorted(picked.get(dim, ()), key=lambda x: bank.position[x.question_id]):
+            plan.append(it.to_plan_item())
+    return plan
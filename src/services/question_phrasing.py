@@ -0,0 +1,151 @@
+"""
+题目话术缓存（离线预生成的共情式问法）
+- 文件与题库放在一起：data/questions_mqol_v1.csv -> data/questions_mqol_v1.phrasings.json
+  {"Q01": {"text": "...", "source_hash": "<题干哈希>"}, ...}
+- 题干改了（source_hash 对不上）的条目自动忽略，回落题库原文
+- Interviewer 默认直接用这里的话术/题干出题，不再每题一次 LLM 往返
+
+批量生成：
+    python -m src.services.question_phrasing --bank data/questions_mqol_v1.csv [--concurrency 4] [--force]
+"""
+
+from __future__ import annotations
+
+import os
+import json
+import asyncio
+import hashlib
+import logging
+import argparse
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BANK_PATH = "data/questions_mqol_v1.csv"
+
+_cache: Dict[str, Tuple[float, Dict[str, Dict[str, Any]]]] = {}
+_cache_lock = threading.Lock()
+
+
+def phrasing_path_for(bank_path: str) -> Path:
+    p = Path(bank_path)
+    return p.with_name(p.stem + ".phrasings.json")
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha256((text or "").strip().encode("utf-8")).hexdigest()[:12]
+
+
+def load_phrasings(bank_path: str = DEFAULT_BANK_PATH) -> Dict[str, Dict[str, Any]]:
+    """按文件 mtime 缓存；文件不存在返回 {}"""
+    path = phrasing_path_for(bank_path)
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return {}
+    key = str(path)
+    hit = _cache.get(key)
+    if hit and hit[0] == mtime:
+        return hit[1]
+    with _cache_lock:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f) or {}
+        except Exception as e:
+            logger.warning(f"Failed to load phrasings {path}: {e}")
+            data = {}
+        _cache[key] = (mtime, data)
+    return data
+
+
+def get_phrasing(item: Dict[str, Any], bank_path: Optional[str] = None) -> Optional[str]:
+    """取某题的预生成话术（bank_path：本次施测用的题库，即 state["bank_path"]）；题干已变更或没有生成过时返回 None"""
+    rec = load_phrasings(bank_path or DEFAULT_BANK_PATH).get(str(item.get("question_id")))
+    if not rec or not rec.get("text"):
+        return None
+    if rec.get("source_hash") != _text_hash(item.get("question_text", "")):
+        return None
+    return rec["text"]
+
+
+# ========== 离线批量生成 ==========
+def _read_bank_rows(bank_path: str) -> List[Dict[str, Any]]:
+    from .question_bank import get_question_bank
+    return [it.to_plan_item() for it in get_question_bank(bank_path).items]
+
+
+async def _generate_one(llm, item: Dict[str, Any], total: int, idx: int) -> Optional[str]:
+    from src.utils.prompt_utils import render_prompt
+    from src.llms.adapter import parse_json_object
+
+    prompt = render_prompt("interviewer", {
+        "dimension_name": item.get("dimension"),
+        "question_id": item.get("question_id"),
+        "question_text": item.get("question_text"),
+        "reverse_scored": item.get("reverse_scored", False),
+        "progress": {"current": idx + 1, "total": total},
+        "last_user_reply": "",
+        "needs_clarify": False,
+        "confidence": None,
+        "anchors": None,
+    })
+    data = parse_json_object(await llm.ainvoke(prompt))
+    text = data.get("assistant_utterance") or data.get("question") or data.get("utterance")
+    return text.strip() if isinstance(text, str) and text.strip() else None
+
+
+async def generate_phrasings(bank_path: str, concurrency: int = 4, force: bool = False) -> Dict[str, Any]:
+    from src.llms.registry import get_node_llm
+
+    rows = _read_bank_rows(bank_path)
+    out_path = phrasing_path_for(bank_path)
+    existing = {} if force else load_phrasings(bank_path)
+    result: Dict[str, Dict[str, Any]] = dict(existing)
+    # 离线生成访谈话术：与 interviewer 节点使用同一模型档案
+    llm = get_node_llm("interviewer")
+    sem = asyncio.Semaphore(max(1, concurrency))
+    stats = {"total": len(rows), "generated": 0, "kept": 0, "failed": 0}
+
+    async def _run(idx: int, item: Dict[str, Any]):
+        qid = str(item["question_id"])
+        src_hash = _text_hash(item["question_text"])
+        if not force and existing.get(qid, {}).get("source_hash") == src_hash:
+            stats["kept"] += 1
+            return
+        async with sem:
+            try:
+                text = await _generate_one(llm, item, len(rows), idx)
+            except Exception as e:
+                logger.warning(f"Phrasing generation failed for {qid}: {e}")
+                text = None
+        if text:
+            result[qid] = {"text": text, "source_hash": src_hash}
+            stats["generated"] += 1
+        else:
+            stats["failed"] += 1
+
+    await asyncio.gather(*(_run(i, item) for i, item in enumerate(rows)))
+
+    tmp = out_path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp, out_path)
+    stats["path"] = str(out_path)
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="离线生成题目共情式话术缓存")
+    parser.add_argument("--bank", default=DEFAULT_BANK_PATH)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--force", action="store_true", help="忽略已有话术，全部重新生成")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    stats = asyncio.run(generate_phrasings(args.bank, args.concurrency, args.force))
+    print(json.dumps(stats, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
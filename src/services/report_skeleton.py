@@ -0,0 +1,180 @@
+"""
+报告骨架（本地确定性渲染，不调用 LLM）
+- header / 分数表 / 干预计划步骤 直接由 dim_scores、severity、interventions 生成
+- 叙述部分拆成互相独立的小节：每个维度一节 + 总结一节，由 report_writer 并发生成后填入 sections
+- 小节生成失败时用 fallback_section() 的模板句兜底，报告结构始终完整
+- report_fingerprint()：骨架 + 各小节 prompt 输入 + prompt 版本的 sha256，
+  输入不变（重开/重复 finalize 会话）时据此复用已存报告，不再调用 LLM
+
+report 结构：
+    {"header": {...}, "score_table": [...], "plans": [...],
+     "section_order": ["dim:communication", ..., "summary"], "sections": {section_id: {...}}}
+"""
+
+from __future__ import annotations
+
+import json
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .intervention import dimension_label
+from .severity import SEVERE, MODERATE, GOOD, severity_thresholds
+
+SUMMARY_SECTION = "summary"
+REPORT_PROMPTS = ("report_section", "report_summary")
+# 报告结构（骨架/小节划分）变化时递增，使旧指纹全部失效
+REPORT_FORMAT_VERSION = 1
+_PROMPTS_DIR = Path(__file__).resolve().parent.parent / "prompts"
+# header 中与内容无关、每次都可能不同的字段，不参与指纹
+_VOLATILE_HEADER_KEYS = ("session_id", "report_date")
+_SEVERITY_ORDER = {SEVERE: 0, MODERATE: 1, GOOD: 2}
+
+
+def section_id_for(dimension: str) -> str:
+    return f"dim:{dimension}"
+
+
+def build_report_skeleton(state: Dict[str, Any]) -> Dict[str, Any]:
+    profile = state.get("profile", {}) or {}
+    dim_scores = state.get("dim_scores", {}) or {}
+    severity = state.get("severity", {}) or {}
+    severe, moderate = severity_thresholds()
+
+    header = {
+        "user_display_name": profile.get("nickname") or profile.get("name") or "朋友",
+        "session_id": state.get("session_id", "S-unknown"),
+        "report_date": state.get("report_date", ""),
+        "overall_score": state.get("overall_score"),
+        "overall_severity": state.get("overall_severity"),
+        "thresholds": {"severe": severe, "moderate": moderate},
+    }
+
+    # 分数表：严重程度优先，其次分数从低到高（最需要关注的维度排在前面）
+    score_table = [
+        {
+            "dimension": dim,
+            "label": dimension_label(dim),
+            "score": score,
+            "severity": severity.get(dim),
+        }
+        for dim, score in dim_scores.items()
+    ]
+    score_table.sort(key=lambda r: (_SEVERITY_ORDER.get(r["severity"], 3), r["score"] if r["score"] is not None else 0))
+
+    plans = []
+    for entry in state.get("interventions", []) or []:
+        cards = [
+            {
+                "id": c.get("id"),
+                "summary": c.get("summary"),
+                "steps": list(c.get("steps") or []),
+                "coach": (c.get("scripts") or {}).get("coach") if isinstance(c.get("scripts"), dict) else None,
+            }
+            for c in entry.get("cards", [])
+        ]
+        if cards:
+            plans.append({"dimension": entry.get("dimension"), "label": dimension_label(entry.get("dimension", "")),
+                          "cards": cards})
+
+    order = [section_id_for(r["dimension"]) for r in score_table] + [SUMMARY_SECTION]
+    return {
+        "header": header,
+        "score_table": score_table,
+        "plans": plans,
+        "section_order": order,
+        "sections": {},
+    }
+
+
+def section_payloads(state: Dict[str, Any], skeleton: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """每个小节一个 prompt 输入，只带该小节需要的数据（prompt 更短，首节更快返回）"""
+    header = skeleton["header"]
+    plans_by_dim = {p["dimension"]: p["cards"] for p in skeleton["plans"]}
+    notes = list(state.get("exploration_notes", []) or [])[-3:]
+    out: List[Dict[str, Any]] = []
+    for row in skeleton["score_table"]:
+        dim = row["dimension"]
+        out.append({
+            "section_id": section_id_for(dim),
+            "prompt": "report_section",
+            "payload": {
+                "user_display_name": header["user_display_name"],
+                "dimension": dim,
+                "dimension_label": row["label"],
+                "score": row["score"],
+                "severity": row["severity"],
+                "thresholds": header["thresholds"],
+                "interventions": plans_by_dim.get(dim, []),
+                "exploration_notes": notes,
+                "guidance": {"tone": "温和、可操作"},
+            },
+        })
+    out.append({
+        "section_id": SUMMARY_SECTION,
+        "prompt": "report_summary",
+        "payload": {
+            "user_display_name": header["user_display_name"],
+            "overall_score": header["overall_score"],
+            "overall_severity": header["overall_severity"],
+            "score_table": skeleton["score_table"],
+            "primary_intent": state.get("primary_intent"),
+            "guidance": {"tone": "温和、可操作"},
+        },
+    })
+    return out
+
+
+def fallback_section(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """LLM 小节失败时的模板兜底"""
+    p = spec["payload"]
+    if spec["section_id"] == SUMMARY_SECTION:
+        focus = [r["label"] for r in p.get("score_table", []) if r.get("severity") != GOOD][:2]
+        text = f"{p['user_display_name']}，本次评估总体得分 {p.get('overall_score')}（{p.get('overall_severity')}）。"
+        if focus:
+            text += f"建议优先关注：{'、'.join(focus)}。"
+        return {"title": "总结", "content": text, "fallback": True}
+    return {
+        "title": p["dimension_label"],
+        "content": f"{p['dimension_label']}得分 {p['score']}（{p['severity']}）。",
+        "fallback": True,
+    }
+
+
+def has_fallback(report: Optional[Dict[str, Any]]) -> bool:
+    """报告里是否有模板兜底的小节（这样的报告不按指纹复用，下次重新生成）"""
+    return any(s.get("fallback") for s in ((report or {}).get("sections") or {}).values())
+
+
+_prompt_version_cache: Dict[Tuple[float, ...], str] = {}
+
+
+def prompt_version() -> str:
+    """报告 prompt 模板内容 + 格式版本的短哈希；模板文件改动即变化"""
+    paths = [_PROMPTS_DIR / f"{name}.md" for name in REPORT_PROMPTS]
+    mtimes = tuple(p.stat().st_mtime if p.exists() else 0.0 for p in paths)
+    hit = _prompt_version_cache.get(mtimes)
+    if hit:
+        return hit
+    h = hashlib.sha256(f"format:{REPORT_FORMAT_VERSION}".encode("utf-8"))
+    for p in paths:
+        h.update(p.read_bytes() if p.exists() else b"")
+    version = h.hexdigest()[:16]
+    _prompt_version_cache.clear()
+    _prompt_version_cache[mtimes] = version
+    return version
+
+
+def report_fingerprint(state: Dict[str, Any], skeleton: Dict[str, Any]) -> Tuple[str, str]:
+    """返回 (input_fingerprint, prompt_version)"""
+    version = prompt_version()
+    header = {k: v for k, v in skeleton["header"].items() if k not in _VOLATILE_HEADER_KEYS}
+    material = {
+        "prompt_version": version,
+        "header": header,
+        "score_table": skeleton["score_table"],
+        "plans": skeleton["plans"],
+        "sections": [(s["section_id"], s["prompt"], s["payload"]) for s in section_payloads(state, skeleton)],
+    }
+    raw = json.dumps(material, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest(), version
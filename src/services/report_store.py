@@ -0,0 +1,83 @@
+"""
+报告版本存取（report_versions 表）
+- load_report_by_fingerprint：同 session 下输入指纹相同的报告，命中即复用（含兜底小节的不复用）
+- save_report：先确保 users / sessions 行，再写入新版本（指纹相同时 Repo 直接返回已有版本，不重复落库）；
+  含兜底小节的报告照常存版本但不记指纹，避免一次 LLM 失败的结果被永久复用
+- get_latest_report：前端按 session 取最新报告，走 (session_id, version_no) 唯一索引，一次查询
+数据库不可用时只记日志：报告照常生成，只是失去复用
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, Optional
+
+from .report_skeleton import has_fallback
+from .write_behind import ANONYMOUS_USER, ensure_owner
+
+logger = logging.getLogger(__name__)
+
+
+def _to_dict(rv: Any) -> Dict[str, Any]:
+    return {
+        "session_id": rv.session_id,
+        "version_no": rv.version_no,
+        "overall_score": rv.overall_score,
+        "overall_severity": rv.overall_severity,
+        "input_fingerprint": rv.input_fingerprint,
+        "prompt_version": rv.prompt_version,
+        "created_at": rv.created_at.isoformat() if rv.created_at else None,
+        "report": rv.report_json,
+    }
+
+
+def load_report_by_fingerprint(session_id: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+    try:
+        from db.session import SessionLocal
+        from db.repository import Repo
+
+        with SessionLocal() as sa:
+            rv = Repo(sa).find_report_version(session_id, fingerprint)
+            if rv is None or not rv.report_json or has_fallback(rv.report_json):
+                return None
+            return _to_dict(rv)
+    except Exception as e:
+        logger.warning(f"Report lookup failed for {session_id}: {e}")
+        return None
+
+
+def save_report(session_id: str, state: Dict[str, Any], fingerprint: str, prompt_version: str) -> Optional[int]:
+    """返回版本号；失败返回 None"""
+    try:
+        from db.session import SessionLocal
+        from db.repository import Repo
+
+        report = state.get("report")
+        if has_fallback(report):
+            fingerprint = None
+        ensure_owner(SessionLocal, session_id, state.get("user_id") or ANONYMOUS_USER)
+        with SessionLocal() as sa:
+            rv = Repo(sa).create_report_version(session_id, {
+                "profile": state.get("profile"),
+                "dim_scores": state.get("dim_scores"),
+                "overall_score": state.get("overall_score"),
+                "overall_severity": state.get("overall_severity"),
+                "interventions": state.get("interventions"),
+                "report": report,
+                "input_fingerprint": fingerprint,
+                "prompt_version": prompt_version,
+            })
+            sa.commit()
+            return rv.version_no
+    except Exception as e:
+        logger.warning(f"Failed to save report version for {session_id}: {e}")
+        return None
+
+
+def get_latest_report(session_id: str) -> Optional[Dict[str, Any]]:
+    from db.session import SessionLocal
+    from db.repository import Repo
+
+    with SessionLocal() as sa:
+        rv = Repo(sa).latest_report_version(session_id)
+        return _to_dict(rv) if rv is not None else None
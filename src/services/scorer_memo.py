@@ -0,0 +1,215 @@
+"""
+Scorer 答案备忘录（跨会话）
+- 同一道题的短回复高度重复（“还行”“一般”“经常吵”），把 LLM 的打分结果按
+  (question_id, reverse_scored, prompt_version, 归一化回复) 记下来，run_scorer 调 LLM 前先查
+- 归一化：全/半角、空白、标点、句尾语气词（复用 likert_rules.normalize_reply）
+- 存储：本地 SQLite（WAL），进程重启后仍有效；多 worker 可共享同一文件
+- prompt_version = scorer.md 内容哈希；scorer.md 一改，旧条目在打开时被清理，且 key 不再命中
+- SQLite 调用是阻塞的（busy_timeout 最长 5 秒）：异步代码用 aget / aput，放进线程池执行，不占事件循环
+- 命中计数先记在内存里，攒够 HIT_FLUSH_BATCH 个（或写入 / 淘汰 / stats 时）一次 executemany 写回，读路径不写库
+"""
+
+from __future__ import annotations
+
+import os
+import json
+import atexit
+import asyncio
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .likert_rules import normalize_reply
+
+logger = logging.getLogger(__name__)
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+SCORER_PROMPT_PATH = _PROJECT_ROOT / "src" / "prompts" / "scorer.md"
+DEFAULT_MEMO_PATH = _PROJECT_ROOT / "var" / "scorer_memo.sqlite3"
+
+# 只记短回复：长回复几乎不会逐字重复，记了也只是占空间
+MAX_REPLY_CHARS = 24
+HIT_FLUSH_BATCH = 64
+
+
+def scorer_prompt_version(path: Path = SCORER_PROMPT_PATH) -> str:
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()[:12]
+    except OSError:
+        return "unknown"
+
+
+def _prompt_mtime(path: Path = SCORER_PROMPT_PATH) -> float:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return 0.0
+
+
+class ScorerMemo:
+    def __init__(self, path: str, prompt_version: Optional[str] = None, max_entries: int = 50000) -> None:
+        self.path = path
+        self._prompt_mtime = _prompt_mtime()
+        self.prompt_version = prompt_version or scorer_prompt_version()
+        self.max_entries = int(max_entries)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "invalidated": 0}
+        # key -> (本批命中次数, 最近命中时间)
+        self._pending_hits: Dict[tuple, list] = {}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS scorer_memo ("
+            " question_id TEXT NOT NULL, reverse_scored INTEGER NOT NULL, prompt_version TEXT NOT NULL,"
+            " reply_norm TEXT NOT NULL, result TEXT NOT NULL, hits INTEGER NOT NULL DEFAULT 0,"
+            " created_at REAL NOT NULL, last_hit_at REAL NOT NULL,"
+            " PRIMARY KEY (question_id, reverse_scored, prompt_version, reply_norm))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_scorer_memo_last_hit ON scorer_memo(last_hit_at)")
+        self._invalidate_stale()
+
+    def _invalidate_stale(self) -> None:
+        # scorer.md 变化 -> 旧版本条目全部作废
+        cur = self._db.execute("DELETE FROM scorer_memo WHERE prompt_version != ?", (self.prompt_version,))
+        self._stats["invalidated"] += max(cur.rowcount, 0)
+
+    def _check_prompt_changed(self) -> None:
+        """运行中改了 scorer.md（热更新）也要立即失效"""
+        mtime = _prompt_mtime()
+        if mtime == self._prompt_mtime:
+            return
+        self._prompt_mtime = mtime
+        version = scorer_prompt_version()
+        if version != self.prompt_version:
+            logger.info(f"scorer.md changed ({self.prompt_version} -> {version}), invalidating scorer memo")
+            with self._lock:
+                self.prompt_version = version
+                self._pending_hits.clear()
+                self._invalidate_stale()
+
+    def _key(self, question_id: str, reverse_scored: bool, reply: str):
+        self._check_prompt_changed()
+        norm = normalize_reply(reply)
+        if not norm or len(norm) > MAX_REPLY_CHARS:
+            return None
+        return (str(question_id), int(bool(reverse_scored)), self.prompt_version, norm)
+
+    def get(self, question_id: str, reverse_scored: bool, reply: str) -> Optional[Dict[str, Any]]:
+        key = self._key(question_id, reverse_scored, reply)
+        if key is None:
+            return None
+        with self._lock:
+            try:
+                row = self._db.execute(
+                    "SELECT result FROM scorer_memo WHERE question_id=? AND reverse_scored=? AND prompt_version=? AND reply_norm=?",
+                    key,
+                ).fetchone()
+            except Exception as e:
+                logger.warning(f"Scorer memo read failed: {e}")
+                return None
+            if not row:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            pending = self._pending_hits.setdefault(key, [0, 0.0])
+            pending[0] += 1
+            pending[1] = time.time()
+            flush = len(self._pending_hits) >= HIT_FLUSH_BATCH
+        if flush:
+            self.flush_hits()
+        data = json.loads(row[0])
+        data["memo_hit"] = True
+        return data
+
+    def put(self, question_id: str, reverse_scored: bool, reply: str, result: Dict[str, Any]) -> None:
+        key = self._key(question_id, reverse_scored, reply)
+        if key is None or "score" not in result:
+            return
+        payload = json.dumps({
+            "score": result.get("score"),
+            "confidence": result.get("confidence"),
+            "needs_clarify": bool(result.get("needs_clarify", False)),
+            "method": result.get("method", "nl_infer"),
+            "evidence": result.get("evidence") or [],
+        }, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            try:
+                self._flush_hits_locked()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO scorer_memo"
+                    " (question_id, reverse_scored, prompt_version, reply_norm, result, hits, created_at, last_hit_at)"
+                    " VALUES (?, ?, ?, ?, ?, 0, ?, ?)",
+                    (*key, payload, now, now),
+                )
+                self._stats["writes"] += 1
+                if self._stats["writes"] % 200 == 0:
+                    self._evict()
+            except Exception as e:
+                logger.warning(f"Scorer memo write failed: {e}")
+
+    async def aget(self, question_id: str, reverse_scored: bool, reply: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.get, question_id, reverse_scored, reply)
+
+    async def aput(self, question_id: str, reverse_scored: bool, reply: str, result: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self.put, question_id, reverse_scored, reply, result)
+
+    def flush_hits(self) -> None:
+        with self._lock:
+            try:
+                self._flush_hits_locked()
+            except Exception as e:
+                logger.warning(f"Scorer memo hit flush failed: {e}")
+
+    def _flush_hits_locked(self) -> None:
+        if not self._pending_hits:
+            return
+        pending, self._pending_hits = self._pending_hits, {}
+        self._db.executemany(
+            "UPDATE scorer_memo SET hits = hits + ?, last_hit_at = MAX(last_hit_at, ?)"
+            " WHERE question_id=? AND reverse_scored=? AND prompt_version=? AND reply_norm=?",
+            [(n, ts, *key) for key, (n, ts) in pending.items()],
+        )
+
+    def _evict(self) -> None:
+        # 超出上限：先淘汰命中少的，再淘汰久未命中的
+        cur = self._db.execute(
+            "DELETE FROM scorer_memo WHERE rowid IN ("
+            " SELECT rowid FROM scorer_memo ORDER BY hits DESC, last_hit_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        self._stats["evictions"] += max(cur.rowcount, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._flush_hits_locked()
+            size = self._db.execute("SELECT COUNT(*) FROM scorer_memo").fetchone()[0]
+            return {**self._stats, "size": size, "prompt_version": self.prompt_version, "path": self.path}
+
+
+_memo: Optional[ScorerMemo] = None
+_memo_lock = threading.Lock()
+
+
+def get_scorer_memo() -> Optional[ScorerMemo]:
+    """SCORER_MEMO_PATH 为空字符串时关闭备忘录；打开失败也返回 None（不影响打分）"""
+    global _memo
+    if _memo is None:
+        path = os.getenv("SCORER_MEMO_PATH", str(DEFAULT_MEMO_PATH))
+        if not path:
+            return None
+        with _memo_lock:
+            if _memo is None:
+                try:
+                    _memo = ScorerMemo(path)
+                    atexit.register(_memo.flush_hits)   # 退出前写回还没落库的命中计数
+                except Exception as e:
+                    logger.warning(f"Scorer memo disabled: {e}")
+                    return None
+    return _memo
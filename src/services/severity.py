@@ -0,0 +1,68 @@
+"""
+严重性阈值（config/severity_thresholds.yaml，左闭右开）
+    score < severe              -> 严重
+    severe <= score < moderate  -> 中度
+    score >= moderate           -> 良好
+按文件 mtime 缓存，改配置无需重启。
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+THRESHOLDS_PATH = _PROJECT_ROOT / "config" / "severity_thresholds.yaml"
+
+SEVERE, MODERATE, GOOD = "严重", "中度", "良好"
+DEFAULT_THRESHOLDS = {"severe": 2.5, "moderate": 3.5}
+
+_cache: Tuple[float, Dict[str, Any]] = (-1.0, {})
+_lock = threading.Lock()
+
+
+def load_severity_config(path: Path = THRESHOLDS_PATH) -> Dict[str, Any]:
+    """返回 {"thresholds": {"severe", "moderate"}, "dim_weights": {...}}"""
+    global _cache
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return {"thresholds": dict(DEFAULT_THRESHOLDS), "dim_weights": {}}
+    if _cache[0] == mtime:
+        return _cache[1]
+    with _lock:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                raw = yaml.safe_load(f) or {}
+        except Exception as e:
+            logger.warning(f"Failed to load severity thresholds {path}: {e}")
+            raw = {}
+        th = {**DEFAULT_THRESHOLDS, **(raw.get("thresholds") or {})}
+        conf = {
+            "thresholds": {"severe": float(th["severe"]), "moderate": float(th["moderate"])},
+            "dim_weights": {k: float(v) for k, v in (raw.get("dim_weights") or {}).items()},
+        }
+        _cache = (mtime, conf)
+    return conf
+
+
+def severity_thresholds() -> Tuple[float, float]:
+    th = load_severity_config()["thresholds"]
+    return th["severe"], th["moderate"]
+
+
+def classify_severity(score: Optional[float]) -> Optional[str]:
+    if score is None:
+        return None
+    severe, moderate = severity_thresholds()
+    if score < severe:
+        return SEVERE
+    if score < moderate:
+        return MODERATE
+    return GOOD
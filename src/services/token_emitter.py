@@ -0,0 +1,154 @@
+"""
+Token 微批发射器（替代 on_token 里每个 token 一次 asyncio.create_task）
+- 合并：token 先进缓冲，攒满 max_chars 或距首个 token 超过 max_delay 秒就合成一条 token 事件
+- 背压：合并后的块进有界队列（max_queue），由单个后台任务顺序 await emit
+    * async 生产者用 push()：队列满时 await，直到消费者腾出位置（把慢消费者的压力传回 LLM 流读取）
+    * sync 生产者用 feed()：不阻塞，队列满时继续在缓冲里合并成更大的块，内存只随文本长度增长
+- feed() 可在事件循环线程或其他线程（同步流式回调）调用；跨线程时通过 call_soon_threadsafe 转回循环
+- 退出 async with 时冲刷剩余缓冲并等待全部事件发出，保证 token 事件先于 node_end
+
+用法：
+    async with TokenEmitter(emit, node="ReportWriter") as tokens:
+        data = await acall_json_with_stream(llm_client, prompt, on_token=tokens.push)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from .event_types import StreamEvent, StreamEventType
+
+logger = logging.getLogger(__name__)
+
+
+class TokenEmitter:
+    def __init__(
+        self,
+        emit: Callable[[StreamEvent], Any],
+        node: Optional[str] = None,
+        max_chars: int = 64,
+        max_delay: float = 0.03,
+        max_queue: int = 64,
+    ) -> None:
+        self._emit = emit
+        self.node = node
+        self.max_chars = max(1, int(max_chars))
+        self.max_delay = float(max_delay)
+        self._queue: Optional[asyncio.Queue] = None
+        self.max_queue = max(1, int(max_queue))
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._pump_task: Optional[asyncio.Task] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._space: Optional[asyncio.Event] = None
+        self._buf: List[str] = []
+        self._buf_len = 0
+        self._closed = False
+        self._stats = {"tokens": 0, "chars": 0, "events": 0, "emit_errors": 0, "producer_waits": 0}
+
+    # === 生命周期 ===
+    async def start(self) -> "TokenEmitter":
+        if self._pump_task is None:
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread = threading.get_ident()
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._space = asyncio.Event()
+            self._pump_task = self._loop.create_task(self._pump())
+        return self
+
+    async def aclose(self) -> None:
+        if self._pump_task is None or self._closed:
+            return
+        self._closed = True
+        self._cancel_timer()
+        if self._buf:
+            await self._queue.put(self._take())
+        await self._queue.put(None)
+        await self._pump_task
+
+    async def __aenter__(self) -> "TokenEmitter":
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+
+    # === 生产者 ===
+    def feed(self, token: str) -> None:
+        """同步入口：不阻塞；可跨线程调用"""
+        if not token or self._closed:
+            return
+        if self._loop is None:
+            raise RuntimeError("TokenEmitter.feed() called before start()")
+        if threading.get_ident() != self._loop_thread:
+            self._loop.call_soon_threadsafe(self.feed, token)
+            return
+        self._buf.append(token)
+        self._buf_len += len(token)
+        self._stats["tokens"] += 1
+        self._stats["chars"] += len(token)
+        if self._buf_len >= self.max_chars:
+            self._flush()
+        elif self._timer is None:
+            self._timer = self._loop.call_later(self.max_delay, self._on_timer)
+
+    async def push(self, token: str) -> None:
+        """异步入口：队列满时等待消费者（背压）"""
+        self.feed(token)
+        while self._queue is not None and self._queue.full() and not self._closed:
+            self._stats["producer_waits"] += 1
+            self._space.clear()
+            await self._space.wait()
+
+    __call__ = feed
+
+    # === 内部 ===
+    def _take(self) -> str:
+        chunk = "".join(self._buf)
+        self._buf.clear()
+        self._buf_len = 0
+        return chunk
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _flush(self) -> None:
+        if not self._buf:
+            self._cancel_timer()
+            return
+        if self._queue.full():
+            # 消费者跟不上：留在缓冲里继续合并，稍后再试
+            if self._timer is None:
+                self._timer = self._loop.call_later(self.max_delay, self._on_timer)
+            return
+        self._cancel_timer()
+        self._queue.put_nowait(self._take())
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        if not self._closed:
+            self._flush()
+
+    async def _pump(self) -> None:
+        while True:
+            chunk = await self._queue.get()
+            self._space.set()
+            if chunk is None:
+                break
+            try:
+                await self._emit(StreamEvent(type=StreamEventType.token, payload={"text": chunk}, node=self.node))
+                self._stats["events"] += 1
+            except Exception as e:
+                self._stats["emit_errors"] += 1
+                logger.warning(f"Token emit failed ({self.node}): {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "buffered_chars": self._buf_len,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
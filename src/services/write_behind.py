@@ -0,0 +1,352 @@
+"""
+写后（write-behind）持久化队列：messages / answers / item_scores / execution_logs
+- 节点只往内存队列追加行（按会话分桶），不在对话路径上等数据库
+- 刷新触发：
+    size     全部待写行数 ≥ batch_size
+    time     最早一行等待超过 flush_interval 秒（后台线程定时检查）
+    pause    flush_session(session_id)：图在等待用户输入前调用（该会话的数据在回合结束时已落库）
+    shutdown close()：应用关闭 / 进程退出（atexit）时刷完全部
+- 按会话刷新：每个会话一个事务，每张表一条 insert() executemany（SQLAlchemy 2 会合并成多行 INSERT），
+  一个对话回合的几十次写入变成一次提交；一个会话写入失败不影响其他会话
+- 所有表都外键到 sessions：写入前先确保 users / sessions 行存在（ensure_session 登记的 user_id，
+  未登记时用 ANONYMOUS_USER）
+- 写入失败：连接 / 超时类的暂时性错误把行放回队列下次重试；其他错误（约束、数据错误）重试不会成功，
+  这批行转入死信（dead_letters()，保留最近 dead_letter_size 条）并记 error 日志；
+  待写总数超过 max_pending 时丢弃最旧的行并计数
+- 指标：stats() 给出队列深度（总数/按表）、刷新次数、写入/失败/丢弃/死信行数、刷新耗时（last/avg/p95/max）
+
+也实现 SessionEventSink 的 writer 接口（add(session_id, record) -> execution_logs）。
+
+用法：
+    wb = get_write_behind()
+    wb.ensure_session(session_id, user_id)
+    wb.append_item_score(session_id, {...})
+    wb.flush_session(session_id)       # 回合结束（等待用户）前
+"""
+
+from __future__ import annotations
+
+import time
+import atexit
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+KINDS = ("messages", "answers", "item_scores", "execution_logs")
+
+ANONYMOUS_USER = "anonymous"
+
+# 一个会话的待写行 -> 写入函数：write(session_id, user_id, {kind: rows})
+WriteFn = Callable[[str, str, Dict[str, List[Dict[str, Any]]]], None]
+
+
+def ensure_owner(session_factory: Callable[[], Any], session_id: str, user_id: str) -> None:
+    """users / sessions 行（所有表的外键目标）；并发创建时的唯一约束冲突视为已存在"""
+    from sqlalchemy.exc import IntegrityError
+    from db.repository import Repo
+
+    with session_factory() as sa:
+        repo = Repo(sa)
+        repo.ensure_user(user_id)
+        sa.flush()
+        repo.ensure_session(session_id, user_id)
+        try:
+            sa.commit()
+        except IntegrityError:
+            sa.rollback()
+
+
+def make_writer(session_factory: Callable[[], Any]) -> WriteFn:
+    """基于 sessionmaker 的写入函数：先确保会话行，再每张表一条 executemany，一个事务提交"""
+    from db.repository import Repo
+
+    def _write(session_id: str, user_id: str, batch: Dict[str, List[Dict[str, Any]]]) -> None:
+        ensure_owner(session_factory, session_id, user_id)
+        with session_factory() as sa:
+            repo = Repo(sa)
+            for kind in KINDS:
+                repo.bulk_insert(kind, batch.get(kind, []))
+            sa.commit()
+
+    return _write
+
+
+def _default_write(session_id: str, user_id: str, batch: Dict[str, List[Dict[str, Any]]]) -> None:
+    from db.session import SessionLocal
+
+    make_writer(SessionLocal)(session_id, user_id, batch)
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """连接断开 / 超时 / 数据库暂不可用：重试可能成功；约束、数据、SQL 错误重试不会成功"""
+    try:
+        from sqlalchemy import exc as sa_exc
+    except ImportError:
+        sa_exc = None
+    if sa_exc is not None:
+        if isinstance(exc, sa_exc.DBAPIError) and exc.connection_invalidated:
+            return True
+        if isinstance(exc, (sa_exc.OperationalError, sa_exc.InterfaceError, sa_exc.DisconnectionError,
+                            sa_exc.TimeoutError)):
+            return True
+        if isinstance(exc, sa_exc.SQLAlchemyError):
+            return False
+    return isinstance(exc, (ConnectionError, TimeoutError))
+
+
+class WriteBehindQueue:
+    def __init__(
+        self,
+        batch_size: int = 200,
+        flush_interval: float = 1.0,
+        max_pending: int = 10000,
+        write: Optional[WriteFn] = None,
+        background: bool = True,
+        dead_letter_size: int = 1000,
+    ) -> None:
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = float(flush_interval)
+        self.max_pending = max(self.batch_size, int(max_pending))
+        self._write = write or _default_write
+        self._buckets: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+        self._owners: Dict[str, str] = {}
+        self._dead: Deque[Dict[str, Any]] = deque(maxlen=max(1, int(dead_letter_size)))
+        self._pending = 0
+        self._oldest: Optional[float] = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()   # 同一时刻只有一个刷新在写库，保证行的提交顺序
+        self._latencies: Deque[float] = deque(maxlen=200)
+        self._stats = {
+            "enqueued": 0, "written": 0, "failed": 0, "dropped": 0, "dead_lettered": 0,
+            "flushes": 0, "flush_errors": 0,
+        }
+        self._closed = False
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if background:
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+
+    # === 入队（与 Repo 同名方法，行格式由 db.repository 的 *_row 构造） ===
+    def ensure_session(self, session_id: str, user_id: Optional[str] = None) -> None:
+        """登记会话所属用户；刷新时先建 users / sessions 行（未登记的会话归 ANONYMOUS_USER）"""
+        if user_id:
+            with self._lock:
+                self._owners[session_id] = user_id
+                while len(self._owners) > self.max_pending:
+                    self._owners.pop(next(iter(self._owners)))
+
+    def append_messages(self, session_id: str, messages: List[Dict[str, Any]]) -> None:
+        from db.repository import message_row
+        self._enqueue(session_id, "messages", [message_row(session_id, m) for m in messages])
+
+    def append_execution_logs(self, session_id: str, logs: List[Dict[str, Any]]) -> None:
+        from db.repository import execution_log_row
+        self._enqueue(session_id, "execution_logs", [execution_log_row(session_id, rec) for rec in logs])
+
+    def append_answer(self, session_id: str, ans: Dict[str, Any]) -> None:
+        from db.repository import answer_row
+        self._enqueue(session_id, "answers", [answer_row(session_id, ans)])
+
+    def append_item_score(self, session_id: str, item: Dict[str, Any]) -> None:
+        from db.repository import item_score_row
+        self._enqueue(session_id, "item_scores", [item_score_row(session_id, item)])
+
+    def add(self, session_id: str, record: Dict[str, Any]) -> None:
+        """SessionEventSink writer 接口"""
+        self.append_execution_logs(session_id, [record])
+
+    def _enqueue(self, session_id: str, kind: str, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+        if self._closed:
+            logger.warning(f"Write-behind queue closed, dropping {len(rows)} {kind} rows")
+            self._stats["dropped"] += len(rows)
+            return
+        with self._lock:
+            bucket = self._buckets.setdefault(session_id, [])
+            bucket.extend((kind, r) for r in rows)
+            self._pending += len(rows)
+            self._stats["enqueued"] += len(rows)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            self._trim()
+            due = self._pending >= self.batch_size
+        if due:
+            self._wakeup.set()
+
+    def _trim(self) -> None:
+        # 调用方持有锁：超过上限时从最久未刷新的会话开始丢最旧的行
+        while self._pending > self.max_pending and self._buckets:
+            sid = next(iter(self._buckets))
+            bucket = self._buckets[sid]
+            n = min(len(bucket), self._pending - self.max_pending)
+            del bucket[:n]
+            self._pending -= n
+            self._stats["dropped"] += n
+            if not bucket:
+                del self._buckets[sid]
+
+    # === 刷新 ===
+    def _take(self, session_id: Optional[str] = None) -> Dict[str, List[Tuple[str, Dict[str, Any]]]]:
+        with self._lock:
+            if session_id is None:
+                buckets, self._buckets = self._buckets, {}
+            else:
+                bucket = self._buckets.pop(session_id, None)
+                buckets = {session_id: bucket} if bucket else {}
+            self._pending -= sum(len(b) for b in buckets.values())
+            if not self._buckets:
+                self._oldest = None
+        return buckets
+
+    def _requeue(self, session_id: str, rows: List[Tuple[str, Dict[str, Any]]]) -> None:
+        with self._lock:
+            self._buckets[session_id] = rows + self._buckets.get(session_id, [])
+            self._pending += len(rows)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            self._trim()
+
+    def _dead_letter(self, session_id: str, rows: List[Tuple[str, Dict[str, Any]]], exc: Exception) -> None:
+        error = f"{type(exc).__name__}: {exc}"
+        with self._lock:
+            for kind, row in rows:
+                self._dead.append({"session_id": session_id, "kind": kind, "row": row, "error": error})
+            self._stats["dead_lettered"] += len(rows)
+        logger.error(f"Write-behind dropped {len(rows)} rows of session {session_id} to dead letters: {error}")
+
+    def _flush_one(self, session_id: str, rows: List[Tuple[str, Dict[str, Any]]]) -> int:
+        batch: Dict[str, List[Dict[str, Any]]] = {}
+        for kind, row in rows:
+            batch.setdefault(kind, []).append(row)
+        user_id = self._owners.get(session_id) or ANONYMOUS_USER
+        t0 = time.perf_counter()
+        try:
+            self._write(session_id, user_id, batch)
+        except Exception as e:
+            self._stats["flush_errors"] += 1
+            self._stats["failed"] += len(rows)
+            if is_transient_error(e):
+                logger.warning(f"Write-behind flush for session {session_id} failed ({len(rows)} rows), will retry: {e}")
+                self._requeue(session_id, rows)
+            else:
+                self._dead_letter(session_id, rows, e)
+            return 0
+        self._latencies.append(time.perf_counter() - t0)
+        self._stats["flushes"] += 1
+        self._stats["written"] += len(rows)
+        return len(rows)
+
+    def flush(self, session_id: Optional[str] = None) -> int:
+        """同步刷新（全部或单个会话），每个会话一个事务；返回写入行数"""
+        with self._flush_lock:
+            return sum(self._flush_one(sid, rows) for sid, rows in self._take(session_id).items())
+
+    def dead_letters(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._dead)
+
+    def flush_session(self, session_id: str) -> int:
+        """flush-on-pause：回合结束前把该会话的待写行落库"""
+        return self.flush(session_id)
+
+    async def aflush_session(self, session_id: str) -> int:
+        return await asyncio.to_thread(self.flush, session_id)
+
+    def close(self) -> None:
+        """flush-on-shutdown：停止后台线程并刷完全部（失败时再试一次）"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+        for _ in range(2):
+            self.flush()
+            if not self._pending:
+                break
+        if self._pending:
+            logger.error(f"Write-behind closed with {self._pending} unwritten rows")
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval / 2)
+            self._wakeup.clear()
+            if self._closed:
+                break
+            with self._lock:
+                due = self._pending >= self.batch_size or (
+                    self._oldest is not None and time.monotonic() - self._oldest >= self.flush_interval
+                )
+            if due:
+                self.flush()
+
+    # === 指标 ===
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            depth = {k: 0 for k in KINDS}
+            for bucket in self._buckets.values():
+                for kind, _ in bucket:
+                    depth[kind] += 1
+            out = {
+                **self._stats,
+                "pending": self._pending,
+                "pending_by_kind": depth,
+                "sessions": len(self._buckets),
+                "dead_letters": len(self._dead),
+                "oldest_age_s": round(time.monotonic() - self._oldest, 3) if self._oldest is not None else 0.0,
+            }
+        lat = sorted(self._latencies)
+        if lat:
+            out["flush_ms"] = {
+                "last": round(self._latencies[-1] * 1000, 2),
+                "avg": round(sum(lat) / len(lat) * 1000, 2),
+                "p95": round(lat[min(len(lat) - 1, int(len(lat) * 0.95))] * 1000, 2),
+                "max": round(lat[-1] * 1000, 2),
+            }
+        return out
+
+
+_queue: Optional[WriteBehindQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_write_behind() -> WriteBehindQueue:
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                from config.settings import get_settings
+
+                settings = get_settings()
+                _queue = WriteBehindQueue(
+                    batch_size=settings.persist_batch_size,
+                    flush_interval=settings.persist_flush_interval,
+                    max_pending=settings.persist_max_pending,
+                )
+                atexit.register(_queue.close)
+    return _queue
+
+
+def write_behind_enabled() -> bool:
+    from config.settings import get_settings
+
+    return bool(get_settings().persist_write_behind)
+
+
+def close_write_behind() -> None:
+    """应用关闭时调用（main.py shutdown）；atexit 兜底"""
+    if _queue is not None:
+        _queue.close()
+
+
+async def flush_on_pause(session_id: str) -> int:
+    """图在等待用户输入 / 结束前调用；队列从未创建（未开启持久化）时为空操作"""
+    if _queue is None:
+        return 0
+    return await _queue.aflush_session(session_id)
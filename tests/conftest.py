@@ -0,0 +1,28 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+# 与运行时一致：节点用 src.* 导入，agents / services / db 用不带前缀的导入
+for p in (ROOT, ROOT / "src"):
+    if str(p) not in sys.path:
+        sys.path.insert(0, str(p))
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """开启外键约束的 SQLite（与 Postgres 一样会拒绝缺少 sessions 行的写入）"""
+    pytest.importorskip("sqlalchemy")
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.orm import sessionmaker
+    from db.models import Base
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.sqlite3'}", future=True)
+
+    @event.listens_for(engine, "connect")
+    def _fk_on(conn, _):
+        conn.execute("PRAGMA foreign_keys=ON")
+
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, future=True)
@@ -0,0 +1,43 @@
+import threading
+
+import pytest
+
+pytest.importorskip("openai")
+pytest.importorskip("langchain_openai")
+
+from openai import AsyncOpenAI, OpenAI  # noqa: E402
+
+from llms.adapter import LegacyLLMAdapter  # noqa: E402
+from llms.fake_openai import start_fake_server  # noqa: E402
+
+
+@pytest.fixture
+def adapter():
+    server, url = start_fake_server(reply="你好，今天感觉怎么样？", token_delay=0.05)
+    yield LegacyLLMAdapter(
+        provider="fake", model="m",
+        client=OpenAI(api_key="sk-fake", base_url=url),
+        async_client=AsyncOpenAI(api_key="sk-fake", base_url=url),
+    )
+    server.shutdown()
+
+
+def test_sync_api_wraps_async_path(adapter):
+    # 两次调用复用同一个后台循环上的异步客户端
+    assert adapter.invoke("hi") == "你好，今天感觉怎么样？"
+    tokens = []
+    assert adapter.stream("hi", tokens.append) == "你好，今天感觉怎么样？"
+    assert len(tokens) > 1
+
+
+def test_sync_stream_cancel_returns_partial_text(adapter):
+    cancel = threading.Event()
+    tokens = []
+
+    def on_token(t):
+        tokens.append(t)
+        cancel.set()
+
+    text = adapter.stream("hi", on_token, cancel=cancel)
+    assert text == "".join(tokens)
+    assert text != "你好，今天感觉怎么样？"
@@ -0,0 +1,50 @@
+import asyncio
+import sys
+import time
+import types
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("langchain_openai")
+
+from sqlalchemy import select  # noqa: E402
+
+from db.models import ExecutionLog  # noqa: E402
+from src.graph.common import cancellable_node  # noqa: E402
+
+
+@pytest.fixture
+def db(session_factory, monkeypatch):
+    # 默认配置：写后队列、事件落库都关闭
+    settings = types.SimpleNamespace(persist_write_behind=False, event_db_writer=False)
+    monkeypatch.setitem(sys.modules, "config.settings", types.SimpleNamespace(get_settings=lambda: settings))
+    monkeypatch.setitem(sys.modules, "db.session", types.SimpleNamespace(SessionLocal=session_factory))
+    return session_factory
+
+
+def _logs(factory):
+    with factory() as sa:
+        return [r.record for r in sa.execute(select(ExecutionLog)).scalars()]
+
+
+def test_cancelled_node_writes_execution_log(db):
+    async def slow_node(state, config):
+        await asyncio.sleep(10)
+        return state
+
+    node = cancellable_node("scorer", slow_node)
+
+    async def _turn():
+        task = asyncio.create_task(node({"session_id": "S-1", "q_index": 2}, {"configurable": {"thread_id": "S-1"}}))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(_turn())   # asyncio.run 退出时等待线程池里的写入完成
+    deadline = time.monotonic() + 2
+    while not _logs(db) and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert _logs(db) == [{"step": "scorer", "status": "cancelled",
+                          "payload": {"partial": True, "q_index": 2, "stage": None}}]
@@ -0,0 +1,37 @@
+import pytest
+
+pytest.importorskip("langgraph")
+
+from src.db.checkpointer import build_checkpointer  # noqa: E402
+
+
+def _checkpoint(cid, values):
+    return {"v": 1, "id": cid, "ts": "2024-01-01T00:00:00", "channel_values": values,
+            "channel_versions": {}, "versions_seen": {}}
+
+
+def test_in_place_mutation_survives_restart(tmp_path):
+    saver = build_checkpointer(f"sqlite:///{tmp_path / 'cp.sqlite3'}")
+    cfg = {"configurable": {"thread_id": "t1", "checkpoint_ns": ""}}
+    state = {"exploration_notes": ["a"], "profile": {"age": 30}, "q_index": 0}
+
+    cfg = saver.put(cfg, _checkpoint("0001", state), {}, {})
+    # 节点的写法：原地修改嵌套列表 / 字典
+    state.setdefault("exploration_notes", []).append("b")
+    state["profile"]["job"] = "teacher"
+    state["q_index"] = 1
+    cfg = saver.put(cfg, _checkpoint("0002", state), {}, {})
+
+    saver._last.clear()   # 模拟重启 / 缓存淘汰 / 另一个 worker
+    tup = saver.get_tuple({"configurable": {"thread_id": "t1", "checkpoint_ns": ""}})
+    assert tup.checkpoint["channel_values"] == state
+
+
+def test_cached_values_not_aliased_to_caller(tmp_path):
+    saver = build_checkpointer(f"sqlite:///{tmp_path / 'cp.sqlite3'}")
+    cfg = {"configurable": {"thread_id": "t1", "checkpoint_ns": ""}}
+    cfg = saver.put(cfg, _checkpoint("0001", {"notes": ["a"]}), {}, {})
+
+    got = saver.get_tuple(cfg).checkpoint["channel_values"]
+    got["notes"].append("mutated by caller")
+    assert saver.get_tuple(cfg).checkpoint["channel_values"] == {"notes": ["a"]}
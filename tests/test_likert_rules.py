@@ -0,0 +1,44 @@
+import pytest
+
+from services.likert_rules import PRESCORE_THRESHOLD, prescore_reply
+
+
+@pytest.mark.parametrize(
+    "reply, score",
+    [
+        ("满意", 4),
+        ("非常满意", 5),
+        ("不满意", 2),
+        ("很不满意", 1),
+        ("不太满意", 2),
+        ("不是很满意", 2),
+        # 弱否定（对冲）-> 2–3
+        ("没那么满意", 2),
+        ("不算满意", 2),
+        ("说不上满意", 2),
+        ("不很满意", 2),
+        ("不总是", 3),
+        # 强否定 -> 1
+        ("一点也不满意", 1),
+        ("根本不满意", 1),
+        ("完全不满意", 1),
+        # 否定负向词是对冲
+        ("不是从不", 3),
+        # 整句只有词条和虚词，照常高置信度
+        ("经常", 4),
+        ("我觉得挺满意的", 4),
+    ],
+)
+def test_negation_polarity(reply, score):
+    out = prescore_reply(reply)
+    assert out["score"] == score, out
+
+
+@pytest.mark.parametrize("reply", [
+    "不见得满意", "不是不满意",
+    # 频率词之外还有内容词，方向取决于题干（scorer.md：经常吵 / 冷战 / 贬低 -> 1–2）
+    "经常吵", "我们经常冷战", "经常贬低我", "总是吵架",
+])
+def test_unexplained_negation_falls_below_threshold(reply):
+    out = prescore_reply(reply)
+    assert out["confidence"] < PRESCORE_THRESHOLD, out
@@ -0,0 +1,15 @@
+import pytest
+
+pytest.importorskip("langchain_openai")
+
+from llms.adapter import LegacyLLMAdapter  # noqa: E402
+
+
+def _adapter(max_tokens):
+    return LegacyLLMAdapter(provider="fake", model="m", client=object(), temperature=0.0, max_tokens=max_tokens)
+
+
+def test_cache_key_depends_on_max_tokens():
+    # 截断在 256 token 的回复不能给上限 2048 的调用方
+    assert _adapter(256)._cache_key("p") != _adapter(2048)._cache_key("p")
+    assert _adapter(256)._cache_key("p") == _adapter(256)._cache_key("p")
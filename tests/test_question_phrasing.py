@@ -0,0 +1,15 @@
+import json
+
+from services.question_phrasing import _text_hash, get_phrasing, phrasing_path_for
+
+
+def test_phrasing_uses_the_selected_bank(tmp_path):
+    bank = tmp_path / "questions_mqol_v2.csv"
+    bank.write_text("question_id,dimension,text\n", encoding="utf-8")
+    item = {"question_id": "Q99", "question_text": "你和伴侣多久吵一次架？"}
+    phrasing_path_for(str(bank)).write_text(json.dumps({
+        "Q99": {"text": "最近你们之间争吵多吗？", "source_hash": _text_hash(item["question_text"])},
+    }, ensure_ascii=False), encoding="utf-8")
+
+    assert get_phrasing(item, str(bank)) == "最近你们之间争吵多吗？"
+    assert get_phrasing(item) is None   # 默认 v1 题库里没有这道题
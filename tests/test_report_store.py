@@ -0,0 +1,42 @@
+import sys
+import types
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from db.models import Session  # noqa: E402
+from services import report_store  # noqa: E402
+
+
+@pytest.fixture
+def store(session_factory, monkeypatch):
+    # report_store 在函数内导入 db.session.SessionLocal；换成测试库
+    monkeypatch.setitem(sys.modules, "db.session", types.SimpleNamespace(SessionLocal=session_factory))
+    return report_store
+
+
+def _state(fallback: bool) -> dict:
+    return {
+        "user_id": "U-1",
+        "overall_score": 60,
+        "report": {"sections": {
+            "summary": {"title": "总结", "content": "..."},
+            "dim_1": {"title": "身体", "content": "...", **({"fallback": True} if fallback else {})},
+        }},
+    }
+
+
+def test_save_report_creates_session_row(store, session_factory):
+    assert store.save_report("S-1", _state(False), "fp", "v1") == 1
+    with session_factory() as sa:
+        assert sa.get(Session, "S-1").user_id == "U-1"
+    assert store.load_report_by_fingerprint("S-1", "fp")["version_no"] == 1
+
+
+def test_fallback_report_is_not_reused(store):
+    assert store.save_report("S-1", _state(True), "fp", "v1") == 1
+    assert store.load_report_by_fingerprint("S-1", "fp") is None
+    # 下一次正常生成的报告另存新版本并可复用
+    assert store.save_report("S-1", _state(False), "fp", "v1") == 2
+    assert store.load_report_by_fingerprint("S-1", "fp")["version_no"] == 2
@@ -0,0 +1,41 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("openai")
+pytest.importorskip("langchain_openai")
+
+from llms.fake_openai import start_fake_server  # noqa: E402
+from llms.router import ProviderSpec, RoutingConfig, RoutingLLMClient  # noqa: E402
+
+
+@pytest.fixture
+def providers():
+    servers = {
+        "down": start_fake_server(status=503),
+        "up": start_fake_server(reply="ok"),
+    }
+    yield {name: ProviderSpec(name=name, base_url=url, api_key="sk-fake", models=("m",))
+           for name, (_, url) in servers.items()}
+    for server, _ in servers.values():
+        server.shutdown()
+
+
+def test_503_fails_over_without_limiter_retries(providers):
+    router = RoutingLLMClient(providers, RoutingConfig(order=("down", "up"), model="m"))
+
+    t0 = time.perf_counter()
+    assert asyncio.run(router.ainvoke("hi")) == "ok"
+    # limiter 里重试会带上 Retry-After: 1 的退避（3 次约 6 秒）
+    assert time.perf_counter() - t0 < 1.0
+    # 熔断器按真实调用计数：一次 503 记一次失败
+    assert router.stats()["down"]["breaker"]["consecutive_failures"] == 1
+
+
+def test_sync_503_fails_over_without_limiter_retries(providers):
+    router = RoutingLLMClient(providers, RoutingConfig(order=("down", "up"), model="m"))
+
+    t0 = time.perf_counter()
+    assert router.invoke("hi") == "ok"
+    assert time.perf_counter() - t0 < 1.0
@@ -0,0 +1,25 @@
+import asyncio
+import sqlite3
+
+from services.scorer_memo import ScorerMemo
+
+
+def _hits(path):
+    with sqlite3.connect(path) as db:
+        return db.execute("SELECT hits FROM scorer_memo").fetchone()[0]
+
+
+def test_hits_are_batched_off_the_read_path(tmp_path):
+    path = str(tmp_path / "memo.sqlite3")
+    memo = ScorerMemo(path, prompt_version="v1")
+
+    async def _turns():
+        await memo.aput("Q1", False, "经常吵", {"score": 2, "confidence": 0.9})
+        return [await memo.aget("Q1", False, "经常吵！") for _ in range(3)]
+
+    results = asyncio.run(_turns())
+    assert all(r["score"] == 2 and r["memo_hit"] for r in results)
+    # 读路径不写库：命中次数攒在内存里
+    assert _hits(path) == 0
+    assert memo.stats()["hits"] == 3
+    assert _hits(path) == 3
@@ -0,0 +1,62 @@
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import func, select  # noqa: E402
+
+from db.models import ItemScore, Message, Session  # noqa: E402
+from services.write_behind import WriteBehindQueue, make_writer  # noqa: E402
+
+
+def _count(factory, model, session_id):
+    with factory() as sa:
+        return sa.execute(select(func.count()).select_from(model).where(model.session_id == session_id)).scalar_one()
+
+
+def test_flush_creates_session_rows(session_factory):
+    wb = WriteBehindQueue(write=make_writer(session_factory), background=False)
+    wb.ensure_session("S-1", "U-1")
+    wb.append_messages("S-1", [{"role": "user", "content": "hi"}])
+    wb.append_messages("S-2", [{"role": "user", "content": "no owner registered"}])
+
+    assert wb.flush() == 2
+    assert _count(session_factory, Message, "S-1") == 1
+    assert _count(session_factory, Message, "S-2") == 1
+    with session_factory() as sa:
+        assert sa.get(Session, "S-1").user_id == "U-1"
+        assert sa.get(Session, "S-2").user_id == "anonymous"
+
+
+def test_bad_session_is_dead_lettered_without_blocking_others(session_factory):
+    wb = WriteBehindQueue(write=make_writer(session_factory), background=False)
+    wb.append_messages("S-ok", [{"role": "user", "content": "hi"}])
+    # score 为 NOT NULL：约束错误，重试不会成功
+    wb.append_item_score("S-bad", {"question_id": "q1", "dimension": "d", "score": None})
+
+    assert wb.flush() == 1
+    assert _count(session_factory, Message, "S-ok") == 1
+    assert _count(session_factory, ItemScore, "S-bad") == 0
+
+    stats = wb.stats()
+    assert stats["pending"] == 0
+    assert stats["dead_lettered"] == 1
+    assert wb.dead_letters()[0]["session_id"] == "S-bad"
+    assert wb.flush() == 0   # 不会反复重试
+
+
+def test_transient_error_is_requeued():
+    from sqlalchemy.exc import OperationalError
+
+    calls = []
+
+    def flaky(session_id, user_id, batch):
+        calls.append(session_id)
+        if len(calls) == 1:
+            raise OperationalError("INSERT", {}, Exception("connection refused"))
+
+    wb = WriteBehindQueue(write=flaky, background=False)
+    wb.append_messages("S-1", [{"role": "user", "content": "hi"}])
+    assert wb.flush() == 0
+    assert wb.stats()["pending"] == 1
+    assert wb.flush() == 1
+    assert wb.stats()["dead_lettered"] == 0